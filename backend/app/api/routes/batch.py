@@ -0,0 +1,284 @@
+"""API routes for batch label checking (каталог SKU за один запит)"""
+
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import Response
+from typing import Dict, List, Optional
+from pathlib import Path
+import asyncio
+import logging
+import shutil
+import tempfile
+import uuid
+
+from app.api.routes import checker
+from app.services.claude_ocr_service import OCR_MODE_TWO_STAGE
+from app.services.batch_service import (
+    BatchItem,
+    BatchJob,
+    BatchService,
+    aggregate_summary,
+    collect_items,
+    summary_csv,
+)
+from app.utils.cache import request_scope
+from app.config import settings
+
+router = APIRouter(prefix="/api/check-label/batch", tags=["batch"])
+logger = logging.getLogger(__name__)
+
+batch_service = BatchService(
+    concurrency=settings.batch_concurrency,
+    checkpoint_interval=settings.batch_checkpoint_interval,
+)
+
+
+async def _save_upload(file: UploadFile, target: Path, max_size: int) -> None:
+    """Зберегти завантаження на диск частинами (архів може бути сотні MB)"""
+    size = 0
+    with open(target, "wb") as output:
+        while chunk := await file.read(1024 * 1024):
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Upload too large: {file.filename}. Maximum size is {max_size / (1024*1024):.0f}MB."
+                )
+            output.write(chunk)
+
+
+async def _read_item(item: BatchItem) -> bytes:
+    """Байти файлу batch, підготовлені для Claude Vision"""
+    file_bytes = await asyncio.to_thread(item.path.read_bytes)
+    file_bytes, _ = await checker._prepare_upload(file_bytes, item.content_type)
+    return file_bytes
+
+
+async def _process_item(item: BatchItem, mode: Optional[str], label_data: Optional[Dict] = None) -> Dict:
+    """
+    Quick + Full для одного файлу batch (сесія зберігається як у /quick)
+
+    Args:
+        item: Файл batch
+        mode: OCR mode
+        label_data: Готовий результат OCR (offline batch) або None
+    """
+    if label_data is None:
+        label_data = await checker.ocr_service.extract_label_data(await _read_item(item), mode)
+    if label_data.get("error"):
+        raise ValueError(label_data["error"])
+
+    item.check_id = str(uuid.uuid4())
+    await checker._save_session(item.check_id, label_data)
+
+    with request_scope():
+        report = await checker._validate_label(item.check_id, label_data)
+    await checker._save_report(item.check_id, report)
+    return report
+
+
+async def _extract_offline(job: BatchJob, extracted: Dict[int, Dict]) -> None:
+    """
+    OCR усіх файлів job через Message Batches API (частинами)
+
+    Частини обмежують розмір одного batch запиту (зображення в base64).
+    """
+    pending = [item for item in job.items if item.status == "pending"]
+    chunk_size = settings.batch_offline_chunk_size
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        try:
+            images = {str(item.index): await _read_item(item) for item in chunk}
+            results = await checker.ocr_service.analyze_labels_offline(images)
+        except Exception as e:
+            logger.error(f"Batch {job.job_id}: offline OCR failed: {e}", exc_info=True)
+            results = {str(item.index): {"error": f"Offline OCR failed: {e}"} for item in chunk}
+        for item in chunk:
+            extracted[item.index] = results.get(str(item.index)) or {"error": "No OCR result"}
+        logger.info(f"Batch {job.job_id}: offline OCR {start + len(chunk)}/{len(pending)}")
+
+
+async def _save_job(job: BatchJob) -> None:
+    """Створити запис job у check_sessions"""
+    try:
+        await checker.supabase.insert("check_sessions", {
+            "check_id": job.job_id,
+            "label_data": {"batch": {
+                "mode": job.mode,
+                "offline": job.offline,
+                "files": [item.filename for item in job.items],
+            }},
+            "status": "batch_running",
+            "created_at": job.created_at
+        })
+    except Exception as e:
+        logger.warning(f"Could not save batch job to Supabase: {e}. Continuing without saving.")
+
+
+async def _checkpoint(job: BatchJob) -> None:
+    """Зберегти прогрес job у check_sessions (report = snapshot)"""
+    snapshot = job.snapshot()
+    update = {"status": f"batch_{job.status}", "report": snapshot}
+    if job.completed_at:
+        update["completed_at"] = job.completed_at
+
+    try:
+        await checker.supabase.update("check_sessions", update, {"check_id": job.job_id})
+    except Exception as e:
+        logger.warning(f"Could not checkpoint batch {job.job_id}: {e}")
+
+
+async def _load_snapshot(job_id: str) -> Dict:
+    """Snapshot job: з пам'яті цього процесу або останній чекпойнт з Supabase"""
+    job = batch_service.get(job_id)
+    if job:
+        return job.snapshot()
+
+    try:
+        session = await checker._fetch_session(job_id)
+    except Exception as e:
+        logger.error(f"Error retrieving batch job: {e}")
+        raise HTTPException(status_code=404, detail=f"Batch job not found: {str(e)}")
+
+    if not session or not str(session.get("status", "")).startswith("batch_"):
+        raise HTTPException(status_code=404, detail="Batch job not found")
+
+    snapshot = session.get("report")
+    if not snapshot:
+        # Job створено, але перший чекпойнт ще не записано
+        files = session["label_data"]["batch"]["files"]
+        snapshot = {
+            "job_id": job_id,
+            "status": "running",
+            "progress": {"total": len(files), "done": 0},
+            "items": [{"index": i, "filename": name, "status": "pending"} for i, name in enumerate(files)],
+        }
+    return snapshot
+
+
+@router.post("", status_code=202)
+async def create_batch(
+    files: List[UploadFile] = File(...),
+    mode: Optional[str] = Query(None, description="OCR mode: two_stage | fused (default: OCR_MODE)"),
+    offline: bool = Query(False, description="OCR через Message Batches API (дешевше, до 24 год)"),
+) -> Dict:
+    """
+    Batch перевірка: Quick + Full для кожної етикетки у фоні
+
+    Args:
+        files: Файли етикеток (JPEG, PNG, WebP, PDF) та/або zip архіви з ними
+        mode: OCR mode для всіх файлів
+        offline: OCR всіх файлів через Message Batches API (завжди two_stage),
+            потім валідація як у /full
+
+    Returns:
+        {
+            "job_id": "uuid",
+            "status": "running",
+            "progress": {...},
+            "skipped": [файли непідтримуваних типів з архівів],
+            "status_url": "...",
+            "summary_url": "..."
+        }
+    """
+    checker._validate_mode(mode)
+    if offline and mode not in (None, OCR_MODE_TWO_STAGE):
+        raise HTTPException(status_code=400, detail="Offline batch supports only two_stage OCR mode")
+
+    job_id = str(uuid.uuid4())
+    workdir = Path(tempfile.mkdtemp(prefix=f"batch-{job_id[:8]}-"))
+    try:
+        uploads = []
+        for index, file in enumerate(files):
+            target = workdir / f"upload-{index:05d}"
+            await _save_upload(file, target, settings.batch_max_upload_size)
+            uploads.append(target)
+
+        items, skipped = await asyncio.to_thread(
+            collect_items,
+            uploads,
+            [file.filename or f"file-{index}" for index, file in enumerate(files)],
+            [file.content_type for file in files],
+            workdir,
+            settings.batch_max_items,
+            settings.max_file_size,
+        )
+    except HTTPException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+    except ValueError as e:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not items:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail="No label files found in upload")
+
+    job = BatchJob(job_id=job_id, items=items, workdir=workdir, mode=mode, offline=offline, skipped=skipped)
+    await _save_job(job)
+    if offline:
+        extracted: Dict[int, Dict] = {}
+        batch_service.start(
+            job,
+            lambda item: _process_item(item, mode, extracted.pop(item.index)),
+            _checkpoint,
+            prepare=lambda job: _extract_offline(job, extracted),
+        )
+    else:
+        batch_service.start(job, lambda item: _process_item(item, mode), _checkpoint)
+
+    logger.info(f"Batch started: {job_id} ({len(items)} files, {len(skipped)} skipped)")
+
+    return {
+        "job_id": job_id,
+        "status": job.status,
+        "progress": job.progress(),
+        "skipped": skipped,
+        "status_url": f"{router.prefix}/{job_id}",
+        "summary_url": f"{router.prefix}/{job_id}/summary",
+        "created_at": job.created_at
+    }
+
+
+@router.get("/{job_id}")
+async def get_batch(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+) -> Dict:
+    """
+    Прогрес batch та результати по файлах (сторінками)
+
+    Args:
+        job_id: UUID з POST /batch
+        offset: Перший файл сторінки
+        limit: Файлів на сторінку
+    """
+    snapshot = await _load_snapshot(job_id)
+    return {
+        **snapshot,
+        "items": snapshot.get("items", [])[offset:offset + limit],
+        "offset": offset,
+        "limit": limit,
+    }
+
+
+@router.get("/{job_id}/summary")
+async def get_batch_summary(
+    job_id: str,
+    format: str = Query("json", pattern="^(json|csv)$"),
+):
+    """
+    Агрегований підсумок batch: JSON (totals + items) або CSV (рядок на файл)
+
+    Args:
+        job_id: UUID з POST /batch
+        format: json | csv
+    """
+    snapshot = await _load_snapshot(job_id)
+    if format == "csv":
+        return Response(
+            content=summary_csv(snapshot),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="batch_{job_id[:8]}.csv"'},
+        )
+    return aggregate_summary(snapshot)
@@ -19,9 +19,38 @@ class Settings(BaseSettings):
     # API Keys
     claude_api_key: str = Field(..., alias="CLAUDE_API_KEY")
     
+    # Claude client
+    claude_max_concurrency: int = Field(default=16, alias="CLAUDE_MAX_CONCURRENCY")  # одночасних запитів на worker
+    claude_timeout: float = Field(default=120.0, alias="CLAUDE_TIMEOUT")  # seconds
+    claude_max_retries: int = Field(default=2, alias="CLAUDE_MAX_RETRIES")
+    claude_prompt_cache_enabled: bool = Field(default=True, alias="CLAUDE_PROMPT_CACHE_ENABLED")  # cache_control на статичних промптах
+    
+    # Claude Message Batches API (offline OCR для batch перевірок)
+    claude_batch_base_url: str = Field(default="https://api.anthropic.com", alias="CLAUDE_BATCH_BASE_URL")
+    claude_batch_poll_interval: float = Field(default=60.0, alias="CLAUDE_BATCH_POLL_INTERVAL")  # seconds
+    claude_batch_timeout: float = Field(default=24 * 3600, alias="CLAUDE_BATCH_TIMEOUT")  # seconds
+    
+    # OCR mode: "two_stage" (vision → text → JSON) or "fused" (one vision call)
+    ocr_mode: str = Field(default="two_stage", alias="OCR_MODE")
+    
+    # OCR result cache (SQLite)
+    ocr_cache_enabled: bool = Field(default=True, alias="OCR_CACHE_ENABLED")
+    ocr_cache_path: str = Field(default="./cache/ocr_cache.sqlite3", alias="OCR_CACHE_PATH")
+    ocr_cache_max_entries: int = Field(default=5000, alias="OCR_CACHE_MAX_ENTRIES")
+    ocr_cache_ttl: int = Field(default=30 * 24 * 3600, alias="OCR_CACHE_TTL")  # seconds
+    
     # Database (Supabase)
     supabase_url: str = Field(..., alias="SUPABASE_URL")
     supabase_key: str = Field(..., alias="SUPABASE_KEY")
+    supabase_timeout: float = Field(default=10.0, alias="SUPABASE_TIMEOUT")  # seconds, per call
+    supabase_pool_size: int = Field(default=20, alias="SUPABASE_POOL_SIZE")  # connections per event loop
+    supabase_http2: bool = Field(default=True, alias="SUPABASE_HTTP2")
+    
+    # Direct Postgres fast path for reference tables (empty DSN - disabled, reads go through PostgREST)
+    postgres_reference_dsn: str = Field(default="", alias="POSTGRES_REFERENCE_DSN")
+    postgres_pool_min_size: int = Field(default=1, alias="POSTGRES_POOL_MIN_SIZE")
+    postgres_pool_max_size: int = Field(default=10, alias="POSTGRES_POOL_MAX_SIZE")
+    postgres_command_timeout: float = Field(default=5.0, alias="POSTGRES_COMMAND_TIMEOUT")  # seconds
     
     # CORS
     allowed_origins: str = Field(
@@ -33,6 +62,19 @@ class Settings(BaseSettings):
     max_file_size: int = Field(default=10485760, alias="MAX_FILE_SIZE")  # 10MB
     upload_dir: str = Field(default="./uploads", alias="UPLOAD_DIR")
     
+    # /quick/stream: keepalive interval for server-sent events
+    sse_keepalive_interval: float = Field(default=10.0, alias="SSE_KEEPALIVE_INTERVAL")  # seconds
+    
+    # Image pre-processing before Claude Vision upload
+    image_preprocessing_enabled: bool = Field(default=True, alias="IMAGE_PREPROCESSING_ENABLED")
+    vision_max_edge: int = Field(default=1568, alias="VISION_MAX_EDGE")  # px
+    vision_max_pixels: int = Field(default=1_150_000, alias="VISION_MAX_PIXELS")
+    vision_jpeg_quality: int = Field(default=90, alias="VISION_JPEG_QUALITY")
+    
+    # PDF labels (text layer or rasterization)
+    pdf_render_dpi: int = Field(default=200, alias="PDF_RENDER_DPI")
+    pdf_max_pages: int = Field(default=10, alias="PDF_MAX_PAGES")
+    
     # Email Service (optional)
     smtp_host: str = Field(default="smtp.gmail.com", alias="SMTP_HOST")
     smtp_port: int = Field(default=587, alias="SMTP_PORT")
@@ -43,6 +85,46 @@ class Settings(BaseSettings):
     # Rate Limiting
     rate_limit_per_minute: int = Field(default=60, alias="RATE_LIMIT_PER_MINUTE")
     
+    # Memoized ingredient parse results (SubstanceMapperService.parse_ingredient)
+    parse_cache_ttl: int = Field(default=600, alias="PARSE_CACHE_TTL")  # seconds
+    parse_cache_max_entries: int = Field(default=5000, alias="PARSE_CACHE_MAX_ENTRIES")
+    
+    # Fuzzy ingredient name suggestions (trigram index; не використовується для збігу)
+    fuzzy_suggest_threshold: float = Field(default=0.3, alias="FUZZY_SUGGEST_THRESHOLD")  # кандидати для "не знайдено"
+    
+    # Batch checks (/api/check-label/batch)
+    batch_max_items: int = Field(default=2000, alias="BATCH_MAX_ITEMS")  # етикеток на job
+    batch_max_upload_size: int = Field(default=1024 * 1024 * 1024, alias="BATCH_MAX_UPLOAD_SIZE")  # 1GB на файл / архів
+    batch_concurrency: int = Field(default=8, alias="BATCH_CONCURRENCY")  # одночасних етикеток на job
+    batch_checkpoint_interval: int = Field(default=25, alias="BATCH_CHECKPOINT_INTERVAL")  # файлів між чекпойнтами
+    batch_offline_chunk_size: int = Field(default=200, alias="BATCH_OFFLINE_CHUNK_SIZE")  # етикеток на один Message Batch
+    
+    # Asynchronous /full (local job queue)
+    full_check_async: bool = Field(default=False, alias="FULL_CHECK_ASYNC")  # default для ?async
+    full_check_workers: int = Field(default=4, alias="FULL_CHECK_WORKERS")
+    full_check_queue_size: int = Field(default=1000, alias="FULL_CHECK_QUEUE_SIZE")  # задач в очікуванні
+    
+    # /full validators (dosage, forbidden phrases, mandatory fields)
+    validator_timeout: float = Field(default=30.0, alias="VALIDATOR_TIMEOUT")  # seconds
+    validator_workers: int = Field(default=12, alias="VALIDATOR_WORKERS")  # потоків валідаторів (3 на /full)
+    
+    # Reference data snapshots (substance_form_conversions тощо)
+    reference_cache_ttl: int = Field(default=3600, alias="REFERENCE_CACHE_TTL")  # seconds
+    # One-call ingredient classification (requires supabase_classify_ingredients_migration.sql)
+    classify_rpc_enabled: bool = Field(default=False, alias="CLASSIFY_RPC_ENABLED")
+    
+    # Shared reference lookup cache (спільний для worker'ів при CACHE_BACKEND=redis)
+    cache_backend: str = Field(default="memory", alias="CACHE_BACKEND")  # memory | redis
+    redis_url: str = Field(default="redis://localhost:6379/0", alias="REDIS_URL")
+    cache_key_prefix: str = Field(default="labelcheck", alias="CACHE_KEY_PREFIX")
+    cache_max_entries: int = Field(default=10000, alias="CACHE_MAX_ENTRIES")  # memory backend
+    
+    # Precompiled regulatory snapshot (scripts/build_regulatory_snapshot.py)
+    regulatory_snapshot_path: str = Field(default="./cache/regulatory_snapshot.sqlite3", alias="REGULATORY_SNAPSHOT_PATH")  # "" - вимкнено
+    regulatory_snapshot_check_interval: float = Field(default=30.0, alias="REGULATORY_SNAPSHOT_CHECK_INTERVAL")  # seconds
+    # Published dataset versions (scripts/update_regulations.py → hot invalidation)
+    dataset_version_check_interval: float = Field(default=10.0, alias="DATASET_VERSION_CHECK_INTERVAL")  # seconds, 0 - вимкнено
+    
     @property
     def origins_list(self) -> List[str]:
         """Convert comma-separated origins string to list"""
@@ -0,0 +1,109 @@
+"""Watcher of the published regulatory dataset version (hot cache invalidation)"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from app.config import settings
+from app.db.regulatory_sync import latest_dataset_version
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetVersionWatcher:
+    """
+    Опитування версії датасету, яку публікує scripts/update_regulations.py
+
+    Кожні check_interval секунд читається остання версія; якщо вона
+    новіша за побачену - викликаються listeners лише тих таблиць, чий хеш
+    змінився (перебудова TableSnapshot, інвалідація ключів кешу).
+    Оновлення регуляцій застосовується за секунди без рестарту.
+    """
+
+    def __init__(self, check_interval: float = 10.0):
+        self.check_interval = check_interval
+        self.version: Optional[int] = None
+        self.table_hashes: Dict[str, str] = {}
+        self._listeners: Dict[str, List[Callable[[], None]]] = defaultdict(list)
+        self._started_at = datetime.now(timezone.utc)
+        self._task: Optional[asyncio.Task] = None
+
+    def add_listener(self, table: str, callback: Callable[[], None]) -> None:
+        """Викликати callback, коли зміниться вміст table"""
+        self._listeners[table].append(callback)
+
+    def apply(self, latest: Optional[Dict]) -> List[str]:
+        """
+        Обробити останню опубліковану версію
+
+        Перша побачена версія лише запам'ятовується - дані процес і так
+        завантажує після старту; виняток - версія, опублікована вже після
+        старту (її changed_tables інвалідуються).
+
+        Returns:
+            Таблиці, для яких викликано listeners
+        """
+        if not latest or latest.get("version") is None:
+            return []
+        version = latest["version"]
+        hashes = latest.get("table_hashes") or {}
+        if self.version is not None and version <= self.version:
+            return []
+
+        if self.version is None:
+            changed = list(latest.get("changed_tables") or []) if self._published_after_start(latest) else []
+        else:
+            changed = sorted(
+                table for table in set(hashes) | set(self.table_hashes)
+                if hashes.get(table) != self.table_hashes.get(table)
+            )
+        self.version = version
+        self.table_hashes = dict(hashes)
+
+        for table in changed:
+            for callback in list(self._listeners.get(table, ())):
+                try:
+                    callback()
+                except Exception as e:
+                    logger.warning(f"Dataset version listener for {table} failed: {e}")
+        if changed:
+            logger.info(f"📦 Regulatory dataset version {version}: invalidated {changed}")
+        return changed
+
+    def _published_after_start(self, latest: Dict) -> bool:
+        try:
+            published_at = datetime.fromisoformat(str(latest.get("published_at")))
+        except ValueError:
+            return False
+        if published_at.tzinfo is None:
+            published_at = published_at.replace(tzinfo=timezone.utc)
+        return published_at >= self._started_at
+
+    def check(self, client) -> List[str]:
+        """Прочитати останню версію (блокуючий запит) та застосувати її"""
+        return self.apply(latest_dataset_version(client))
+
+    def start(self, client) -> None:
+        """Запустити фонове опитування на поточному event loop"""
+        if self._task is None and self.check_interval > 0:
+            self._task = asyncio.create_task(self._run(client))
+
+    async def stop(self) -> None:
+        """Зупинити опитування (при зупинці застосунку)"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self, client) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await asyncio.to_thread(self.check, client)
+            except Exception as e:
+                logger.debug(f"Dataset version check failed: {e}")
+
+
+dataset_version = DatasetVersionWatcher(check_interval=settings.dataset_version_check_interval)
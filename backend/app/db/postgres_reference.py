@@ -0,0 +1,251 @@
+"""Direct Postgres fast path for read-heavy reference tables (bypasses PostgREST)"""
+
+import asyncio
+import concurrent.futures
+import json
+import logging
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Таблиці, які читаються напряму з Postgres → колонки з назвами
+REFERENCE_READ_TABLES: Dict[str, Tuple[str, ...]] = {
+    "allowed_vitamins_minerals": ("substance_name_ua", "substance_name_en"),
+    "efsa_limits": ("substance_name_ua", "substance_name_en"),
+    "max_doses_table1": ("substance_name_ua", "substance_name_en"),
+    "substance_form_conversions": ("substance_name_ua", "substance_name_en"),
+    "allowed_plants": ("botanical_name_lat", "common_name_ua", "botanical_family_ua"),
+    "excipients": ("excipient_name_ua", "excipient_name_en"),
+}
+
+
+def like_escape(value: str) -> str:
+    """Екранувати %, _ та \\ для LIKE/ILIKE (назва шукається буквально)"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _jsonable(value: Any) -> Any:
+    """Значення asyncpg → як у JSON відповіді PostgREST"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, list):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def _row(record) -> Dict:
+    return {key: _jsonable(value) for key, value in dict(record).items()}
+
+
+def _check_table(table: str, columns: Iterable[str] = ()) -> None:
+    """Ідентифікатори в SQL лише з білого списку (не з вводу користувача)"""
+    allowed = REFERENCE_READ_TABLES.get(table)
+    if allowed is None:
+        raise ValueError(f"Table {table} is not served by the Postgres fast path")
+    for column in columns:
+        if column not in allowed and column != "category":
+            raise ValueError(f"Column {column} is not a name column of {table}")
+
+
+def matching_sql(table: str, columns: Sequence[str], filters: Sequence[str] = ()) -> str:
+    """
+    SELECT усіх рядків, де будь-яка з columns ILIKE будь-якого шаблону з $1
+
+    Текст запиту залежить лише від таблиці/колонок/ключів фільтрів, тож
+    asyncpg готує його один раз на з'єднання (кеш prepared statements),
+    а всі назви інгредієнтів передаються одним масивом.
+    """
+    _check_table(table, [*columns, *filters])
+    conditions = " OR ".join(f'"{column}" ILIKE ANY($1::text[])' for column in columns)
+    sql = f'SELECT * FROM "{table}" WHERE ({conditions})'
+    for position, key in enumerate(filters, start=2):
+        sql += f' AND "{key}" = ANY(${position}::text[])'
+    return sql + " ORDER BY id"
+
+
+class PostgresReferenceRepository:
+    """
+    Читання довідкових таблиць напряму з Postgres (asyncpg пул)
+
+    Пул створюється на event loop застосунку (startup). Валідатори /full
+    працюють у власних потоках з власними loop - їхні запити передаються
+    в loop пулу (run_coroutine_threadsafe), тож пул один на процес.
+    Для Supabase DSN має вказувати на пряме з'єднання або session pooler
+    (порт 5432): transaction pooler не підтримує prepared statements.
+
+    Requires: asyncpg
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str],
+        min_size: int = 1,
+        max_size: int = 10,
+        command_timeout: float = 5.0,
+        schema: Optional[str] = None,
+    ):
+        """
+        Args:
+            dsn: postgresql://... (порожній - fast path вимкнено)
+            min_size / max_size: Розмір пулу з'єднань
+            command_timeout: Таймаут одного запиту, с
+            schema: search_path з'єднань (тести на локальному Postgres)
+        """
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.command_timeout = command_timeout
+        self.schema = schema
+        self._pool = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Пул запущено - сервіси читають довідкові таблиці напряму"""
+        return self._pool is not None
+
+    async def start(self, pool: Any = None) -> None:
+        """
+        Створити пул на поточному event loop
+
+        Args:
+            pool: Готовий пул (локальний stand-in)
+
+        Raises:
+            RuntimeError: asyncpg не встановлено
+        """
+        if pool is None:
+            try:
+                import asyncpg
+            except ImportError:
+                raise RuntimeError(
+                    "POSTGRES_REFERENCE_DSN requires the asyncpg package (pip install asyncpg)"
+                )
+
+            async def init(conn) -> None:
+                # jsonb (name_variations тощо) - як у PostgREST, а не рядком
+                for type_name in ("json", "jsonb"):
+                    await conn.set_type_codec(
+                        type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+                    )
+
+            pool = await asyncpg.create_pool(
+                self.dsn,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                command_timeout=self.command_timeout,
+                server_settings={"search_path": self.schema} if self.schema else None,
+                init=init,
+            )
+        self._pool = pool
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+
+    async def close(self) -> None:
+        """Закрити пул (при зупинці застосунку)"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await pool.close()
+        self._loop = None
+        self._loop_thread = None
+
+    async def _call(self, query: Callable[..., Any], *args) -> Any:
+        """Виконати корутину query на loop пулу (з будь-якого loop)"""
+        if self._pool is None:
+            raise RuntimeError("Postgres reference pool is not started")
+        if asyncio.get_running_loop() is self._loop:
+            return await query(*args)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(query(*args), self._loop))
+
+    def blocking(self, query: Callable[..., Any], *args) -> Any:
+        """
+        Виконати запит із синхронного коду іншого потоку (валідатори /full)
+
+        Raises:
+            RuntimeError: Виклик з потоку loop пулу - очікування заблокувало б
+                той самий loop, що має виконати запит
+        """
+        if self._pool is None:
+            raise RuntimeError("Postgres reference pool is not started")
+        if threading.get_ident() == self._loop_thread:
+            raise RuntimeError("Blocking Postgres call on the pool's event loop")
+        future = asyncio.run_coroutine_threadsafe(query(*args), self._loop)
+        try:
+            return future.result(self.command_timeout + 1)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def _fetch(self, sql: str, *args) -> List[Dict]:
+        async with self._pool.acquire() as conn:
+            return [_row(record) for record in await conn.fetch(sql, *args)]
+
+    async def fetch_all(self, table: str) -> List[Dict]:
+        """Всі рядки таблиці (порядок id, як у снапшоті)"""
+        _check_table(table)
+        return await self._call(self._fetch, f'SELECT * FROM "{table}" ORDER BY id')
+
+    async def fetch_matching(
+        self,
+        table: str,
+        columns: Sequence[str],
+        names: Sequence[str],
+        filters: Optional[Dict[str, str]] = None,
+    ) -> List[Dict]:
+        """
+        Рядки, де будь-яка з columns містить будь-яку з names
+        (аналог ILIKE '%name%') - один запит на весь список назв
+
+        Args:
+            filters: Додаткові рівності {колонка: значення}
+        """
+        filters = filters or {}
+        patterns = [f"%{like_escape(name)}%" for name in dict.fromkeys(names) if name]
+        if not patterns:
+            return []
+        sql = matching_sql(table, columns, list(filters))
+        return await self._call(self._fetch, sql, patterns, *([value] for value in filters.values()))
+
+    async def first_by_prefix(
+        self,
+        table: str,
+        columns: Sequence[str],
+        name: str,
+        categories: Optional[List[str]] = None,
+    ) -> Optional[Dict]:
+        """
+        Аналог PostgREST ILIKE 'name%' LIMIT 1 по колонках по черзі
+
+        Один запит по всіх колонках; перевага - першій колонці, далі
+        найменший id (як RegulatorySnapshot.find_prefix).
+        """
+        sql = matching_sql(table, columns, ("category",) if categories is not None else ())
+        args = [[f"{like_escape(name)}%"]]
+        if categories is not None:
+            args.append(list(categories))
+        rows = await self._call(self._fetch, sql, *args)
+        needle = name.lower()
+        for column in columns:
+            for row in rows:
+                if str(row.get(column) or "").lower().startswith(needle):
+                    return row
+        return None
+
+
+postgres_reference = PostgresReferenceRepository(
+    settings.postgres_reference_dsn,
+    min_size=settings.postgres_pool_min_size,
+    max_size=settings.postgres_pool_max_size,
+    command_timeout=settings.postgres_command_timeout,
+)
@@ -0,0 +1,339 @@
+"""Precompiled regulatory snapshot: all reference tables in one versioned SQLite file"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+# Довідкові таблиці, які потрапляють у снапшот
+REFERENCE_TABLES: Tuple[str, ...] = (
+    "allowed_vitamins_minerals",
+    "efsa_limits",
+    "max_doses_table1",
+    "amino_acids",
+    "allowed_plants",
+    "microorganisms",
+    "novel_foods",
+    "other_substances",
+    "banned_substances",
+    "excipients",
+    "substance_form_conversions",
+    "forbidden_phrases",
+    "mandatory_fields",
+)
+
+# Колонки з назвами, для яких будується індекс пошуку по префіксу (ILIKE 'x%')
+NAME_INDEX_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "allowed_vitamins_minerals": ("substance_name_ua", "substance_name_en"),
+    "efsa_limits": ("substance_name_ua", "substance_name_en"),
+    "max_doses_table1": ("substance_name_ua", "substance_name_en"),
+    "amino_acids": ("amino_acid_name_ua", "amino_acid_name_en"),
+    "allowed_plants": ("botanical_name_lat", "common_name_ua", "botanical_family_ua"),
+    "microorganisms": ("genus",),
+    "novel_foods": ("substance_name_ua", "substance_name_en"),
+    "other_substances": ("substance_name_ua", "substance_name_en"),
+    "banned_substances": ("substance_name_ua", "substance_name_en"),
+    "excipients": ("excipient_name_ua", "excipient_name_en"),
+}
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE rows (table_name TEXT NOT NULL, row_id INTEGER NOT NULL, data TEXT NOT NULL,
+                   PRIMARY KEY (table_name, row_id));
+CREATE TABLE name_index (table_name TEXT NOT NULL, column_name TEXT NOT NULL,
+                         name TEXT NOT NULL, row_id INTEGER NOT NULL);
+"""
+
+
+def normalize_name(value: object) -> str:
+    """Ключ індексу: нижній регістр, без зайвих пробілів"""
+    return " ".join(str(value).split()).lower()
+
+
+def content_version(tables: Dict[str, List[Dict]]) -> str:
+    """Версія снапшоту - хеш вмісту (однакові дані - однакова версія)"""
+    digest = hashlib.sha256()
+    for table in sorted(tables):
+        digest.update(table.encode("utf-8"))
+        digest.update(json.dumps(tables[table], sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def export_tables(client, tables: Iterable[str] = REFERENCE_TABLES, page_size: int = 1000) -> Dict[str, List[Dict]]:
+    """
+    Вивантажити довідкові таблиці з Supabase (сторінками по page_size)
+
+    Помилка будь-якої таблиці перериває експорт - неповний снапшот не публікується.
+    """
+    exported: Dict[str, List[Dict]] = {}
+    for table in tables:
+        rows: List[Dict] = []
+        while True:
+            page = client.table(table).select("*").order("id").range(
+                len(rows), len(rows) + page_size - 1
+            ).execute().data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+        exported[table] = rows
+        logger.info(f"   {table}: {len(rows)} rows")
+    return exported
+
+
+def build_snapshot(tables: Dict[str, List[Dict]], path: str) -> Dict:
+    """
+    Записати снапшот у файл атомарно (tmp + os.replace)
+
+    API процеси, що читають старий файл, не бачать напівзаписаного снапшоту.
+
+    Args:
+        tables: {таблиця: рядки}
+        path: Шлях до файлу снапшоту
+
+    Returns:
+        Метадані снапшоту ({"version", "built_at", "tables": {таблиця: к-сть рядків}})
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "version": content_version(tables),
+        "built_at": datetime.utcnow().isoformat(),
+        "tables": {table: len(rows) for table, rows in tables.items()},
+    }
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{target.name}-", dir=str(target.parent))
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(SCHEMA)
+            conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in meta.items()],
+            )
+            for table, rows in tables.items():
+                conn.executemany(
+                    "INSERT INTO rows (table_name, row_id, data) VALUES (?, ?, ?)",
+                    [
+                        (table, row_id, json.dumps(row, ensure_ascii=False, default=str))
+                        for row_id, row in enumerate(rows)
+                    ],
+                )
+                conn.executemany(
+                    "INSERT INTO name_index (table_name, column_name, name, row_id) VALUES (?, ?, ?, ?)",
+                    [
+                        (table, column, normalize_name(row[column]), row_id)
+                        for column in NAME_INDEX_COLUMNS.get(table, ())
+                        for row_id, row in enumerate(rows)
+                        if row.get(column)
+                    ],
+                )
+            conn.execute("CREATE INDEX name_index_lookup ON name_index (table_name, column_name, name, row_id)")
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, target)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+    logger.info(f"📦 Regulatory snapshot {meta['version']} written to {target}: {meta['tables']}")
+    return meta
+
+
+def publish_snapshot(client, path: str) -> Dict:
+    """
+    Зібрати снапшот з поточних даних Supabase та атомарно замінити файл
+
+    API процеси підхоплять нову версію протягом REGULATORY_SNAPSHOT_CHECK_INTERVAL.
+
+    Returns:
+        Метадані снапшоту
+    """
+    logger.info(f"📦 Exporting {len(REFERENCE_TABLES)} reference tables...")
+    return build_snapshot(export_tables(client), path)
+
+
+class RegulatorySnapshot:
+    """
+    Завантажений снапшот: рядки всіх довідкових таблиць + індекси назв
+
+    Незмінний після завантаження, тож безпечний для потоків валідаторів;
+    нова версія завантажується в новий об'єкт і підміняється цілком.
+    """
+
+    def __init__(self, meta: Dict, tables: Dict[str, List[Dict]], indexes: Dict[Tuple[str, str], Tuple[List[str], List[int]]]):
+        self.meta = meta
+        self.version: str = meta["version"]
+        self._tables = tables
+        self._indexes = indexes
+
+    @classmethod
+    def load(cls, path: str) -> "RegulatorySnapshot":
+        """
+        Прочитати файл снапшоту (read-only) і завантажити його в пам'ять
+
+        Рядки декодуються в dict один раз; з'єднання закривається одразу,
+        пошук далі йде по індексах у пам'яті, без запитів до SQLite.
+        """
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            meta = {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM meta")}
+            if meta.get("format") != SNAPSHOT_FORMAT:
+                raise ValueError(f"Unsupported snapshot format: {meta.get('format')}")
+
+            tables: Dict[str, List[Dict]] = {table: [] for table in meta["tables"]}
+            for table, data in conn.execute("SELECT table_name, data FROM rows ORDER BY table_name, row_id"):
+                tables[table].append(json.loads(data))
+
+            indexes: Dict[Tuple[str, str], Tuple[List[str], List[int]]] = {}
+            for table, column, name, row_id in conn.execute(
+                "SELECT table_name, column_name, name, row_id FROM name_index "
+                "ORDER BY table_name, column_name, name, row_id"
+            ):
+                names, row_ids = indexes.setdefault((table, column), ([], []))
+                names.append(name)
+                row_ids.append(row_id)
+        finally:
+            conn.close()
+        return cls(meta, tables, indexes)
+
+    def has(self, table: str) -> bool:
+        """Чи є таблиця у снапшоті"""
+        return table in self._tables
+
+    def rows(self, table: str) -> List[Dict]:
+        """
+        Всі рядки таблиці (не змінювати - спільні для всіх запитів)
+
+        Raises:
+            KeyError: Таблиці немає у снапшоті
+        """
+        return self._tables[table]
+
+    def find_prefix(
+        self,
+        table: str,
+        column: str,
+        prefix: str,
+        predicate: Optional[Callable[[Dict], bool]] = None,
+    ) -> Optional[Dict]:
+        """
+        Перший рядок, де column починається з prefix (аналог ILIKE 'prefix%' LIMIT 1)
+
+        Args:
+            predicate: Додатковий фільтр рядка (напр. category IN (...))
+        """
+        names, row_ids = self._indexes.get((table, column), ([], []))
+        prefix = normalize_name(prefix)
+        rows = self._tables[table]
+        matches = []
+        for position in range(bisect_left(names, prefix), len(names)):
+            if not names[position].startswith(prefix):
+                break
+            matches.append(row_ids[position])
+        for row_id in sorted(matches):
+            if predicate is None or predicate(rows[row_id]):
+                return rows[row_id]
+        return None
+
+    def search(self, table: str, columns: Iterable[str], needle: str) -> List[Dict]:
+        """Рядки, де будь-яка з columns містить needle (аналог ILIKE '%needle%')"""
+        needle = needle.lower()
+        return [
+            row for row in self._tables[table]
+            if any(row.get(column) and needle in str(row[column]).lower() for column in columns)
+        ]
+
+
+class RegulatorySnapshotStore:
+    """
+    Поточний снапшот процесу з hot-reload
+
+    Файл перевіряється (stat) не частіше ніж раз на check_interval секунд;
+    якщо його замінено (update_regulations.py публікує нову версію) -
+    снапшот перечитується, а зареєстровані listeners (інвалідація
+    похідних кешів) викликаються.
+    """
+
+    def __init__(self, path: Optional[str], check_interval: float = 30.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot: Optional[RegulatorySnapshot] = None
+        self._file_state: Optional[Tuple[int, int, int]] = None
+        self._checked_at: Optional[float] = None
+        self._listeners: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Викликати callback після завантаження нової версії"""
+        self._listeners.append(callback)
+
+    def current(self) -> Optional[RegulatorySnapshot]:
+        """Снапшот або None (файлу немає - сервіси читають Supabase напряму)"""
+        if not self.path:
+            return None
+        if self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+        return self._snapshot
+
+    def reload(self, force: bool = False) -> Optional[RegulatorySnapshot]:
+        """Перечитати файл, якщо він змінився (force - завжди)"""
+        if not self.path:
+            return self._snapshot
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                if self._snapshot is not None:
+                    logger.warning(f"Regulatory snapshot {self.path} disappeared, serving version {self._snapshot.version}")
+                return self._snapshot
+
+            file_state = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if not force and file_state == self._file_state:
+                return self._snapshot
+
+            try:
+                snapshot = RegulatorySnapshot.load(self.path)
+            except Exception as e:
+                logger.error(f"Could not load regulatory snapshot {self.path}: {e}")
+                return self._snapshot
+
+            self._file_state = file_state
+            previous = self._snapshot
+            self._snapshot = snapshot
+            if previous is not None and previous.version == snapshot.version:
+                return snapshot
+
+        logger.info(
+            f"📦 Regulatory snapshot {snapshot.version} loaded "
+            f"(built {snapshot.meta.get('built_at')}): {snapshot.meta.get('tables')}"
+        )
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Snapshot reload listener failed: {e}")
+        return snapshot
+
+
+regulatory_snapshot = RegulatorySnapshotStore(
+    settings.regulatory_snapshot_path,
+    check_interval=settings.regulatory_snapshot_check_interval,
+)
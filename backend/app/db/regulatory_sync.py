@@ -0,0 +1,186 @@
+"""Content-hash delta sync of regulatory datasets and published dataset versions"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Таблиця з опублікованими версіями датасету (supabase_dataset_versions_migration.sql)
+DATASET_VERSIONS_TABLE = "regulatory_dataset_versions"
+
+# Службові колонки БД, що не входять у хеш вмісту
+IGNORED_COLUMNS = frozenset({"id", "created_at", "updated_at"})
+
+
+def _canonical(value):
+    """800.0 і 800 (JSON vs numeric з БД) - однакове значення"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    return value
+
+
+def row_hash(row: Dict, columns: Optional[Iterable[str]] = None) -> str:
+    """
+    Хеш вмісту рядка
+
+    Args:
+        row: Рядок (JSON запис або рядок БД)
+        columns: Колонки для хешу (None - всі, крім службових); колонка,
+            якої немає в рядку, вважається null
+    """
+    if columns is None:
+        columns = [column for column in row if column not in IGNORED_COLUMNS]
+    canonical = {column: _canonical(row.get(column)) for column in sorted(columns)}
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def table_hash(rows: Iterable[Dict], columns: Optional[Iterable[str]] = None) -> str:
+    """Хеш таблиці - не залежить від порядку рядків"""
+    columns = list(columns) if columns is not None else None
+    digest = hashlib.sha256()
+    for value in sorted(row_hash(row, columns) for row in rows):
+        digest.update(value.encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+def source_columns(records: Iterable[Dict]) -> List[str]:
+    """Колонки, якими керує джерело (JSON): об'єднання ключів записів без службових"""
+    columns = {column for record in records for column in record if column not in IGNORED_COLUMNS}
+    return sorted(columns)
+
+
+@dataclass
+class TableDiff:
+    """Різниця між джерелом та таблицею БД"""
+    table: str
+    key: str
+    columns: List[str]
+    inserts: List[Dict] = field(default_factory=list)  # нові записи (без id)
+    updates: List[Dict] = field(default_factory=list)  # змінені записи з id рядка БД
+    deletes: List[int] = field(default_factory=list)  # id рядків БД, яких немає в джерелі
+    unchanged: int = 0
+    source_hash: str = ""  # хеш таблиці після синхронізації
+    db_hash: str = ""  # хеш таблиці до синхронізації
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserts or self.updates or self.deletes)
+
+
+def diff_table(table: str, key: str, source: List[Dict], existing: List[Dict]) -> TableDiff:
+    """
+    Порівняти записи джерела з рядками БД по ключу та хешу вмісту
+
+    Хешуються лише колонки джерела, тож колонки, які є тільки в БД
+    (id, created_at), не дають хибних змін. Дублікати ключа в БД
+    (повторний seed) видаляються - лишається рядок з найменшим id.
+
+    Args:
+        table: Назва таблиці
+        key: Природний ключ запису (напр. field_name)
+        source: Записи джерела (JSON)
+        existing: Рядки БД (з id)
+    """
+    columns = source_columns(source)
+    diff = TableDiff(
+        table=table,
+        key=key,
+        columns=columns,
+        source_hash=table_hash(source, columns),
+        db_hash=table_hash(existing, columns),
+    )
+
+    by_key: Dict[str, Dict] = {}
+    for row in sorted(existing, key=lambda row: row.get("id") or 0):
+        row_key = row.get(key)
+        if row_key in by_key:
+            diff.deletes.append(row["id"])
+        else:
+            by_key[row_key] = row
+
+    seen = set()
+    for record in source:
+        record_key = record.get(key)
+        if record_key is None or record_key in seen:
+            logger.warning(f"   ⚠️  {table}: skipping record with empty/duplicate {key}={record_key!r}")
+            continue
+        seen.add(record_key)
+        payload = {column: record.get(column) for column in columns}
+        row = by_key.get(record_key)
+        if row is None:
+            diff.inserts.append(payload)
+        elif row_hash(row, columns) != row_hash(record, columns):
+            diff.updates.append({"id": row["id"], **payload})
+        else:
+            diff.unchanged += 1
+
+    diff.deletes.extend(row["id"] for row_key, row in by_key.items() if row_key not in seen)
+    return diff
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def apply_diff(client, diff: TableDiff, chunk_size: int = 500) -> Tuple[int, int, int]:
+    """
+    Застосувати різницю порціями: bulk insert, bulk upsert по id, delete ... in (id)
+
+    Returns:
+        (inserted, updated, deleted)
+    """
+    table = client.table
+    for chunk in _chunks(diff.inserts, chunk_size):
+        table(diff.table).insert(chunk).execute()
+    for chunk in _chunks(diff.updates, chunk_size):
+        table(diff.table).upsert(chunk, on_conflict="id").execute()
+    for chunk in _chunks(diff.deletes, chunk_size):
+        table(diff.table).delete().in_("id", chunk).execute()
+    return len(diff.inserts), len(diff.updates), len(diff.deletes)
+
+
+def fetch_rows(client, table: str, page_size: int = 1000) -> List[Dict]:
+    """Всі рядки таблиці сторінками (PostgREST повертає max 1000 за запит)"""
+    rows: List[Dict] = []
+    while True:
+        page = client.table(table).select("*").order("id").range(
+            len(rows), len(rows) + page_size - 1
+        ).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+
+def latest_dataset_version(client) -> Optional[Dict]:
+    """Остання опублікована версія ({"version", "table_hashes", "changed_tables", "published_at"}) або None"""
+    result = client.table(DATASET_VERSIONS_TABLE).select("*").order("version", desc=True).limit(1).execute()
+    return result.data[0] if result.data else None
+
+
+def publish_dataset_version(client, table_hashes: Dict[str, str], changed_tables: List[str]) -> Dict:
+    """
+    Опублікувати нову версію датасету (version призначає БД)
+
+    API процеси опитують останню версію (DatasetVersionWatcher) і
+    інвалідують кеші лише змінених таблиць.
+
+    Args:
+        table_hashes: Хеші всіх таблиць, якими керує синхронізація
+        changed_tables: Таблиці, змінені цим оновленням
+    """
+    previous = latest_dataset_version(client)
+    hashes = {**((previous or {}).get("table_hashes") or {}), **table_hashes}
+    result = client.table(DATASET_VERSIONS_TABLE).insert({
+        "table_hashes": hashes,
+        "changed_tables": sorted(changed_tables),
+    }).execute()
+    return result.data[0] if result.data else {"table_hashes": hashes, "changed_tables": sorted(changed_tables)}
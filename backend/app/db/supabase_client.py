@@ -1,23 +1,90 @@
 """Supabase database client"""
 
 from supabase import create_client, Client
-from typing import Optional, Dict, List
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from typing import Any, Optional, Dict, List
+import asyncio
 import logging
+import ssl
+import threading
+
+import certifi
+import httpx
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """
+    Async PostgREST клієнт з обмеженим keep-alive пулом з'єднань
+    
+    Стандартний AsyncPostgrestClient створює httpx.AsyncClient без
+    обмежень пулу; тут розмір пулу та HTTP/2 задаються налаштуваннями.
+    SSL контекст спільний для всіх клієнтів (його створення - десятки мс).
+    """
+    
+    _ssl_context: Optional[ssl.SSLContext] = None
+    
+    def __init__(self, base_url: str, *, transport: Optional[httpx.AsyncBaseTransport] = None, **kwargs):
+        # create_session викликається з BasePostgrestClient.__init__
+        self._transport = transport
+        super().__init__(base_url, **kwargs)
+    
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout: Any,
+        verify: bool = True,
+        proxy: Optional[str] = None,
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=self._shared_ssl_context() if verify is True else verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=settings.supabase_http2,
+            limits=httpx.Limits(
+                max_connections=settings.supabase_pool_size,
+                max_keepalive_connections=settings.supabase_pool_size,
+            ),
+            transport=self._transport,
+        )
+    
+    @classmethod
+    def _shared_ssl_context(cls) -> ssl.SSLContext:
+        if cls._ssl_context is None:
+            cls._ssl_context = ssl.create_default_context(cafile=certifi.where())
+        return cls._ssl_context
+
+
 class SupabaseClient:
-    """Supabase database client"""
+    """
+    Supabase database client
+    
+    client - синхронний клієнт supabase (скрипти, опитування версії
+    датасету). insert/select/update/delete та table/rpc + execute - справді
+    async: запити йдуть через PooledPostgrestClient на loop застосунку і
+    не блокують event loop.
+    """
     
     _instance: Optional['SupabaseClient'] = None
     _client: Optional[Client] = None
+    # Транспорт async клієнта (локальний stand-in для тестів, напр. httpx.MockTransport)
+    transport: Optional[httpx.AsyncBaseTransport] = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            # Пул async клієнта живе на event loop застосунку (start)
+            cls._instance._loop = None
+            cls._instance._async_client = None
+            cls._instance._async_lock = threading.Lock()
         return cls._instance
     
     def __init__(self):
@@ -44,10 +111,85 @@ class SupabaseClient:
             self._initialize_client()
         return self._client
     
-    async def insert(self, table: str, data: Dict) -> Dict:
+    async def start(self) -> None:
+        """
+        Прив'язати пул async клієнта до поточного event loop (startup застосунку)
+        
+        Валідатори /full працюють у власних потоках з власними loop - їхні
+        запити передаються в loop пулу (run_coroutine_threadsafe), тож
+        keep-alive пул один на процес.
+        """
+        self._loop = asyncio.get_running_loop()
+    
+    def _create_async_client(self) -> PooledPostgrestClient:
+        return PooledPostgrestClient(
+            f"{settings.supabase_url.rstrip('/')}/rest/v1",
+            headers={
+                **DEFAULT_POSTGREST_CLIENT_HEADERS,
+                "apikey": settings.supabase_key,
+                "Authorization": f"Bearer {settings.supabase_key}",
+            },
+            timeout=settings.supabase_timeout,
+            transport=self.transport,
+        )
+    
+    def async_client(self) -> AsyncPostgrestClient:
+        """
+        Async PostgREST клієнт спільного пулу (keep-alive)
+        
+        Без start (скрипти, тести без startup застосунку) - тимчасовий
+        клієнт: його з'єднання закриваються після запиту.
+        """
+        if self._loop is None or self._loop.is_closed():
+            return self._create_async_client()
+        with self._async_lock:
+            if self._async_client is None:
+                self._async_client = self._create_async_client()
+            return self._async_client
+    
+    async def aclose(self) -> None:
+        """Закрити пул async клієнта (при зупинці застосунку)"""
+        with self._async_lock:
+            client, self._async_client = self._async_client, None
+            self._loop = None
+        if client is not None:
+            await client.aclose()
+    
+    async def _execute(self, query, timeout: Optional[float]):
+        """Виконати запит з таймаутом на виклик (None - SUPABASE_TIMEOUT)"""
+        timeout = timeout if timeout is not None else settings.supabase_timeout
+        client, loop = self._async_client, self._loop
+        if client is None or query.session is not client.session:
+            # Тимчасовий клієнт - закрити з'єднання одразу
+            try:
+                return await asyncio.wait_for(query.execute(), timeout)
+            finally:
+                await query.session.aclose()
+        if asyncio.get_running_loop() is loop:
+            return await asyncio.wait_for(query.execute(), timeout)
+        if loop is None or not loop.is_running():
+            raise RuntimeError("Supabase async client is closed")
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(asyncio.wait_for(query.execute(), timeout), loop)
+        )
+    
+    def table(self, table: str):
+        """Async query builder таблиці (фільтри, яких немає в select) - виконати через execute"""
+        return self.async_client().table(table)
+    
+    def rpc(self, function: str, params: Dict):
+        """Async виклик SQL функції - виконати через execute"""
+        return self.async_client().rpc(function, params)
+    
+    async def execute(self, query, timeout: Optional[float] = None) -> List[Dict]:
+        """Виконати запит з table/rpc, не блокуючи event loop"""
+        result = await self._execute(query, timeout)
+        return result.data or []
+    
+    async def insert(self, table: str, data: Dict, timeout: Optional[float] = None) -> Dict:
         """Insert data into table"""
         try:
-            result = self.client.table(table).insert(data).execute()
+            result = await self._execute(self.async_client().table(table).insert(data), timeout)
             return result.data[0] if result.data else {}
         except Exception as e:
             logger.error(f"Error inserting into {table}: {e}", exc_info=True)
@@ -57,17 +199,18 @@ class SupabaseClient:
         self,
         table: str,
         columns: str = "*",
-        filters: Optional[Dict] = None
+        filters: Optional[Dict] = None,
+        timeout: Optional[float] = None
     ) -> List[Dict]:
         """Select data from table"""
         try:
-            query = self.client.table(table).select(columns)
+            query = self.async_client().table(table).select(columns)
             
             if filters:
                 for key, value in filters.items():
                     query = query.eq(key, value)
             
-            result = query.execute()
+            result = await self._execute(query, timeout)
             return result.data
         except Exception as e:
             logger.error(f"Error selecting from {table}: {e}", exc_info=True)
@@ -77,30 +220,31 @@ class SupabaseClient:
         self,
         table: str,
         data: Dict,
-        filters: Dict
+        filters: Dict,
+        timeout: Optional[float] = None
     ) -> Dict:
         """Update data in table"""
         try:
-            query = self.client.table(table).update(data)
+            query = self.async_client().table(table).update(data)
             
             for key, value in filters.items():
                 query = query.eq(key, value)
             
-            result = query.execute()
+            result = await self._execute(query, timeout)
             return result.data[0] if result.data else {}
         except Exception as e:
             logger.error(f"Error updating {table}: {e}", exc_info=True)
             raise
     
-    async def delete(self, table: str, filters: Dict) -> bool:
+    async def delete(self, table: str, filters: Dict, timeout: Optional[float] = None) -> bool:
         """Delete data from table"""
         try:
-            query = self.client.table(table).delete()
+            query = self.async_client().table(table).delete()
             
             for key, value in filters.items():
                 query = query.eq(key, value)
             
-            query.execute()
+            await self._execute(query, timeout)
             return True
         except Exception as e:
             logger.error(f"Error deleting from {table}: {e}", exc_info=True)
@@ -0,0 +1,160 @@
+"""In-memory snapshots of read-mostly reference tables"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TableSnapshot:
+    """
+    Process-wide copy of a reference table with a prebuilt index.
+
+    Рядки таблиці завантажуються один раз, після чого builder будує з них
+    індекс (наприклад, dict нормалізована назва → рядок). Снапшот
+    перебудовується коли минув TTL або після явного invalidate();
+    кожна перебудова збільшує version, тож залежні кеші можуть
+    порівнювати версію замість повторного читання таблиці.
+
+    Якщо БД недоступна - використовуються локальні дані (fallback), а
+    повторна спроба завантаження робиться не частіше ніж раз на retry_seconds.
+
+    Снапшот спільний для всіх потоків валідаторів (кожен зі своїм event
+    loop), тому перебудову виконує лише один виклик get(): решта чекає
+    на його результат замість паралельного читання таблиці.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        loader: Callable[[], Awaitable[List[Dict]]],
+        builder: Callable[[List[Dict]], Any],
+        ttl_seconds: Optional[float] = None,
+        fallback: Optional[Callable[[], List[Dict]]] = None,
+        retry_seconds: float = 60,
+    ):
+        """
+        Args:
+            table: Назва таблиці (для логів)
+            loader: Async функція що повертає всі рядки таблиці
+            builder: Функція що будує індекс з рядків
+            ttl_seconds: Через скільки секунд снапшот вважається застарілим
+                (None - без обмеження, тільки invalidate())
+            fallback: Функція що повертає локальні рядки (JSON) коли loader недоступний
+            retry_seconds: Пауза між спробами після невдалого завантаження
+        """
+        self.table = table
+        self._loader = loader
+        self._builder = builder
+        self._fallback = fallback
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+
+        self.version = 0
+        self.loaded_at: Optional[float] = None
+        self.row_count = 0
+        self.source: Optional[str] = None  # "loader" | "fallback"
+        self._index: Any = None
+        self._stale = True
+        self._retry_at: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+        self._pending: Optional[concurrent.futures.Future] = None
+
+    def is_stale(self) -> bool:
+        """Перевірити чи потрібно перебудувати снапшот"""
+        if self._index is not None and self._retry_at is not None:
+            if time.monotonic() < self._retry_at:
+                return False
+        if self._stale or self.loaded_at is None:
+            return True
+        if self.ttl_seconds is None:
+            return False
+        return time.monotonic() - self.loaded_at > self.ttl_seconds
+
+    async def get(self) -> Any:
+        """
+        Отримати індекс, перебудувавши його якщо снапшот застарів.
+
+        Якщо перебудова не вдалась, але попередній індекс є - повертаємо його
+        (краще застарілі довідкові дані, ніж помилка на кожному запиті).
+        Якщо індексу ще немає - будуємо його з fallback (якщо заданий).
+        """
+        if not self.is_stale():
+            return self._index
+
+        with self._refresh_lock:
+            if not self.is_stale():  # Інший потік щойно перебудував снапшот
+                return self._index
+            pending = self._pending
+            leader = pending is None
+            if leader:
+                pending = self._pending = concurrent.futures.Future()
+
+        if not leader:
+            # Threading lock не можна тримати через await (той самий loop
+            # заблокувався б), тому чекаємо на future з будь-якого loop
+            await asyncio.wrap_future(pending)
+            return self._index
+
+        try:
+            await self._rebuild()
+        except BaseException as exc:
+            if not isinstance(exc, Exception):
+                exc = RuntimeError(f"Refresh of {self.table} was cancelled")
+            pending.set_exception(exc)
+            raise
+        else:
+            pending.set_result(None)
+        finally:
+            with self._refresh_lock:
+                self._pending = None
+        return self._index
+
+    async def _rebuild(self) -> None:
+        """Перебудова з fallback/retry (викликається лише одним get())"""
+        try:
+            await self.refresh()
+        except Exception as exc:
+            self._retry_at = time.monotonic() + self.retry_seconds
+            if self._index is not None:
+                logger.warning(
+                    f"Could not refresh snapshot of {self.table}: {exc}. "
+                    f"Serving version {self.version} ({self.source})"
+                )
+            elif self._fallback is not None:
+                logger.warning(
+                    f"Could not load {self.table}: {exc}. Using local fallback data"
+                )
+                self._install(self._fallback() or [], source="fallback")
+                self._stale = True  # Повторити завантаження після retry_seconds
+            else:
+                raise
+
+    async def refresh(self) -> None:
+        """Примусово перечитати таблицю та перебудувати індекс"""
+        started = time.monotonic()
+        rows = await self._loader() or []
+        self._install(rows, source="loader")
+        self._retry_at = None
+
+        logger.info(
+            f"📦 Snapshot of {self.table} built: {len(rows)} rows, "
+            f"version={self.version}, {(self.loaded_at - started) * 1000:.0f} ms"
+        )
+
+    def _install(self, rows: List[Dict], source: str) -> None:
+        self._index = self._builder(rows)
+        self.row_count = len(rows)
+        self.loaded_at = time.monotonic()
+        self.version += 1
+        self.source = source
+        self._stale = False
+
+    def invalidate(self) -> None:
+        """Позначити снапшот застарілим (перебудується при наступному get())"""
+        self._stale = True
+        self._retry_at = None
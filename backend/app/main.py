@@ -1,8 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import logging
 import os
 
-from app.api.routes import checker
+from app.api.routes import batch, checker
+from app.db.dataset_version import dataset_version
+from app.db.postgres_reference import postgres_reference
+from app.db.regulatory_snapshot import regulatory_snapshot
+from app.db.supabase_client import supabase_client
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Label Check API", version="1.0.0")
 
@@ -16,6 +23,7 @@ app.add_middleware(
 )
 
 # Register routes
+app.include_router(batch.router)
 app.include_router(checker.router)
 
 @app.get("/")
@@ -29,3 +37,29 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+@app.on_event("startup")
+async def startup():
+    # Регуляторний снапшот: валідація з локальних даних (якщо файл зібрано)
+    regulatory_snapshot.reload()
+    # Прямі читання довідкових таблиць з Postgres (якщо задано POSTGRES_REFERENCE_DSN)
+    if postgres_reference.dsn:
+        try:
+            await postgres_reference.start()
+        except Exception as e:
+            logger.warning(f"Postgres fast path unavailable ({e}), reading reference tables via PostgREST")
+    # Пул async клієнта Supabase на loop застосунку (спільний з валідаторами /full)
+    await supabase_client.start()
+    # Опитування опублікованої версії датасету (інвалідація кешів змінених таблиць)
+    dataset_version.start(supabase_client.client)
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Зупинити воркерів асинхронного /full
+    await checker.full_check_queue.stop()
+    await dataset_version.stop()
+    # Закрити пул з'єднань до Claude API
+    await checker.ocr_service.aclose()
+    # Закрити keep-alive пул async клієнта Supabase
+    await supabase_client.aclose()
+    await postgres_reference.close()
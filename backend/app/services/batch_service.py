@@ -0,0 +1,363 @@
+"""Batch label checks: черга файлів з обмеженою паралельністю та чекпойнтами"""
+
+import asyncio
+import csv
+import io
+import logging
+import shutil
+import time
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Типи файлів етикеток за розширенням (для файлів з zip архіву)
+CONTENT_TYPES_BY_SUFFIX = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".pdf": "application/pdf",
+}
+
+LABEL_CONTENT_TYPES = set(CONTENT_TYPES_BY_SUFFIX.values())
+
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed", "application/x-zip"}
+
+# Колонки CSV підсумку (одна стрічка на файл)
+SUMMARY_COLUMNS = [
+    "index",
+    "filename",
+    "status",
+    "check_id",
+    "product_name",
+    "is_valid",
+    "partial",
+    "total_ingredients",
+    "substances_not_found",
+    "dosage_errors",
+    "dosage_warnings",
+    "forbidden_phrases",
+    "missing_fields",
+    "penalty_total",
+    "duration_ms",
+    "error",
+]
+
+
+@dataclass
+class BatchItem:
+    """Один файл етикетки в batch"""
+    index: int
+    filename: str
+    content_type: Optional[str]
+    path: Optional[Path] = None
+    check_id: Optional[str] = None
+    status: str = "pending"  # pending, running, completed, failed
+    result: Dict = field(default_factory=dict)
+    error: Optional[str] = None
+    duration_ms: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "index": self.index,
+            "filename": self.filename,
+            "status": self.status,
+            "check_id": self.check_id,
+            **self.result,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+        }
+
+
+@dataclass
+class BatchJob:
+    """Batch перевірка: файли, прогрес, статус"""
+    job_id: str
+    items: List[BatchItem]
+    workdir: Path
+    mode: Optional[str] = None
+    offline: bool = False  # OCR через Message Batches API
+    status: str = "running"  # running, completed
+    skipped: List[str] = field(default_factory=list)
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    completed_at: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def progress(self) -> Dict:
+        """Кількість файлів по статусах"""
+        counts = {"total": len(self.items), "pending": 0, "running": 0, "completed": 0, "failed": 0}
+        for item in self.items:
+            counts[item.status] += 1
+        counts["done"] = counts["completed"] + counts["failed"]
+        return counts
+
+    def snapshot(self) -> Dict:
+        """Стан job для polling та чекпойнту в check_sessions"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "mode": self.mode,
+            "offline": self.offline,
+            "progress": self.progress(),
+            "skipped": self.skipped,
+            "created_at": self.created_at,
+            "completed_at": self.completed_at,
+            "items": [item.to_dict() for item in self.items],
+        }
+
+
+def summarize_report(report: Dict) -> Dict:
+    """Стислий результат /full для рядка batch підсумку"""
+    stats = report.get("stats") or {}
+    return {
+        "product_name": (report.get("product_info") or {}).get("name"),
+        "is_valid": report.get("is_valid"),
+        "partial": report.get("partial", False),
+        "total_ingredients": stats.get("total_ingredients"),
+        "substances_not_found": stats.get("substances_not_found"),
+        "dosage_errors": stats.get("total_dosage_errors"),
+        "dosage_warnings": stats.get("total_dosage_warnings"),
+        "forbidden_phrases": stats.get("total_forbidden_phrases"),
+        "missing_fields": stats.get("total_missing_fields"),
+        "penalty_total": (report.get("penalties") or {}).get("total_amount"),
+    }
+
+
+def aggregate_summary(snapshot: Dict) -> Dict:
+    """
+    Агрегований підсумок batch (з snapshot job)
+
+    Returns:
+        {"job_id", "status", "progress", "totals": {...}, "items": [...]}
+    """
+    items = snapshot.get("items", [])
+    completed = [item for item in items if item.get("status") == "completed"]
+    totals = {
+        "valid": sum(1 for item in completed if item.get("is_valid")),
+        "invalid": sum(1 for item in completed if item.get("is_valid") is False),
+        "partial": sum(1 for item in completed if item.get("partial")),
+        "failed": sum(1 for item in items if item.get("status") == "failed"),
+        "dosage_errors": sum(item.get("dosage_errors") or 0 for item in completed),
+        "forbidden_phrases": sum(item.get("forbidden_phrases") or 0 for item in completed),
+        "missing_fields": sum(item.get("missing_fields") or 0 for item in completed),
+        "penalty_total": sum(item.get("penalty_total") or 0 for item in completed),
+        "currency": "UAH",
+    }
+    return {
+        "job_id": snapshot.get("job_id"),
+        "status": snapshot.get("status"),
+        "progress": snapshot.get("progress"),
+        "totals": totals,
+        "items": items,
+    }
+
+
+def summary_csv(snapshot: Dict) -> str:
+    """CSV підсумок batch: один рядок на файл"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=SUMMARY_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for item in snapshot.get("items", []):
+        writer.writerow(item)
+    return output.getvalue()
+
+
+def collect_items(
+    uploads: List[Path],
+    names: List[str],
+    content_types: List[Optional[str]],
+    workdir: Path,
+    max_items: int,
+    max_file_size: int,
+) -> Tuple[List[BatchItem], List[str]]:
+    """
+    Розгорнути завантажені файли (окремі етикетки та zip архіви) у BatchItem
+
+    Файли з архіву розпаковуються у workdir по одному; файли непідтримуваних
+    типів всередині архіву пропускаються. Завеликі файли та окремі
+    завантаження непідтримуваних типів додаються як failed.
+
+    Args:
+        uploads: Шляхи збережених завантажень
+        names: Оригінальні імена файлів
+        content_types: Content-Type завантажень
+        workdir: Директорія job
+        max_items: Максимум файлів етикеток у batch
+        max_file_size: Максимальний розмір однієї етикетки
+
+    Returns:
+        (items, skipped) - список BatchItem та імена пропущених файлів
+
+    Raises:
+        ValueError: Пошкоджений архів або перевищено max_items
+    """
+    items: List[BatchItem] = []
+    skipped: List[str] = []
+
+    def add(filename: str, content_type: Optional[str], path: Optional[Path], size: int) -> None:
+        if len(items) >= max_items:
+            raise ValueError(f"Too many files in batch. Maximum is {max_items}.")
+        item = BatchItem(index=len(items), filename=filename, content_type=content_type, path=path)
+        if size > max_file_size:
+            item.status = "failed"
+            item.error = f"File too large. Maximum size is {max_file_size / (1024*1024):.1f}MB."
+        elif content_type not in LABEL_CONTENT_TYPES:
+            item.status = "failed"
+            item.error = f"Invalid file type: {content_type}"
+        items.append(item)
+
+    for upload, name, content_type in zip(uploads, names, content_types):
+        if content_type in ZIP_CONTENT_TYPES or name.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(upload)
+            except zipfile.BadZipFile:
+                raise ValueError(f"Invalid zip archive: {name}")
+            with archive:
+                for info in archive.infolist():
+                    entry_name = info.filename
+                    base_name = Path(entry_name).name
+                    if info.is_dir() or entry_name.startswith("__MACOSX/") or base_name.startswith("."):
+                        continue
+                    entry_type = CONTENT_TYPES_BY_SUFFIX.get(Path(base_name).suffix.lower())
+                    if entry_type is None:
+                        skipped.append(entry_name)
+                        continue
+                    if info.file_size > max_file_size:
+                        add(entry_name, entry_type, None, info.file_size)
+                        continue
+                    target = workdir / f"{len(items):05d}{Path(base_name).suffix.lower()}"
+                    with archive.open(info) as source, open(target, "wb") as destination:
+                        shutil.copyfileobj(source, destination)
+                    add(entry_name, entry_type, target, target.stat().st_size)
+        else:
+            add(name, content_type, upload, upload.stat().st_size)
+
+    return items, skipped
+
+
+class BatchService:
+    """
+    Виконання batch перевірок у фоні
+
+    Файли обробляються пулом з concurrency воркерів (OCR додатково обмежений
+    семафором ClaudeOCRService). Прогрес зберігається через checkpoint кожні
+    checkpoint_interval завершених файлів та в кінці - стан можна отримати
+    з іншого worker'а або після рестарту.
+    """
+
+    def __init__(self, concurrency: int = 8, checkpoint_interval: int = 25, max_jobs: int = 100):
+        """
+        Args:
+            concurrency: Одночасно оброблюваних файлів на job
+            checkpoint_interval: Чекпойнт кожні N завершених файлів
+            max_jobs: Скільки завершених job тримати в пам'яті
+        """
+        self.concurrency = concurrency
+        self.checkpoint_interval = checkpoint_interval
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        """Job цього процесу або None"""
+        return self.jobs.get(job_id)
+
+    def start(
+        self,
+        job: BatchJob,
+        process: Callable[[BatchItem], Awaitable[Dict]],
+        checkpoint: Callable[[BatchJob], Awaitable[None]],
+        prepare: Optional[Callable[[BatchJob], Awaitable[None]]] = None,
+    ) -> BatchJob:
+        """
+        Запустити job у фоні
+
+        Args:
+            job: Job з підготовленими файлами
+            process: Обробка одного файлу → звіт /full
+            checkpoint: Збереження snapshot job
+            prepare: Спільна підготовка всіх файлів перед process (offline OCR)
+        """
+        self.jobs[job.job_id] = job
+        self._evict()
+        job.task = asyncio.create_task(self._run(job, process, checkpoint, prepare))
+        return job
+
+    async def _run(
+        self,
+        job: BatchJob,
+        process: Callable[[BatchItem], Awaitable[Dict]],
+        checkpoint: Callable[[BatchJob], Awaitable[None]],
+        prepare: Optional[Callable[[BatchJob], Awaitable[None]]],
+    ) -> None:
+        started = time.perf_counter()
+        if prepare:
+            try:
+                await prepare(job)
+            except Exception as exc:
+                logger.error(f"Batch {job.job_id} preparation failed: {exc}", exc_info=True)
+                for item in job.items:
+                    if item.status == "pending":
+                        item.status = "failed"
+                        item.error = str(exc) or exc.__class__.__name__
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in job.items:
+            if item.status == "pending":
+                queue.put_nowait(item)
+
+        finished = 0
+
+        async def worker() -> None:
+            nonlocal finished
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self._process_item(job, item, process)
+                finished += 1
+                if finished % self.checkpoint_interval == 0:
+                    await checkpoint(job)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, min(self.concurrency, queue.qsize())))))
+        finally:
+            job.status = "completed"
+            job.completed_at = datetime.utcnow().isoformat()
+            await checkpoint(job)
+            await asyncio.to_thread(shutil.rmtree, job.workdir, True)
+
+        progress = job.progress()
+        logger.info(
+            f"Batch {job.job_id} completed in {time.perf_counter() - started:.1f} s: "
+            f"{progress['completed']} completed, {progress['failed']} failed"
+        )
+
+    async def _process_item(
+        self,
+        job: BatchJob,
+        item: BatchItem,
+        process: Callable[[BatchItem], Awaitable[Dict]],
+    ) -> None:
+        item.status = "running"
+        started = time.perf_counter()
+        try:
+            report = await process(item)
+            item.result = summarize_report(report)
+            item.status = "completed"
+        except Exception as exc:
+            logger.error(f"Batch {job.job_id} item {item.index} ({item.filename}) failed: {exc}")
+            item.status = "failed"
+            item.error = str(exc) or exc.__class__.__name__
+        item.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def _evict(self) -> None:
+        """Прибрати найстаріші завершені job понад max_jobs"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status != "running"]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
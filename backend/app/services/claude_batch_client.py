@@ -0,0 +1,130 @@
+"""Client for the Claude Message Batches API (offline OCR for bulk re-checks)"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+ANTHROPIC_VERSION = "2023-06-01"
+
+
+class MessageBatchError(Exception):
+    """Batch не вдалося створити або він не завершився вчасно"""
+
+
+class MessageBatchClient:
+    """
+    Асинхронний Message Batches API: запити виконуються провайдером у фоні
+
+    Вдвічі дешевше за Messages API і має окремі rate limits, тож bulk
+    перевірки не конкурують з інтерактивними /quick. Результат - до 24 год.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.anthropic.com",
+        http_client: Optional[httpx.AsyncClient] = None,
+        poll_interval: float = 60.0,
+        timeout: float = 24 * 3600,
+    ):
+        """
+        Args:
+            api_key: Claude API key
+            base_url: API base URL (локальний stub у тестах)
+            http_client: HTTP клієнт (None - власний)
+            poll_interval: Інтервал перевірки статусу batch (секунди)
+            timeout: Максимальний час очікування batch (секунди)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._headers = {
+            "x-api-key": api_key,
+            "anthropic-version": ANTHROPIC_VERSION,
+            "content-type": "application/json",
+        }
+        self._http = http_client or httpx.AsyncClient(timeout=120.0)
+
+    async def create(self, requests: List[Dict]) -> Dict:
+        """
+        Створити batch
+
+        Args:
+            requests: [{"custom_id": "...", "params": {параметри messages.create}}]
+
+        Returns:
+            Message batch object ({"id", "processing_status", ...})
+        """
+        response = await self._http.post(
+            f"{self.base_url}/v1/messages/batches",
+            headers=self._headers,
+            json={"requests": requests},
+        )
+        if response.status_code >= 400:
+            raise MessageBatchError(f"Batch create failed ({response.status_code}): {response.text[:500]}")
+        return response.json()
+
+    async def retrieve(self, batch_id: str) -> Dict:
+        """Поточний стан batch"""
+        response = await self._http.get(
+            f"{self.base_url}/v1/messages/batches/{batch_id}",
+            headers=self._headers,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def results(self, batch: Dict) -> Dict[str, Dict]:
+        """
+        Результати завершеного batch (JSONL)
+
+        Returns:
+            {custom_id: result}, де result["type"] - succeeded / errored /
+            canceled / expired, для succeeded - result["message"]
+        """
+        url = batch.get("results_url") or f"{self.base_url}/v1/messages/batches/{batch['id']}/results"
+        response = await self._http.get(url, headers=self._headers)
+        response.raise_for_status()
+
+        results = {}
+        for line in response.text.splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                results[entry["custom_id"]] = entry["result"]
+        return results
+
+    async def run(self, requests: List[Dict]) -> Dict[str, Dict]:
+        """
+        Створити batch, дочекатися завершення та повернути результати
+
+        Returns:
+            {custom_id: result} (див. results)
+
+        Raises:
+            MessageBatchError: batch не завершився за timeout
+        """
+        batch = await self.create(requests)
+        batch_id = batch["id"]
+        logger.info(f"📦 Message batch {batch_id} submitted: {len(requests)} requests")
+
+        started = time.monotonic()
+        while batch.get("processing_status") != "ended":
+            if time.monotonic() - started > self.timeout:
+                raise MessageBatchError(f"Batch {batch_id} did not finish in {self.timeout:.0f} s")
+            await asyncio.sleep(self.poll_interval)
+            batch = await self.retrieve(batch_id)
+
+        logger.info(
+            f"📦 Message batch {batch_id} ended in {time.monotonic() - started:.0f} s: "
+            f"{batch.get('request_counts')}"
+        )
+        return await self.results(batch)
+
+    async def aclose(self) -> None:
+        """Закрити HTTP клієнт"""
+        await self._http.aclose()
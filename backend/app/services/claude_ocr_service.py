@@ -1,149 +1,26 @@
 """Claude OCR Service for extracting label data from images"""
 
 import anthropic
+import asyncio
 import base64
+import httpx
 import json
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import logging
 
 from app.config import settings
+from app.services.claude_batch_client import MessageBatchClient
+from app.services.ocr_cache import OCRCache, image_cache_key, text_cache_key
+from app.utils.pdf_processing import PDFProcessor, is_pdf
 
 logger = logging.getLogger(__name__)
 
-# Prompts for Claude Vision API
-SYSTEM_PROMPT = """
-Ти - експерт з українського законодавства про дієтичні добавки.
+# Версія промптів Stage 1 / Stage 2. Змінювати при кожній зміні промптів -
+# входить у ключі кешу, тож старі результати OCR перестають використовуватись
+OCR_PROMPT_VERSION = "2025-11-two-stage-2"
 
-Твоє завдання: проаналізувати зображення етикетки дієтичної добавки 
-та витягти всю важливу інформацію.
-
-КРИТИЧНО ВАЖЛИВО:
-1. Витягни ВСІ інгредієнти зі складу з їх кількістю
-2. Розпізнай одиниці виміру (мг, мкг, г, МО, КУО)
-3. Визнач форми речовин (наприклад: "цинк глюконат", "аскорбінова кислота")
-4. Розділи інгредієнти на активні та допоміжні (excipient)
-
-ФОРМАТ ВІДПОВІДІ: JSON згідно схеми нижче
-"""
-
-USER_PROMPT = """
-Проаналізуй це зображення етикетки дієтичної добавки.
-
-Витягни:
-1. Назва продукту
-2. Форма випуску (tablets/capsules/powder/liquid)
-3. Кількість в упаковці
-4. СКЛАД - список ВСІХ інгредієнтів:
-   - Назва інгредієнта (українською)
-   - Кількість (число)
-   - Одиниця виміру (мг/мкг/г/МО/КУО)
-   - Форма речовини (якщо вказана)
-   - Тип (active або excipient)
-5. Рекомендована добова доза
-6. Застереження до споживання
-7. Відповідальна особа/Оператор ринку:
-   - Назва
-   - Код ЄДРПОУ
-   - Адреса
-8. Виробник (якщо відрізняється від оператора)
-9. Термін придатності
-10. Умови зберігання
-11. ТУ У (якщо є)
-11a. НОМЕР ПАРТІЇ:
-    Знайди на етикетці будь-яку інформацію про партію:
-    - Якщо є "Партія №: [число/дата]" → витягни це
-    - Якщо написано що партія співпадає з датою - знайди цю дату (виробництва або "Вжити до")
-    - Шукай в УСЬОМУ тексті етикетки
-    Поверни в batch_number
-11b. АЛЕРГЕНИ - проаналізуй інгредієнти:
-    Перевір чи є алергени з 14 категорій:
-    глютен, молоко, яйця, риба, ракоподібні, соя, арахіс, горіхи, селера, гірчиця, кунжут, сульфіти, люпин, молюски
-    Якщо є - список назв, якщо немає - null
-12. ОБОВ'ЯЗКОВІ ФРАЗИ - перевір наявність кожної фрази на етикетці (true/false):
-    - Чи є точний напис "ДІЄТИЧНА ДОБАВКА" або "DIETARY SUPPLEMENT"?
-    - Чи є фраза "Не є лікарським засобом"?
-    - Чи є фраза про недопущення перевищення дози (будь-який варіант)?
-    - Чи є фраза про заміну раціону харчування (будь-який варіант)?
-    - Чи є фраза про зберігання в недоступному для дітей місці?
-13. ПОВНИЙ ТЕКСТ: витягни весь текст з етикетки одним рядком, збережи всі слова
-
-ВАЖЛИВО:
-- Якщо щось не вказано на етикетці, використай null
-- Одиниці виміру: залиш як є (мг, мкг, г)
-- Будь максимально точним з цифрами
-
-Поверни тільки JSON, без додаткового тексту.
-
-JSON Schema:
-{
-  "product_name": string,
-  "form": "tablets" | "capsules" | "powder" | "liquid",
-  "quantity": number,
-  "ingredients": [
-    {
-      "name": string,
-      "quantity": number,
-      "unit": string,
-      "form": string | null,
-      "type": "active" | "excipient"
-    }
-  ],
-  "daily_dose": string,
-  "warnings": string[],
-  "operator": {
-    "name": string,
-    "edrpou": string | null,
-    "address": string
-  },
-  "manufacturer": {
-    "name": string,
-    "address": string
-  } | null,
-  "shelf_life": string,
-  "storage": string,
-  "tech_specs": "ТУ У 10.8-41815746-002:2021" (or null),
-  "batch_number": "17.09.2025" (or null),
-  "allergens": ["глютен", "соя"] (or null),
-  "mandatory_phrases": {
-    "has_dietary_supplement_label": boolean,
-    "has_not_medicine": boolean,
-    "has_not_exceed_dose": boolean,
-    "has_not_replace_diet": boolean,
-    "has_keep_away_children": boolean
-  },
-  "full_text": string
-}
-"""
-
-
-class ClaudeOCRService:
-    """Service for extracting label data using Claude Vision API"""
-    
-    def __init__(self):
-        """Initialize Claude OCR Service"""
-        try:
-            self.client = anthropic.Anthropic(
-                api_key=settings.claude_api_key
-            )
-            # Using latest Claude Sonnet model with vision support
-            # Note: Update to latest model name if needed
-            self.model = "claude-sonnet-4-5-20250929"
-            logger.info("ClaudeOCRService initialized")
-        except Exception as e:
-            logger.error(f"Error initializing ClaudeOCRService: {e}", exc_info=True)
-            raise
-    
-    async def extract_full_text(self, image_bytes: bytes) -> str:
-        """
-        STAGE 1: Extract ALL text from label (pure OCR, no parsing)
-        
-        Args:
-            image_bytes: Image file as bytes
-            
-        Returns:
-            str: Complete raw text from label
-        """
-        prompt = """Прочитай ВЕСЬ текст з цієї етикетки дієтичної добавки.
+# Stage 1: чистий OCR (без структурування)
+STAGE1_PROMPT = """Прочитай ВЕСЬ текст з цієї етикетки дієтичної добавки.
 
 # ГОЛОВНЕ ПРАВИЛО
 
@@ -187,62 +64,9 @@ class ClaudeOCRService:
 
 КРИТИЧНО: Якщо сумніваєшся чи включати щось - ВКЛЮЧАЙ!
 """
-        
-        try:
-            # Encode image
-            image_base64 = base64.standard_b64encode(image_bytes).decode("utf-8")
-            media_type = self._detect_media_type(image_bytes)
-            
-            # Call Claude
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=4096,
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": media_type,
-                                "data": image_base64
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": prompt
-                        }
-                    ]
-                }]
-            )
-            
-            full_text = response.content[0].text.strip()
-            logger.info(f"✅ Stage 1: Extracted {len(full_text)} characters")
-            
-            return full_text
-            
-        except Exception as e:
-            logger.error(f"Error in Stage 1 (extract_full_text): {e}", exc_info=True)
-            raise
-    
-    async def parse_structured_data(self, full_text: str) -> Dict:
-        """
-        STAGE 2: Parse full text into structured fields
-        
-        Args:
-            full_text: Complete text from Stage 1
-            
-        Returns:
-            Dict with structured data
-        """
-        prompt = f"""Витягни structured data з тексту етикетки дієтичної добавки.
 
-# ВХІДНИЙ ТЕКСТ:
-```
-{full_text}
-```
-
-# ЯК ШУКАТИ КОЖНЕ ПОЛЕ:
+# Stage 2: інструкції структурування (після вхідного тексту етикетки)
+STAGE2_INSTRUCTIONS = """# ЯК ШУКАТИ КОЖНЕ ПОЛЕ:
 
 ## 1. OPERATOR (Замовник/Відповідальна особа)
 Шукай фрази:
@@ -361,25 +185,25 @@ class ClaudeOCRService:
 - "в недоступному для дітей"
 
 # OUTPUT JSON:
-{{
+{
   "product_name": "МАГНІЙ 500+Б6+В12",
   "form": "tablets",
   "quantity": 120,
   "ingredients": [
-    {{"name": "цитрат магнію", "quantity": 500, "unit": "мг", "type": "active"}},
-    {{"name": "МКЦ", "quantity": null, "unit": null, "type": "excipient"}}
+    {"name": "цитрат магнію", "quantity": 500, "unit": "мг", "type": "active"},
+    {"name": "МКЦ", "quantity": null, "unit": null, "type": "excipient"}
   ],
   "daily_dose": "1 таблетка на день",
-  "operator": {{
+  "operator": {
     "name": "ТОВ «Українські вітаміни»",
     "edrpou": null,
     "address": "Україна, Дніпропетровська обл., м. Дніпро, вул. Сонячна Набережна, буд. 2",
     "phone": "+38(097)106-32-75" або null
-  }},
-  "manufacturer": {{
+  },
+  "manufacturer": {
     "name": "ТОВ «Біо Лайт»",
     "address": "Україна, Запорізька обл., м. Запоріжжя, вул. Перемоги, буд. 135-А"
-  }} або null,
+  } або null,
   "batch_number": "17.09.2025" або null,
   "warnings": ["вагітність", "годування груддю", "індивідуальна непереносимість"],
   "shelf_life": "2 роки",
@@ -387,14 +211,14 @@ class ClaudeOCRService:
   "tech_specs": "ТУ У 10.8-41815746-002:2021" або null,
   "allergens": ["соя"] або [],
   "allergen_statement": "Містить алергени: соя" або null,
-  "mandatory_phrases": {{
+  "mandatory_phrases": {
     "has_dietary_supplement_label": true,
     "has_not_medicine": true,
     "has_not_exceed_dose": true,
     "has_not_replace_diet": false,
     "has_keep_away_children": true
-  }}
-}}
+  }
+}
 
 # ВАЖЛИВО:
 - Шукай ВСЮДИ в тексті, не тільки на початку
@@ -404,48 +228,298 @@ class ClaudeOCRService:
 
 Проаналізуй текст і поверни JSON.
 """
-        
+
+# Stage 2: статичний промпт (system, кешується провайдером) - текст етикетки
+# йде окремим user повідомленням після нього
+STAGE2_PROMPT = (
+    "Витягни structured data з тексту етикетки дієтичної добавки.\n"
+    "Вхідний текст етикетки - у повідомленні користувача.\n\n"
+    + STAGE2_INSTRUCTIONS
+)
+
+# Fused mode: Stage 1 + Stage 2 за один виклик vision (full_text входить у JSON)
+FUSED_PROMPT = """Це зображення етикетки дієтичної добавки. Виконай ДВА кроки за один раз.
+
+# КРОК 1: ПОВНИЙ ТЕКСТ (поле "full_text")
+
+Прочитай ВЕСЬ текст з етикетки: всі слова, дрібний шрифт, цифри, коди, адреси,
+застереження - будь-якою мовою. Копіюй дослівно як бачиш (мг(mg), °C тощо).
+Не включай тільки штрих-коди, логотипи та піктограми.
+КРИТИЧНО: Якщо сумніваєшся чи включати щось - ВКЛЮЧАЙ!
+
+# КРОК 2: STRUCTURED DATA з прочитаного тексту
+
+""" + STAGE2_INSTRUCTIONS.replace(
+    "Проаналізуй текст і поверни JSON.",
+    'Поверни ОДИН JSON: поле "full_text" (весь текст з КРОКУ 1) першим, '
+    "далі всі поля з OUTPUT JSON.",
+)
+
+# Режими OCR: два виклики (vision → text, text → JSON) або один fused виклик
+OCR_MODE_TWO_STAGE = "two_stage"
+OCR_MODE_FUSED = "fused"
+OCR_MODES = (OCR_MODE_TWO_STAGE, OCR_MODE_FUSED)
+
+# Prompts for Claude Vision API
+SYSTEM_PROMPT = """
+Ти - експерт з українського законодавства про дієтичні добавки.
+
+Твоє завдання: проаналізувати зображення етикетки дієтичної добавки 
+та витягти всю важливу інформацію.
+
+КРИТИЧНО ВАЖЛИВО:
+1. Витягни ВСІ інгредієнти зі складу з їх кількістю
+2. Розпізнай одиниці виміру (мг, мкг, г, МО, КУО)
+3. Визнач форми речовин (наприклад: "цинк глюконат", "аскорбінова кислота")
+4. Розділи інгредієнти на активні та допоміжні (excipient)
+
+ФОРМАТ ВІДПОВІДІ: JSON згідно схеми нижче
+"""
+
+USER_PROMPT = """
+Проаналізуй це зображення етикетки дієтичної добавки.
+
+Витягни:
+1. Назва продукту
+2. Форма випуску (tablets/capsules/powder/liquid)
+3. Кількість в упаковці
+4. СКЛАД - список ВСІХ інгредієнтів:
+   - Назва інгредієнта (українською)
+   - Кількість (число)
+   - Одиниця виміру (мг/мкг/г/МО/КУО)
+   - Форма речовини (якщо вказана)
+   - Тип (active або excipient)
+5. Рекомендована добова доза
+6. Застереження до споживання
+7. Відповідальна особа/Оператор ринку:
+   - Назва
+   - Код ЄДРПОУ
+   - Адреса
+8. Виробник (якщо відрізняється від оператора)
+9. Термін придатності
+10. Умови зберігання
+11. ТУ У (якщо є)
+11a. НОМЕР ПАРТІЇ:
+    Знайди на етикетці будь-яку інформацію про партію:
+    - Якщо є "Партія №: [число/дата]" → витягни це
+    - Якщо написано що партія співпадає з датою - знайди цю дату (виробництва або "Вжити до")
+    - Шукай в УСЬОМУ тексті етикетки
+    Поверни в batch_number
+11b. АЛЕРГЕНИ - проаналізуй інгредієнти:
+    Перевір чи є алергени з 14 категорій:
+    глютен, молоко, яйця, риба, ракоподібні, соя, арахіс, горіхи, селера, гірчиця, кунжут, сульфіти, люпин, молюски
+    Якщо є - список назв, якщо немає - null
+12. ОБОВ'ЯЗКОВІ ФРАЗИ - перевір наявність кожної фрази на етикетці (true/false):
+    - Чи є точний напис "ДІЄТИЧНА ДОБАВКА" або "DIETARY SUPPLEMENT"?
+    - Чи є фраза "Не є лікарським засобом"?
+    - Чи є фраза про недопущення перевищення дози (будь-який варіант)?
+    - Чи є фраза про заміну раціону харчування (будь-який варіант)?
+    - Чи є фраза про зберігання в недоступному для дітей місці?
+13. ПОВНИЙ ТЕКСТ: витягни весь текст з етикетки одним рядком, збережи всі слова
+
+ВАЖЛИВО:
+- Якщо щось не вказано на етикетці, використай null
+- Одиниці виміру: залиш як є (мг, мкг, г)
+- Будь максимально точним з цифрами
+
+Поверни тільки JSON, без додаткового тексту.
+
+JSON Schema:
+{
+  "product_name": string,
+  "form": "tablets" | "capsules" | "powder" | "liquid",
+  "quantity": number,
+  "ingredients": [
+    {
+      "name": string,
+      "quantity": number,
+      "unit": string,
+      "form": string | null,
+      "type": "active" | "excipient"
+    }
+  ],
+  "daily_dose": string,
+  "warnings": string[],
+  "operator": {
+    "name": string,
+    "edrpou": string | null,
+    "address": string
+  },
+  "manufacturer": {
+    "name": string,
+    "address": string
+  } | null,
+  "shelf_life": string,
+  "storage": string,
+  "tech_specs": "ТУ У 10.8-41815746-002:2021" (or null),
+  "batch_number": "17.09.2025" (or null),
+  "allergens": ["глютен", "соя"] (or null),
+  "mandatory_phrases": {
+    "has_dietary_supplement_label": boolean,
+    "has_not_medicine": boolean,
+    "has_not_exceed_dose": boolean,
+    "has_not_replace_diet": boolean,
+    "has_keep_away_children": boolean
+  },
+  "full_text": string
+}
+"""
+
+
+class ClaudeOCRService:
+    """Service for extracting label data using Claude Vision API"""
+    
+    def __init__(self):
+        """Initialize Claude OCR Service"""
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=8192,
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
+            # Async клієнт: 10-40 с запит до Claude не блокує event loop.
+            # Один httpx пул на сервіс - з'єднання перевикористовуються між запитами
+            self.client = anthropic.AsyncAnthropic(
+                api_key=settings.claude_api_key,
+                timeout=settings.claude_timeout,
+                max_retries=settings.claude_max_retries,
+                http_client=httpx.AsyncClient(
+                    timeout=settings.claude_timeout,
+                    limits=httpx.Limits(
+                        max_connections=settings.claude_max_concurrency,
+                        max_keepalive_connections=settings.claude_max_concurrency,
+                    ),
+                ),
             )
+            # Обмеження одночасних запитів до Claude на один worker
+            self._semaphore = asyncio.Semaphore(settings.claude_max_concurrency)
+            # Лічильники input токенів (prompt caching: прочитано / записано в кеш)
+            self.prompt_usage: Dict[str, int] = {
+                "requests": 0,
+                "input_tokens": 0,
+                "cache_read_input_tokens": 0,
+                "cache_creation_input_tokens": 0,
+            }
+            
+            # Кеш результатів по хешу зображення (повторні завантаження тих самих файлів)
+            self.image_cache: Optional[OCRCache] = None
+            # Кеш Stage 2 по тексту (та сама етикетка з іншого фото, реекспорт PDF)
+            self.parse_cache: Optional[OCRCache] = None
+            if settings.ocr_cache_enabled:
+                self.image_cache = OCRCache(
+                    settings.ocr_cache_path,
+                    namespace="image",
+                    max_entries=settings.ocr_cache_max_entries,
+                    ttl_seconds=settings.ocr_cache_ttl,
+                )
+                self.parse_cache = OCRCache(
+                    settings.ocr_cache_path,
+                    namespace="parse",
+                    max_entries=settings.ocr_cache_max_entries,
+                    ttl_seconds=settings.ocr_cache_ttl,
+                )
+            self.pdf_processor = PDFProcessor()
+            # Message Batches API для offline OCR (bulk перевірки, -50% вартості)
+            self.batch_client = MessageBatchClient(
+                api_key=settings.claude_api_key,
+                base_url=settings.claude_batch_base_url,
+                poll_interval=settings.claude_batch_poll_interval,
+                timeout=settings.claude_batch_timeout,
+            )
+            # Using latest Claude Sonnet model with vision support
+            # Note: Update to latest model name if needed
+            self.model = "claude-sonnet-4-5-20250929"
+            logger.info("ClaudeOCRService initialized")
+        except Exception as e:
+            logger.error(f"Error initializing ClaudeOCRService: {e}", exc_info=True)
+            raise
+    
+    async def extract_full_text(self, image_bytes: bytes) -> str:
+        """
+        STAGE 1: Extract ALL text from label (pure OCR, no parsing)
+        
+        Args:
+            image_bytes: Image file as bytes
+            
+        Returns:
+            str: Complete raw text from label
+        """
+        try:
+            response = await self._create_message(**await self._stage1_request(image_bytes))
+            
+            full_text = response.content[0].text.strip()
+            logger.info(f"✅ Stage 1: Extracted {len(full_text)} characters")
+            
+            return full_text
             
-            # ============ ДОДАТИ ЛОГУВАННЯ ============
-            raw_response = response.content[0].text
-            logger.info("="*60)
-            logger.info("🔍 RAW CLAUDE RESPONSE (Stage 2):")
-            logger.info("="*60)
-            logger.info(raw_response[:1000])  # Перші 1000 символів
-            logger.info("="*60)
-            # ============ КІНЕЦЬ ЛОГУВАННЯ ============
+        except Exception as e:
+            logger.error(f"Error in Stage 1 (extract_full_text): {e}", exc_info=True)
+            raise
+    
+    async def stream_full_text(self, image_bytes: bytes) -> AsyncIterator[str]:
+        """
+        STAGE 1 зі стрімінгом: фрагменти тексту по мірі генерації Claude
+        
+        Args:
+            image_bytes: Image file as bytes
             
-            # Parse JSON
-            try:
-                result = json.loads(raw_response)  # Використати raw_response
-            except json.JSONDecodeError:
-                # If Claude wrapped in markdown code blocks
-                if "```json" in raw_response:
-                    json_str = raw_response.split("```json")[1].split("```")[0].strip()
-                    result = json.loads(json_str)
-                elif "```" in raw_response:
-                    parts = raw_response.split("```")
-                    if len(parts) >= 2:
-                        json_str = parts[1].strip()
-                        if json_str.startswith("json"):
-                            json_str = json_str[4:].strip()
-                        result = json.loads(json_str)
-                    else:
-                        raise ValueError("Could not parse Claude response as JSON")
-                else:
-                    raise ValueError("Could not parse Claude response as JSON")
+        Yields:
+            str: Фрагменти тексту (разом = результат extract_full_text без strip)
+        """
+        request = await self._stage1_request(image_bytes)
+        async with self._semaphore:
+            async with self.client.messages.stream(**request) as stream:
+                async for text in stream.text_stream:
+                    yield text
+                self._record_usage(await stream.get_final_message())
+    
+    async def _stage1_request(
+        self,
+        image_bytes: bytes,
+        prompt: str = STAGE1_PROMPT,
+        max_tokens: int = 4096,
+    ) -> Dict:
+        """
+        Параметри Messages API для vision запиту (Stage 1 або fused)
+        
+        Інструкції йдуть у system (статичний префікс для prompt caching),
+        зображення - єдиний вміст user повідомлення.
+        """
+        # Encode image (до 10 MB - в окремому потоці, щоб не блокувати event loop)
+        image_base64 = await asyncio.to_thread(self._encode_image, image_bytes)
+        media_type = self._detect_media_type(image_bytes)
+        
+        return {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "system": self._system_prompt(prompt),
+            "messages": [{
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image",
+                        "source": {
+                            "type": "base64",
+                            "media_type": media_type,
+                            "data": image_base64
+                        }
+                    }
+                ]
+            }],
+        }
+    
+    async def parse_structured_data(self, full_text: str) -> Dict:
+        """
+        STAGE 2: Parse full text into structured fields
+        
+        Args:
+            full_text: Complete text from Stage 1
             
-            logger.info(f"✅ Stage 2: Parsed {len(result.get('ingredients', []))} ingredients")
-            return result
+        Returns:
+            Dict with structured data
+        """
+        cache_key, cached = await self._lookup_parse_cache(full_text)
+        if cached:
+            return cached
+        
+        try:
+            response = await self._create_message(**self._stage2_request(full_text))
+            return await self._stage2_result(response.content[0].text, cache_key)
             
         except Exception as e:
             logger.error(f"Error in Stage 2 (parse_structured_data): {e}", exc_info=True)
@@ -455,33 +529,292 @@ class ClaudeOCRService:
                 "full_text": full_text
             }
     
-    async def analyze_label(self, image_bytes: bytes) -> Dict:
+    def _stage2_request(self, full_text: str) -> Dict:
+        """Параметри Messages API для Stage 2 (статичний system + текст етикетки)"""
+        return {
+            "model": self.model,
+            "max_tokens": 8192,
+            "system": self._system_prompt(STAGE2_PROMPT),
+            "messages": [{
+                "role": "user",
+                "content": f"# ВХІДНИЙ ТЕКСТ:\n```\n{full_text}\n```"
+            }],
+        }
+    
+    async def _stage2_result(self, raw_response: str, cache_key: Optional[str]) -> Dict:
+        """Розібрати відповідь Stage 2 та зберегти в кеш"""
+        # ============ ДОДАТИ ЛОГУВАННЯ ============
+        logger.info("="*60)
+        logger.info("🔍 RAW CLAUDE RESPONSE (Stage 2):")
+        logger.info("="*60)
+        logger.info(raw_response[:1000])  # Перші 1000 символів
+        logger.info("="*60)
+        # ============ КІНЕЦЬ ЛОГУВАННЯ ============
+        
+        result = self._parse_json_response(raw_response)
+        
+        logger.info(f"✅ Stage 2: Parsed {len(result.get('ingredients', []))} ingredients")
+        if cache_key:
+            await self.parse_cache.set(cache_key, result)
+        return result
+    
+    async def _lookup_parse_cache(self, full_text: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        Знайти результат Stage 2 для тексту в кеші
+        
+        Returns:
+            (ключ кешу або None якщо кеш вимкнено, результат або None)
+        """
+        if not self.parse_cache:
+            return None, None
+        
+        cache_key = text_cache_key(full_text, self.model, OCR_PROMPT_VERSION)
+        cached = await self.parse_cache.get(cache_key)
+        if cached:
+            logger.info(
+                f"⚡ Stage 2 cache hit: {cache_key[:12]} "
+                f"(hits={self.parse_cache.hits}, misses={self.parse_cache.misses})"
+            )
+        return cache_key, cached
+    
+    async def extract_pdf_text(self, pdf_bytes: bytes) -> str:
+        """
+        STAGE 1 для PDF: текстовий шар або OCR растеризованих сторінок
+        
+        Якщо PDF має придатний текстовий шар (друкарські макети з живим
+        текстом) - Claude Vision не викликається взагалі. Інакше сторінки
+        рендеряться по одній і відправляються в Stage 1 одразу після рендеру,
+        паралельно з рендером наступної.
+        
+        Args:
+            pdf_bytes: PDF file bytes
+            
+        Returns:
+            str: Текст усіх сторінок
+        """
+        text = await asyncio.to_thread(
+            self.pdf_processor.extract_text_layer, pdf_bytes, settings.pdf_max_pages
+        )
+        if text:
+            logger.info(f"📄 PDF text layer used, Stage 1 OCR skipped: {len(text)} characters")
+            return text
+        
+        pages = self.pdf_processor.iter_page_images(
+            pdf_bytes,
+            dpi=settings.pdf_render_dpi,
+            max_pages=settings.pdf_max_pages,
+            max_edge=settings.vision_max_edge,
+            max_pixels=settings.vision_max_pixels,
+            quality=settings.vision_jpeg_quality,
+        )
+        tasks = []
+        try:
+            while True:
+                page = await asyncio.to_thread(next, pages, None)
+                if page is None:
+                    break
+                tasks.append(asyncio.create_task(self.extract_full_text(page)))
+            texts = await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            pages.close()
+        
+        logger.info(f"📄 PDF OCR complete: {len(texts)} pages")
+        return "\n\n".join(text for text in texts if text)
+    
+    async def analyze_label(self, image_bytes: bytes, mode: Optional[str] = None) -> Dict:
         """
         Complete 2-stage analysis: Extract text → Parse structure
         
         Args:
-            image_bytes: Image bytes (JPEG/PNG)
+            image_bytes: Image bytes (JPEG/PNG/WebP) or PDF
+            mode: "two_stage" або "fused" (None - settings.ocr_mode)
             
         Returns:
             Dict with full_text + all structured fields
         """
-        logger.info("🚀 Starting 2-stage OCR analysis")
+        mode = self._resolve_mode(mode, image_bytes)
+        logger.info(f"🚀 Starting OCR analysis (mode={mode})")
+        
+        # ==========================================
+        # CACHE: той самий файл вже розпізнавався
+        # ==========================================
+        cache_key, cached = await self._lookup_image_cache(image_bytes, mode)
+        if cached:
+            return cached
+        
+        if mode == OCR_MODE_FUSED:
+            result = await self.analyze_fused(image_bytes, cache_key)
+            if result:
+                return result
+            cache_key, cached = await self._lookup_image_cache(image_bytes, OCR_MODE_TWO_STAGE)
+            if cached:
+                return cached
         
         # ==========================================
         # STAGE 1: Extract full text (Pure OCR)
         # ==========================================
-        full_text = await self.extract_full_text(image_bytes)
+        if is_pdf(image_bytes):
+            full_text = await self.extract_pdf_text(image_bytes)
+        else:
+            full_text = await self.extract_full_text(image_bytes)
+        
+        # ==========================================
+        # STAGE 2: Parse structured data
+        # ==========================================
+        return await self._complete_analysis(full_text, cache_key)
+    
+    async def analyze_fused(self, image_bytes: bytes, cache_key: Optional[str] = None) -> Optional[Dict]:
+        """
+        FUSED: full_text + structured data за один vision виклик
+        
+        Вдвічі менше послідовних викликів і без повторної відправки full_text
+        як input токенів. Точність може бути нижчою ніж у two_stage -
+        див. scripts/benchmark_ocr_modes.py.
+        
+        Args:
+            image_bytes: Image bytes (JPEG/PNG/WebP)
+            cache_key: Ключ кешу fused результату (None - не кешувати)
+            
+        Returns:
+            Dict with full_text + all structured fields, або None якщо відповідь
+            непридатна (тоді викликач переходить на two_stage)
+        """
+        try:
+            request = await self._stage1_request(image_bytes, prompt=FUSED_PROMPT, max_tokens=8192)
+            response = await self._create_message(**request)
+            result = self._parse_json_response(response.content[0].text)
+        except Exception as e:
+            logger.warning(f"Fused OCR failed, falling back to two_stage: {e}")
+            return None
+        
+        full_text = str(result.get("full_text") or "").strip()
+        if len(full_text) < 50:
+            logger.warning(f"Fused OCR returned {len(full_text)} chars of text, falling back to two_stage")
+            return None
+        
+        result["full_text"] = full_text
+        logger.info(
+            f"✅ Fused OCR complete: {len(full_text)} chars, "
+            f"{len(result.get('ingredients') or [])} ingredients"
+        )
+        
+        if cache_key:
+            await self.image_cache.set(cache_key, {
+                "full_text": full_text,
+                "structured": {k: v for k, v in result.items() if k != "full_text"},
+            })
+        return result
+    
+    async def analyze_label_events(
+        self,
+        image_bytes: bytes,
+        mode: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        analyze_label з подіями прогресу (для /quick/stream)
+        
+        Yields:
+            ("text", {"text": фрагмент}) - Stage 1 по мірі генерації
+            ("ocr_complete", {"characters": N, "cached": bool})
+            ("parsed", результат як у analyze_label) - остання подія
+        """
+        mode = self._resolve_mode(mode, image_bytes)
+        cache_key, cached = await self._lookup_image_cache(image_bytes, mode)
+        if cached:
+            for event in self._cached_events(cached):
+                yield event
+            return
+        
+        if mode == OCR_MODE_FUSED:
+            # Один виклик - текст з'являється разом з результатом
+            result = await self.analyze_fused(image_bytes, cache_key)
+            if result:
+                yield "text", {"text": result["full_text"]}
+                yield "ocr_complete", {"characters": len(result["full_text"]), "cached": False}
+                yield "parsed", result
+                return
+            cache_key, cached = await self._lookup_image_cache(image_bytes, OCR_MODE_TWO_STAGE)
+            if cached:
+                for event in self._cached_events(cached):
+                    yield event
+                return
+        
+        if is_pdf(image_bytes):
+            full_text = await self.extract_pdf_text(image_bytes)
+            yield "text", {"text": full_text}
+        else:
+            chunks = []
+            async for chunk in self.stream_full_text(image_bytes):
+                chunks.append(chunk)
+                yield "text", {"text": chunk}
+            full_text = "".join(chunks).strip()
+            logger.info(f"✅ Stage 1 (stream): Extracted {len(full_text)} characters")
+        
+        yield "ocr_complete", {"characters": len(full_text), "cached": False}
+        yield "parsed", await self._complete_analysis(full_text, cache_key)
+    
+    @staticmethod
+    def _cached_events(cached: Dict) -> List[Tuple[str, Dict]]:
+        """Події analyze_label_events для результату з кешу"""
+        return [
+            ("text", {"text": cached["full_text"]}),
+            ("ocr_complete", {"characters": len(cached["full_text"]), "cached": True}),
+            ("parsed", cached),
+        ]
+    
+    def _resolve_mode(self, mode: Optional[str], image_bytes: bytes) -> str:
+        """Режим OCR для файлу (PDF завжди two_stage: текстовий шар / сторінки)"""
+        mode = mode or settings.ocr_mode
+        if mode not in OCR_MODES:
+            raise ValueError(f"Unknown OCR mode: {mode}. Allowed: {', '.join(OCR_MODES)}")
+        if is_pdf(image_bytes):
+            return OCR_MODE_TWO_STAGE
+        return mode
+    
+    async def _lookup_image_cache(
+        self,
+        image_bytes: bytes,
+        mode: str = OCR_MODE_TWO_STAGE,
+    ) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        Знайти результат для зображення в кеші
+        
+        Returns:
+            (ключ кешу або None якщо кеш вимкнено, результат або None)
+        """
+        if not self.image_cache:
+            return None, None
         
+        # Результати fused та two_stage кешуються окремо
+        prompt_version = OCR_PROMPT_VERSION if mode == OCR_MODE_TWO_STAGE else f"{OCR_PROMPT_VERSION}+{mode}"
+        cache_key = await asyncio.to_thread(
+            image_cache_key, image_bytes, self.model, prompt_version
+        )
+        cached = await self.image_cache.get(cache_key)
+        if not cached:
+            return cache_key, None
+        
+        result = dict(cached["structured"])
+        result["full_text"] = cached["full_text"]
+        logger.info(f"⚡ OCR cache hit: {cache_key[:12]} ({len(cached['full_text'])} chars)")
+        return cache_key, result
+    
+    async def _complete_analysis(self, full_text: str, cache_key: Optional[str]) -> Dict:
+        """Stage 2 для тексту з Stage 1 + збереження в кеш"""
         if not full_text or len(full_text) < 50:
             raise ValueError("Failed to extract text from image")
         
         logger.info(f"📝 Full text extracted: {len(full_text)} characters")
         
-        # ==========================================
-        # STAGE 2: Parse structured data
-        # ==========================================
         result = await self.parse_structured_data(full_text)
-        
+        return await self._finish_analysis(full_text, result, cache_key)
+    
+    async def _finish_analysis(self, full_text: str, result: Dict, cache_key: Optional[str]) -> Dict:
+        """Результат Stage 2 + full_text, збереження в кеш зображень"""
         # КРИТИЧНО: Ensure full_text в результаті
         result["full_text"] = full_text
         
@@ -491,9 +824,133 @@ class ClaudeOCRService:
         logger.info(f"  - Operator: {result.get('operator', {}).get('name')}")
         logger.info(f"  - Batch: {result.get('batch_number')}")
         
+        # Кешувати тільки успішний результат Stage 2 (fallback з "error" - ні)
+        if cache_key and "error" not in result:
+            await self.image_cache.set(cache_key, {
+                "full_text": full_text,
+                "structured": {k: v for k, v in result.items() if k != "full_text"},
+            })
+        
         return result
     
-    async def extract_label_data(self, image_bytes: bytes) -> Dict:
+    async def analyze_labels_offline(self, images: Dict[str, bytes]) -> Dict[str, Dict]:
+        """
+        analyze_label для багатьох етикеток через Message Batches API
+        
+        Stage 1 всіх зображень - один batch, Stage 2 всіх текстів - другий.
+        Для нічних перевірок каталогу: вдвічі дешевше і окремі rate limits,
+        але результат може йти годинами. Завжди two_stage. Кеші зображень та
+        Stage 2 використовуються як і в analyze_label.
+        
+        Args:
+            images: {ключ: image bytes (JPEG/PNG/WebP) або PDF}; ключ -
+                [a-zA-Z0-9_-], до 56 символів (custom_id Batches API)
+            
+        Returns:
+            {ключ: результат як у analyze_label або {"error": "..."}}
+        """
+        results: Dict[str, Dict] = {}
+        cache_keys: Dict[str, Optional[str]] = {}
+        texts: Dict[str, str] = {}
+        # ключ етикетки → custom_id запитів Stage 1 (PDF без тексту - по сторінці)
+        stage1_ids: Dict[str, List[str]] = {}
+        requests = []
+        
+        # ==========================================
+        # STAGE 1: кеш → текстовий шар PDF → batch
+        # ==========================================
+        for key, image_bytes in images.items():
+            cache_key, cached = await self._lookup_image_cache(image_bytes)
+            cache_keys[key] = cache_key
+            if cached:
+                results[key] = cached
+                continue
+            
+            pages = [image_bytes]
+            if is_pdf(image_bytes):
+                text = await asyncio.to_thread(
+                    self.pdf_processor.extract_text_layer, image_bytes, settings.pdf_max_pages
+                )
+                if text:
+                    texts[key] = text
+                    continue
+                try:
+                    pages = await asyncio.to_thread(self._render_pdf_pages, image_bytes)
+                except Exception as e:
+                    results[key] = {"error": f"Failed to render PDF: {e}"}
+                    continue
+            
+            stage1_ids[key] = []
+            for number, page in enumerate(pages):
+                custom_id = f"s1-{key}-{number}"
+                stage1_ids[key].append(custom_id)
+                requests.append({"custom_id": custom_id, "params": await self._stage1_request(page)})
+        
+        if requests:
+            responses = await self.batch_client.run(requests)
+            for key, custom_ids in stage1_ids.items():
+                try:
+                    texts[key] = "\n\n".join(
+                        self._batch_message_text(responses.get(custom_id)) for custom_id in custom_ids
+                    ).strip()
+                except ValueError as e:
+                    results[key] = {"error": str(e)}
+        
+        # ==========================================
+        # STAGE 2: кеш → batch
+        # ==========================================
+        parse_keys: Dict[str, Optional[str]] = {}
+        requests = []
+        for key, full_text in texts.items():
+            if len(full_text) < 50:
+                results[key] = {"error": "Failed to extract text from image"}
+                continue
+            parse_key, cached = await self._lookup_parse_cache(full_text)
+            if cached:
+                results[key] = await self._finish_analysis(full_text, cached, cache_keys[key])
+                continue
+            parse_keys[key] = parse_key
+            requests.append({"custom_id": f"s2-{key}", "params": self._stage2_request(full_text)})
+        
+        if requests:
+            responses = await self.batch_client.run(requests)
+            for key, parse_key in parse_keys.items():
+                full_text = texts[key]
+                try:
+                    raw_response = self._batch_message_text(responses.get(f"s2-{key}"))
+                    result = await self._stage2_result(raw_response, parse_key)
+                except Exception as e:
+                    logger.error(f"Error in offline Stage 2 ({key}): {e}")
+                    result = {"error": "Failed to parse structured data", "full_text": full_text}
+                results[key] = await self._finish_analysis(full_text, result, cache_keys[key])
+        
+        logger.info(f"📦 Offline OCR complete: {len(results)} labels")
+        return results
+    
+    def _batch_message_text(self, outcome: Optional[Dict]) -> str:
+        """Текст відповіді з результату Message Batches API (+ облік токенів)"""
+        if not outcome:
+            raise ValueError("No result in message batch")
+        if outcome.get("type") != "succeeded":
+            error = (outcome.get("error") or {}).get("error", {}).get("message") or outcome.get("type")
+            raise ValueError(f"Batch request {outcome.get('type')}: {error}")
+        
+        message = outcome["message"]
+        self._record_usage(message)
+        return message["content"][0]["text"]
+    
+    def _render_pdf_pages(self, pdf_bytes: bytes) -> List[bytes]:
+        """Сторінки PDF як JPEG для Stage 1"""
+        return list(self.pdf_processor.iter_page_images(
+            pdf_bytes,
+            dpi=settings.pdf_render_dpi,
+            max_pages=settings.pdf_max_pages,
+            max_edge=settings.vision_max_edge,
+            max_pixels=settings.vision_max_pixels,
+            quality=settings.vision_jpeg_quality,
+        ))
+    
+    async def extract_label_data(self, image_bytes: bytes, mode: Optional[str] = None) -> Dict:
         """
         Extract structured data from label image using Claude Vision
         
@@ -502,12 +959,99 @@ class ClaudeOCRService:
         
         Args:
             image_bytes: Image file as bytes
+            mode: "two_stage" або "fused" (None - settings.ocr_mode)
             
         Returns:
             Structured label data as dict
         """
         # Use new 2-stage approach
-        return await self.analyze_label(image_bytes)
+        return await self.analyze_label(image_bytes, mode)
+    
+    async def _create_message(self, **kwargs):
+        """
+        Виклик Claude Messages API з обмеженням одночасних запитів
+        
+        Args:
+            **kwargs: Параметри messages.create (model, max_tokens, messages, ...)
+            
+        Returns:
+            Message response
+        """
+        async with self._semaphore:
+            response = await self.client.messages.create(**kwargs)
+        self._record_usage(response)
+        return response
+    
+    def _system_prompt(self, prompt: str):
+        """
+        System промпт; з увімкненим prompt caching - блок з cache_control
+        
+        Статичні інструкції однакові для всіх викликів, тож провайдер
+        читає їх з кешу замість повної обробки input токенів.
+        """
+        if not settings.claude_prompt_cache_enabled:
+            return prompt
+        return [{
+            "type": "text",
+            "text": prompt,
+            "cache_control": {"type": "ephemeral"},
+        }]
+    
+    def _record_usage(self, response) -> None:
+        """Врахувати input токени відповіді (в т.ч. прочитані з prompt cache)"""
+        # Message Batches API повертає повідомлення як dict
+        usage = response.get("usage") if isinstance(response, dict) else getattr(response, "usage", None)
+        if usage is None:
+            return
+        
+        fields = ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+        if isinstance(usage, dict):
+            counts = {name: usage.get(name) or 0 for name in fields}
+        else:
+            counts = {name: getattr(usage, name, 0) or 0 for name in fields}
+        self.prompt_usage["requests"] += 1
+        for key, value in counts.items():
+            self.prompt_usage[key] += value
+        logger.info(
+            f"Claude usage: input={counts['input_tokens']}, "
+            f"cache_read={counts['cache_read_input_tokens']}, "
+            f"cache_write={counts['cache_creation_input_tokens']}"
+        )
+    
+    def cache_stats(self) -> Dict:
+        """Статистика кешів OCR (влучання / промахи) та prompt caching"""
+        return {
+            "image": self.image_cache.stats() if self.image_cache else None,
+            "parse": self.parse_cache.stats() if self.parse_cache else None,
+            "prompt": dict(self.prompt_usage),
+        }
+    
+    async def aclose(self) -> None:
+        """Закрити HTTP пул клієнта (при зупинці застосунку)"""
+        await self.client.close()
+        await self.batch_client.aclose()
+    
+    def _parse_json_response(self, raw_response: str) -> Dict:
+        """Розібрати JSON з відповіді Claude (в т.ч. обгорнутий у markdown блок)"""
+        try:
+            return json.loads(raw_response)
+        except json.JSONDecodeError:
+            # If Claude wrapped in markdown code blocks
+            if "```json" in raw_response:
+                json_str = raw_response.split("```json")[1].split("```")[0].strip()
+                return json.loads(json_str)
+            elif "```" in raw_response:
+                parts = raw_response.split("```")
+                if len(parts) >= 2:
+                    json_str = parts[1].strip()
+                    if json_str.startswith("json"):
+                        json_str = json_str[4:].strip()
+                    return json.loads(json_str)
+            raise ValueError("Could not parse Claude response as JSON")
+    
+    def _encode_image(self, image_bytes: bytes) -> str:
+        """Base64-кодування зображення для Claude Vision"""
+        return base64.standard_b64encode(image_bytes).decode("utf-8")
     
     def _detect_media_type(self, image_bytes: bytes) -> str:
         """
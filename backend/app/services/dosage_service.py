@@ -1,21 +1,89 @@
 """Dosage validation service with 4-level hierarchy for vitamins/minerals"""
 
 import logging
-from typing import List, Dict, Optional, Tuple
+from functools import partial
+from typing import Iterable, List, Dict, Optional, Tuple
 
-from app.db.supabase_client import SupabaseClient
+from app.config import settings
+from app.db.dataset_version import dataset_version
+from app.db.postgres_reference import REFERENCE_READ_TABLES, postgres_reference
+from app.db.regulatory_snapshot import RegulatorySnapshot, regulatory_snapshot
+from app.db.supabase_client import supabase_client
 from app.services.substance_mapper_service import SubstanceMapperService
 from app.api.schemas.validation import DosageCheckResult, DosageError, DosageWarning
+from app.utils.cache_backend import cache_key, get_cache_backend
 
 logger = logging.getLogger(__name__)
 
+# Довідкові таблиці для класифікації інгредієнтів:
+# категорія → (таблиця, колонки для ILIKE пошуку, додаткові eq-фільтри)
+REFERENCE_CATEGORIES: Dict[str, Tuple[str, Tuple[str, ...], Dict[str, str]]] = {
+    "banned_substance": ("banned_substances", ("substance_name_ua", "substance_name_en"), {}),
+    "vitamin_mineral": ("allowed_vitamins_minerals", ("substance_name_ua", "substance_name_en"), {}),
+    "amino_acid": ("amino_acids", ("amino_acid_name_ua", "amino_acid_name_en"), {}),
+    "plant": ("allowed_plants", ("botanical_name_lat", "common_name_ua"), {}),
+    "physiological": (
+        "max_doses_table1",
+        ("substance_name_ua", "substance_name_en"),
+        {"category": "physiological"},
+    ),
+    "novel_food": ("novel_foods", ("substance_name_ua", "substance_name_en"), {}),
+    "other_substance": ("other_substances", ("substance_name_ua", "substance_name_en"), {}),
+}
+
+# Namespace довідкових lookup'ів у кеш-бекенді (інвалідується після оновлення регуляцій)
+REFERENCE_CACHE_NAMESPACE = "reference"
+
+# Таблиця → kind ключів _cached_lookup (перший сегмент cache_key)
+REFERENCE_CACHE_KINDS: Dict[str, str] = {
+    "allowed_vitamins_minerals": "vitamin_mineral",
+    "efsa_limits": "efsa_limits",
+    "max_doses_table1": "table1",
+}
+
+# Скільки назв об'єднувати в один PostgREST запит (обмеження довжини URL)
+RESOLVE_CHUNK_SIZE = 40
+
+
+def invalidate_reference_cache(tables: Iterable[str]) -> int:
+    """
+    Інвалідувати lookup'и лише вказаних таблиць (по префіксу kind ключа)
+
+    Returns:
+        Кількість видалених ключів
+    """
+    cache = get_cache_backend()
+    deleted = 0
+    for table in tables:
+        kind = REFERENCE_CACHE_KINDS.get(table)
+        if kind is not None:
+            deleted += cache.invalidate(REFERENCE_CACHE_NAMESPACE, cache_key(kind) + "|")
+    return deleted
+
+
+# Нова версія датасету (scripts/update_regulations.py) → скинути lookup'и змінених таблиць
+for _table in REFERENCE_CACHE_KINDS:
+    dataset_version.add_listener(_table, partial(invalidate_reference_cache, [_table]))
+
+
+def _quote_filter_value(value: str) -> str:
+    """Взяти значення в лапки для PostgREST or=(...) (коми, дужки, крапки в назвах)"""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _ilike_contains(value: Optional[str], needle: str) -> bool:
+    """Python-аналог `column ILIKE '%needle%'`"""
+    return bool(value) and needle.lower() in str(value).lower()
+
 
 class DosageService:
     """Service for validating ingredient dosages against regulatory limits with 4-level hierarchy"""
     
     def __init__(self):
         """Initialize dosage service with Supabase client"""
-        self.supabase = SupabaseClient().client
+        # Async клієнт з пулом: довідкові запити не блокують event loop валідатора
+        self.supabase = supabase_client
         self.mapper = SubstanceMapperService()
         logger.info("DosageService initialized with SubstanceMapperService")
     
@@ -50,6 +118,15 @@ class DosageService:
         warnings = []
         substances_not_found = 0
         
+        # Один прохід по всіх довідкових таблицях для всього списку
+        # замість ланцюжка запитів на кожен інгредієнт
+        names_to_resolve = [
+            ingredient.get("name", "Unknown")
+            for ingredient in ingredients
+            if (ingredient.get("type") or "").lower() not in ["excipient", "plant"]
+        ]
+        references = await self.resolve_references(names_to_resolve)
+        
         for ingredient in ingredients:
             ingredient_name = ingredient.get("name", "Unknown")
             quantity = ingredient.get("quantity")
@@ -58,6 +135,7 @@ class DosageService:
             ing_type = ingredient.get("type", "").lower() if ingredient.get("type") else ""
             
             logger.debug(f"Checking ingredient: {ingredient_name} ({quantity} {unit})")
+            refs = references.get(ingredient_name, {})
             
             # ПРОПУСТИТИ excipients та рослини (не перевіряти дози)
             if ing_type in ["excipient", "plant"]:
@@ -96,7 +174,7 @@ class DosageService:
                     logger.info(f"🌿 Skipping dosage check for plant: {ingredient_name}")
                 
                 # Перевірити чи рослина дозволена (але НЕ перевіряти дози!)
-                plant_result = await self._check_plant(ingredient_name, form)
+                plant_result = await self._check_plant(ingredient_name, form, refs.get("plant"))
                 
                 if plant_result:
                     if plant_result.get("type") == "warning":
@@ -106,7 +184,7 @@ class DosageService:
                 continue  # Перейти до наступного інгредієнта
             
             # PRIORITY #1: Check banned substances FIRST!
-            if await self._is_banned_substance(ingredient_name):
+            if await self._is_banned_substance(ingredient_name, refs.get("banned_substance")):
                 errors.append(DosageError(
                     ingredient=ingredient_name,
                     message="ЗАБОРОНЕНА РЕЧОВИНА! Використання суворо заборонено.",
@@ -124,32 +202,42 @@ class DosageService:
             result = None
             
             # Type 1: Vitamins/Minerals (4-level hierarchy)
-            if await self._is_vitamin_mineral(ingredient_name):
+            if await self._is_vitamin_mineral(ingredient_name, refs.get("vitamin_mineral")):
                 result = await self._check_vitamin_mineral(ingredient_name, quantity, unit, form)
             
             # Type 2: Amino acids (direct check in amino_acids table)
-            elif await self._is_amino_acid(ingredient_name):
-                result = await self._check_amino_acid(ingredient_name, quantity, unit, form)
+            elif await self._is_amino_acid(ingredient_name, refs.get("amino_acid")):
+                result = await self._check_amino_acid(
+                    ingredient_name, quantity, unit, form, refs.get("amino_acid")
+                )
             
             # Type 3: Plants (only allowed/forbidden check, NO dosage check)
-            elif await self._is_plant(ingredient_name):
-                result = await self._check_plant(ingredient_name, form)
+            elif await self._is_plant(ingredient_name, refs.get("plant")):
+                result = await self._check_plant(ingredient_name, form, refs.get("plant"))
             
             # Type 4: Microorganisms (only allowed/forbidden check, NO dosage check)
-            elif await self._is_microorganism(ingredient_name):
-                result = await self._check_microorganism(ingredient_name, form)
+            elif await self._is_microorganism(ingredient_name, refs.get("microorganism")):
+                result = await self._check_microorganism(
+                    ingredient_name, form, refs.get("microorganism")
+                )
             
             # Type 5: Physiological substances (from max_doses_table1)
-            elif await self._is_physiological(ingredient_name):
-                result = await self._check_physiological(ingredient_name, quantity, unit, form)
+            elif await self._is_physiological(ingredient_name, refs.get("physiological")):
+                result = await self._check_physiological(
+                    ingredient_name, quantity, unit, form, refs.get("physiological")
+                )
             
             # Type 6: Novel Foods (future)
-            elif await self._is_novel_food(ingredient_name):
-                result = await self._check_novel_food(ingredient_name, quantity, unit, form)
+            elif await self._is_novel_food(ingredient_name, refs.get("novel_food")):
+                result = await self._check_novel_food(
+                    ingredient_name, quantity, unit, form, refs.get("novel_food")
+                )
             
             # Type 7: Other substances (MSM, coenzymes, etc.) - FIX-1
-            elif await self._is_other_substance(ingredient_name):
-                result = await self._check_other_substance(ingredient_name, quantity, unit, form)
+            elif await self._is_other_substance(ingredient_name, refs.get("other_substance")):
+                result = await self._check_other_substance(
+                    ingredient_name, quantity, unit, form, refs.get("other_substance")
+                )
             
             # Type 8: Unknown substance
             else:
@@ -204,106 +292,338 @@ class DosageService:
         
         return result
     
+    # ==================== BATCH REFERENCE RESOLUTION ====================
+    
+    async def resolve_references(self, names: List[str]) -> Dict[str, Dict[str, List[Dict]]]:
+        """
+        Класифікувати всі назви інгредієнтів по всіх довідкових таблицях за один прохід.
+        
+        На кожну таблицю - один запит (select "*") з OR по всіх назвах,
+        далі рядки розкладаються по назвах в Python. Кількість запитів
+        залежить від кількості таблиць, а не від кількості інгредієнтів.
+        Якщо завантажений регуляторний снапшот - рядки беруться з нього
+        без жодного запиту до БД.
+        
+        Args:
+            names: Назви інгредієнтів
+        
+        Returns:
+            {
+                "Вітамін С": {
+                    "banned_substance": [],
+                    "vitamin_mineral": [{...row...}],
+                    ...
+                },
+                ...
+            }
+            Якщо запит до таблиці не вдався - категорії немає в словнику,
+            і _is_*/_check_* методи зроблять звичайний запит самі.
+        
+        З CLASSIFY_RPC_ENABLED (і без снапшоту) всі таблиці перевіряються
+        одним викликом classify_ingredients.
+        """
+        unique_names = list(dict.fromkeys(name for name in names if name))
+        references: Dict[str, Dict[str, List[Dict]]] = {name: {} for name in unique_names}
+        if not unique_names:
+            return references
+        
+        snapshot = regulatory_snapshot.current()
+        if snapshot is None and settings.classify_rpc_enabled:
+            try:
+                return self._references_from_classification(
+                    unique_names, await self.classify_ingredients(unique_names)
+                )
+            except Exception as e:
+                logger.warning(f"classify_ingredients RPC failed ({e}), falling back to per-table lookups")
+        
+        for category, (table, columns, filters) in REFERENCE_CATEGORIES.items():
+            try:
+                if snapshot is not None and snapshot.has(table):
+                    rows = [
+                        row for row in snapshot.rows(table)
+                        if all(row.get(key) == value for key, value in filters.items())
+                    ]
+                elif postgres_reference.enabled and table in REFERENCE_READ_TABLES:
+                    rows = await postgres_reference.fetch_matching(table, columns, unique_names, filters)
+                else:
+                    rows = await self._fetch_rows_matching_any(table, columns, filters, unique_names)
+            except Exception as e:
+                logger.debug(f"Batch lookup in {table} failed: {e}")
+                continue
+            
+            for name in unique_names:
+                references[name][category] = [
+                    row for row in rows
+                    if any(_ilike_contains(row.get(column), name) for column in columns)
+                ]
+        
+        try:
+            if snapshot is not None and snapshot.has("microorganisms"):
+                microorganisms = snapshot.rows("microorganisms")
+            else:
+                microorganisms = await self._fetch_microorganisms(unique_names)
+        except Exception as e:
+            logger.debug(f"Batch lookup in microorganisms failed: {e}")
+        else:
+            for name in unique_names:
+                parts = name.split()
+                references[name]["microorganism"] = [
+                    row for row in microorganisms
+                    if len(parts) >= 2
+                    and row.get("genus") == parts[0]
+                    and row.get("species") == parts[1]
+                ]
+        
+        source = f" (snapshot {snapshot.version})" if snapshot is not None else ""
+        logger.info(
+            f"Resolved {len(unique_names)} ingredients against "
+            f"{len(REFERENCE_CATEGORIES) + 1} reference tables{source}"
+        )
+        return references
+    
+    async def classify_ingredients(self, names: List[str]) -> List[Dict]:
+        """
+        RPC classify_ingredients: весь список інгредієнтів одним викликом
+        (supabase_classify_ingredients_migration.sql)
+        
+        Returns:
+            [{"name", "category", "matches": {категорія: [рядки]},
+              "form": {..., "coefficient"} | None,
+              "limits": {"base_substance", "vitamin_mineral", "efsa", "table1"}}]
+        """
+        return await self.supabase.execute(self.supabase.rpc("classify_ingredients", {"names": names}))
+    
+    def _references_from_classification(
+        self, names: List[str], classified: List[Dict]
+    ) -> Dict[str, Dict[str, List[Dict]]]:
+        """
+        Результат classify_ingredients у форматі resolve_references
+        
+        Ліміти базових речовин одразу кладуться в кеш-бекенд під ключами
+        _cached_lookup, тож _get_vitamin_mineral / _get_efsa_limits /
+        _get_max_dose_table1 для них не роблять окремих запитів. Знайдені
+        форми передаються mapper'у (seed_forms) - parse_ingredient не шукає
+        їх у substance_form_conversions.
+        """
+        by_name = {row["name"]: row for row in classified}
+        references: Dict[str, Dict[str, List[Dict]]] = {}
+        cache = get_cache_backend()
+        
+        for name in names:
+            row = by_name.get(name)
+            if row is None:
+                references[name] = {}
+                continue
+            matches = row.get("matches") or {}
+            references[name] = {
+                category: matches.get(category) or []
+                for category in (*REFERENCE_CATEGORIES, "microorganism")
+            }
+            
+            limits = row.get("limits") or {}
+            base = " ".join(str(limits.get("base_substance") or name).split())
+            vitamin_mineral = limits.get("vitamin_mineral")
+            # _check_vitamin_mineral шукає EFSA за efsa_mapping, якщо він заданий (як і RPC)
+            efsa_name = " ".join(str((vitamin_mineral or {}).get("efsa_mapping") or base).split())
+            for key, value in (
+                (cache_key("vitamin_mineral", base), vitamin_mineral),
+                (cache_key("efsa_limits", efsa_name), limits.get("efsa")),
+                (cache_key("table1", base, "mineral", "vitamin"), limits.get("table1")),
+            ):
+                try:
+                    cache.set(REFERENCE_CACHE_NAMESPACE, key, value, settings.reference_cache_ttl)
+                except Exception as e:
+                    logger.warning(f"Cache {cache.name} set failed: {e}")
+        
+        self.mapper.seed_forms({name: by_name[name].get("form") for name in names if name in by_name})
+        logger.info(f"Resolved {len(names)} ingredients with one classify_ingredients call")
+        return references
+    
+    async def _fetch_rows_matching_any(
+        self,
+        table: str,
+        columns: Tuple[str, ...],
+        filters: Dict[str, str],
+        names: List[str],
+    ) -> List[Dict]:
+        """Один select("*") з ILIKE OR-умовою по всіх назвах (порціями)"""
+        rows: List[Dict] = []
+        seen_ids = set()
+        
+        for offset in range(0, len(names), RESOLVE_CHUNK_SIZE):
+            chunk = names[offset:offset + RESOLVE_CHUNK_SIZE]
+            conditions = ",".join(
+                f"{column}.ilike.{_quote_filter_value(f'%{name}%')}"
+                for name in chunk
+                for column in columns
+            )
+            query = self.supabase.table(table).select("*").or_(conditions)
+            for key, value in filters.items():
+                query = query.eq(key, value)
+            
+            for row in await self.supabase.execute(query):
+                row_id = row.get("id")
+                if row_id is not None:
+                    if row_id in seen_ids:
+                        continue
+                    seen_ids.add(row_id)
+                rows.append(row)
+        
+        return rows
+    
+    async def _fetch_microorganisms(self, names: List[str]) -> List[Dict]:
+        """Мікроорганізми шукаються по точній парі genus + species"""
+        pairs = list(dict.fromkeys(
+            (parts[0], parts[1])
+            for parts in (name.split() for name in names)
+            if len(parts) >= 2
+        ))
+        rows: List[Dict] = []
+        
+        for offset in range(0, len(pairs), RESOLVE_CHUNK_SIZE):
+            chunk = pairs[offset:offset + RESOLVE_CHUNK_SIZE]
+            conditions = ",".join(
+                f"and(genus.eq.{_quote_filter_value(genus)},species.eq.{_quote_filter_value(species)})"
+                for genus, species in chunk
+            )
+            rows.extend(
+                await self.supabase.execute(self.supabase.table("microorganisms").select("*").or_(conditions))
+            )
+        
+        return rows
+    
     # ==================== TYPE CHECKING METHODS ====================
     
-    async def _is_banned_substance(self, ingredient_name: str) -> bool:
+    async def _is_banned_substance(
+        self, ingredient_name: str, rows: Optional[List[Dict]] = None
+    ) -> bool:
         """Check if substance is in banned_substances table (PRIORITY!)"""
+        if rows is not None:
+            return len(rows) > 0
         try:
-            result = self.supabase.table("banned_substances").select("id").or_(
+            rows = await self.supabase.execute(self.supabase.table("banned_substances").select("id").or_(
                 f"substance_name_ua.ilike.%{ingredient_name}%,substance_name_en.ilike.%{ingredient_name}%"
-            ).execute()
-            return len(result.data) > 0
+            ))
+            return len(rows) > 0
         except Exception as e:
             logger.debug(f"Error checking banned substance {ingredient_name}: {e}")
             return False
     
-    async def _is_vitamin_mineral(self, ingredient_name: str) -> bool:
+    async def _is_vitamin_mineral(
+        self, ingredient_name: str, rows: Optional[List[Dict]] = None
+    ) -> bool:
         """Check if substance is in allowed_vitamins_minerals"""
+        if rows is not None:
+            return len(rows) > 0
         try:
             # FIX-2: Use ILIKE for case-insensitive fuzzy matching
-            result = self.supabase.table("allowed_vitamins_minerals").select("id").or_(
+            rows = await self.supabase.execute(self.supabase.table("allowed_vitamins_minerals").select("id").or_(
                 f"substance_name_ua.ilike.%{ingredient_name}%,substance_name_en.ilike.%{ingredient_name}%"
-            ).execute()
-            return len(result.data) > 0
+            ))
+            return len(rows) > 0
         except Exception as e:
             logger.debug(f"Error checking vitamin/mineral {ingredient_name}: {e}")
             return False
     
-    async def _is_amino_acid(self, ingredient_name: str) -> bool:
+    async def _is_amino_acid(
+        self, ingredient_name: str, rows: Optional[List[Dict]] = None
+    ) -> bool:
         """Check if substance is in amino_acids"""
+        if rows is not None:
+            return len(rows) > 0
         try:
             # FIX-2: Use ILIKE for case-insensitive fuzzy matching
-            result = self.supabase.table("amino_acids").select("id").or_(
+            rows = await self.supabase.execute(self.supabase.table("amino_acids").select("id").or_(
                 f"amino_acid_name_ua.ilike.%{ingredient_name}%,amino_acid_name_en.ilike.%{ingredient_name}%"
-            ).execute()
-            return len(result.data) > 0
+            ))
+            return len(rows) > 0
         except Exception as e:
             logger.debug(f"Error checking amino acid {ingredient_name}: {e}")
             return False
     
-    async def _is_plant(self, ingredient_name: str) -> bool:
+    async def _is_plant(
+        self, ingredient_name: str, rows: Optional[List[Dict]] = None
+    ) -> bool:
         """Check if substance is in allowed_plants"""
+        if rows is not None:
+            return len(rows) > 0
         try:
-            result = self.supabase.table("allowed_plants").select("id").or_(
+            rows = await self.supabase.execute(self.supabase.table("allowed_plants").select("id").or_(
                 f"botanical_name_lat.ilike.%{ingredient_name}%,common_name_ua.ilike.%{ingredient_name}%"
-            ).execute()
-            return len(result.data) > 0
+            ))
+            return len(rows) > 0
         except Exception as e:
             logger.debug(f"Error checking plant {ingredient_name}: {e}")
             return False
     
-    async def _is_microorganism(self, ingredient_name: str) -> bool:
+    async def _is_microorganism(
+        self, ingredient_name: str, rows: Optional[List[Dict]] = None
+    ) -> bool:
         """Check if substance is in microorganisms"""
+        if rows is not None:
+            return len(rows) > 0
         try:
             # Split into genus and species if space exists
             parts = ingredient_name.split()
             if len(parts) >= 2:
                 genus, species = parts[0], parts[1]
-                result = self.supabase.table("microorganisms").select("id").eq(
+                rows = await self.supabase.execute(self.supabase.table("microorganisms").select("id").eq(
                     "genus", genus
-                ).eq("species", species).execute()
-                return len(result.data) > 0
+                ).eq("species", species))
+                return len(rows) > 0
             return False
         except Exception as e:
             logger.debug(f"Error checking microorganism {ingredient_name}: {e}")
             return False
     
-    async def _is_physiological(self, ingredient_name: str) -> bool:
+    async def _is_physiological(
+        self, ingredient_name: str, rows: Optional[List[Dict]] = None
+    ) -> bool:
         """Check if substance is in max_doses_table1 with category='physiological'"""
+        if rows is not None:
+            return len(rows) > 0
         try:
             # FIX-2: Use ILIKE for case-insensitive fuzzy matching
-            result = self.supabase.table("max_doses_table1").select("id").or_(
+            rows = await self.supabase.execute(self.supabase.table("max_doses_table1").select("id").or_(
                 f"substance_name_ua.ilike.%{ingredient_name}%,substance_name_en.ilike.%{ingredient_name}%"
-            ).eq("category", "physiological").execute()
-            return len(result.data) > 0
+            ).eq("category", "physiological"))
+            return len(rows) > 0
         except Exception as e:
             logger.debug(f"Error checking physiological {ingredient_name}: {e}")
             return False
     
-    async def _is_novel_food(self, ingredient_name: str) -> bool:
+    async def _is_novel_food(
+        self, ingredient_name: str, rows: Optional[List[Dict]] = None
+    ) -> bool:
         """Check if substance is in novel_foods"""
+        if rows is not None:
+            return len(rows) > 0
         try:
             # FIX-2: Use ILIKE for case-insensitive fuzzy matching
-            result = self.supabase.table("novel_foods").select("id").or_(
+            rows = await self.supabase.execute(self.supabase.table("novel_foods").select("id").or_(
                 f"substance_name_ua.ilike.%{ingredient_name}%,substance_name_en.ilike.%{ingredient_name}%"
-            ).execute()
-            return len(result.data) > 0
+            ))
+            return len(rows) > 0
         except Exception as e:
             logger.debug(f"Error checking novel food {ingredient_name}: {e}")
             return False
     
-    async def _is_other_substance(self, ingredient_name: str) -> bool:
+    async def _is_other_substance(
+        self, ingredient_name: str, rows: Optional[List[Dict]] = None
+    ) -> bool:
         """
         FIX-1: Check if substance is in other_substances table
         
         This table contains substances like MSM (methylsulfonylmethane),
         coenzymes, and other physiological substances not covered by other tables.
         """
+        if rows is not None:
+            return len(rows) > 0
         try:
-            result = self.supabase.table("other_substances").select("id").or_(
+            rows = await self.supabase.execute(self.supabase.table("other_substances").select("id").or_(
                 f"substance_name_ua.ilike.%{ingredient_name}%,substance_name_en.ilike.%{ingredient_name}%"
-            ).execute()
-            return len(result.data) > 0
+            ))
+            return len(rows) > 0
         except Exception as e:
             logger.debug(f"Error checking other substance {ingredient_name}: {e}")
             return False
@@ -534,7 +854,8 @@ class DosageService:
         ingredient_name: str, 
         quantity: float, 
         unit: str,
-        form: str
+        form: str,
+        rows: Optional[List[Dict]] = None,
     ) -> Optional[Dict]:
         """
         Check amino acid dosage
@@ -554,11 +875,18 @@ class DosageService:
             }
         
         try:
-            result = self.supabase.table("amino_acids").select("*").or_(
-                f"amino_acid_name_ua.eq.{ingredient_name},amino_acid_name_en.eq.{ingredient_name}"
-            ).execute()
+            if rows is not None:
+                # Рядки вже знайдені resolve_references (ILIKE) - лишити точні збіги
+                matched = [
+                    row for row in rows
+                    if ingredient_name in (row.get("amino_acid_name_ua"), row.get("amino_acid_name_en"))
+                ]
+            else:
+                matched = await self.supabase.execute(self.supabase.table("amino_acids").select("*").or_(
+                    f"amino_acid_name_ua.eq.{ingredient_name},amino_acid_name_en.eq.{ingredient_name}"
+                ))
             
-            if not result.data or len(result.data) == 0:
+            if not matched or len(matched) == 0:
                 return {
                     "type": "warning",
                     "warning": DosageWarning(
@@ -569,11 +897,11 @@ class DosageService:
                 }
             
             # Take first match
-            amino_acid = result.data[0]
+            amino_acid = matched[0]
             
             # Log if multiple matches
-            if len(result.data) > 1:
-                logger.warning(f"Multiple matches for amino acid '{ingredient_name}': {len(result.data)}")
+            if len(matched) > 1:
+                logger.warning(f"Multiple matches for amino acid '{ingredient_name}': {len(matched)}")
             
             # Dose is already in table!
             max_dose = amino_acid.get("max_daily_dose")
@@ -628,7 +956,12 @@ class DosageService:
                 )
             }
     
-    async def _check_plant(self, ingredient_name: str, form: str) -> Optional[Dict]:
+    async def _check_plant(
+        self,
+        ingredient_name: str,
+        form: str,
+        rows: Optional[List[Dict]] = None,
+    ) -> Optional[Dict]:
         """
         Check plant
         
@@ -636,11 +969,12 @@ class DosageService:
         DOSAGE IS NOT CHECKED
         """
         try:
-            result = self.supabase.table("allowed_plants").select("*").or_(
-                f"botanical_name_lat.ilike.%{ingredient_name}%,common_name_ua.ilike.%{ingredient_name}%"
-            ).execute()
+            if rows is None:
+                rows = await self.supabase.execute(self.supabase.table("allowed_plants").select("*").or_(
+                    f"botanical_name_lat.ilike.%{ingredient_name}%,common_name_ua.ilike.%{ingredient_name}%"
+                ))
             
-            if result.data and len(result.data) > 0:
+            if rows and len(rows) > 0:
                 return {
                     "type": "ok",
                     "message": "Рослина дозволена, доза не обмежена"
@@ -670,7 +1004,12 @@ class DosageService:
                 )
             }
     
-    async def _check_microorganism(self, ingredient_name: str, form: str) -> Optional[Dict]:
+    async def _check_microorganism(
+        self,
+        ingredient_name: str,
+        form: str,
+        rows: Optional[List[Dict]] = None,
+    ) -> Optional[Dict]:
         """
         Check microorganism
         
@@ -692,11 +1031,12 @@ class DosageService:
             
             genus, species = parts[0], parts[1]
             
-            result = self.supabase.table("microorganisms").select("*").eq(
-                "genus", genus
-            ).eq("species", species).execute()
+            if rows is None:
+                rows = await self.supabase.execute(self.supabase.table("microorganisms").select("*").eq(
+                    "genus", genus
+                ).eq("species", species))
             
-            if result.data and len(result.data) > 0:
+            if rows and len(rows) > 0:
                 return {
                     "type": "ok",
                     "message": "Мікроорганізм дозволений"
@@ -731,7 +1071,8 @@ class DosageService:
         ingredient_name: str, 
         quantity: float, 
         unit: str,
-        form: str
+        form: str,
+        rows: Optional[List[Dict]] = None,
     ) -> Optional[Dict]:
         """
         Check physiological substance
@@ -750,11 +1091,17 @@ class DosageService:
             }
         
         try:
-            result = self.supabase.table("max_doses_table1").select("*").or_(
-                f"substance_name_ua.eq.{ingredient_name},substance_name_en.eq.{ingredient_name}"
-            ).eq("category", "physiological").execute()
+            if rows is not None:
+                matched = [
+                    row for row in rows
+                    if ingredient_name in (row.get("substance_name_ua"), row.get("substance_name_en"))
+                ]
+            else:
+                matched = await self.supabase.execute(self.supabase.table("max_doses_table1").select("*").or_(
+                    f"substance_name_ua.eq.{ingredient_name},substance_name_en.eq.{ingredient_name}"
+                ).eq("category", "physiological"))
             
-            if not result.data or len(result.data) == 0:
+            if not matched or len(matched) == 0:
                 return {
                     "type": "warning",
                     "warning": DosageWarning(
@@ -765,11 +1112,11 @@ class DosageService:
                 }
             
             # Take first match
-            physiological = result.data[0]
+            physiological = matched[0]
             
             # Log if multiple matches
-            if len(result.data) > 1:
-                logger.warning(f"Multiple matches for physiological substance '{ingredient_name}': {len(result.data)}")
+            if len(matched) > 1:
+                logger.warning(f"Multiple matches for physiological substance '{ingredient_name}': {len(matched)}")
             max_dose = physiological.get("max_dose_value")
             dose_unit = physiological.get("max_dose_unit")
             
@@ -829,7 +1176,8 @@ class DosageService:
         ingredient_name: str, 
         quantity: float, 
         unit: str,
-        form: str
+        form: str,
+        rows: Optional[List[Dict]] = None,
     ) -> Optional[Dict]:
         """
         Check Novel Food
@@ -848,11 +1196,18 @@ class DosageService:
             }
         
         try:
-            result = self.supabase.table("novel_foods").select("*").or_(
-                f"substance_name_ua.eq.{ingredient_name},substance_name_en.eq.{ingredient_name}"
-            ).eq("status", "active").execute()
+            if rows is not None:
+                matched = [
+                    row for row in rows
+                    if ingredient_name in (row.get("substance_name_ua"), row.get("substance_name_en"))
+                    and row.get("status") == "active"
+                ]
+            else:
+                matched = await self.supabase.execute(self.supabase.table("novel_foods").select("*").or_(
+                    f"substance_name_ua.eq.{ingredient_name},substance_name_en.eq.{ingredient_name}"
+                ).eq("status", "active"))
             
-            if not result.data or len(result.data) == 0:
+            if not matched or len(matched) == 0:
                 return {
                     "type": "warning",
                     "warning": DosageWarning(
@@ -865,11 +1220,11 @@ class DosageService:
                 }
             
             # Take first match
-            novel_food = result.data[0]
+            novel_food = matched[0]
             
             # Log if multiple matches
-            if len(result.data) > 1:
-                logger.warning(f"Multiple matches for novel food '{ingredient_name}': {len(result.data)}")
+            if len(matched) > 1:
+                logger.warning(f"Multiple matches for novel food '{ingredient_name}': {len(matched)}")
             max_dose = novel_food.get("max_daily_dose")
             dose_unit = novel_food.get("unit")
             
@@ -914,7 +1269,8 @@ class DosageService:
         ingredient_name: str, 
         quantity: float, 
         unit: str,
-        form: str
+        form: str,
+        rows: Optional[List[Dict]] = None,
     ) -> Optional[Dict]:
         """
         FIX-1: Check Other Substances (MSM, coenzymes, etc.)
@@ -934,11 +1290,12 @@ class DosageService:
             }
         
         try:
-            result = self.supabase.table("other_substances").select("*").or_(
-                f"substance_name_ua.ilike.%{ingredient_name}%,substance_name_en.ilike.%{ingredient_name}%"
-            ).execute()
+            if rows is None:
+                rows = await self.supabase.execute(self.supabase.table("other_substances").select("*").or_(
+                    f"substance_name_ua.ilike.%{ingredient_name}%,substance_name_en.ilike.%{ingredient_name}%"
+                ))
             
-            if not result.data or len(result.data) == 0:
+            if not rows or len(rows) == 0:
                 return {
                     "type": "warning",
                     "warning": DosageWarning(
@@ -951,11 +1308,11 @@ class DosageService:
                 }
             
             # Take first match
-            other_substance = result.data[0]
+            other_substance = rows[0]
             
             # Log if multiple matches
-            if len(result.data) > 1:
-                logger.warning(f"Multiple matches for other substance '{ingredient_name}': {len(result.data)}")
+            if len(rows) > 1:
+                logger.warning(f"Multiple matches for other substance '{ingredient_name}': {len(rows)}")
             
             max_dose = other_substance.get("max_daily_dose")
             dose_unit = other_substance.get("unit", "мг")
@@ -1013,50 +1370,105 @@ class DosageService:
     
     # ==================== HELPER METHODS ====================
     
-    async def _get_vitamin_mineral(self, ingredient_name: str) -> Optional[Dict]:
-        """LIKE пошук в allowed_vitamins_minerals"""
-        try:
-            # Normalize: видалити зайві пробіли
-            substance_name = " ".join(ingredient_name.split()).strip()
-            pattern = f"{substance_name}%"
-            
-            # LIKE пошук по початку назви (case-insensitive)
-            # Спробувати пошук по substance_name_ua
+    async def _ilike_first(
+        self,
+        table: str,
+        select: str,
+        pattern: str,
+        label: str,
+        categories: Optional[List[str]] = None,
+    ) -> Tuple[Optional[Dict], bool]:
+        """
+        LIKE пошук по початку назви: спочатку substance_name_ua, потім substance_name_en
+
+        Returns:
+            (рядок або None, чи всі запити пройшли без помилок) - результат
+            з помилкою БД не кешується, щоб збій не закріпився на TTL
+        """
+        if postgres_reference.enabled:
             try:
-                result = (
-                    self.supabase.table("allowed_vitamins_minerals")
-                    .select("*")
-                    .ilike("substance_name_ua", pattern)
-                    .limit(1)
-                    .execute()
+                row = await postgres_reference.first_by_prefix(
+                    table, ("substance_name_ua", "substance_name_en"), pattern[:-1], categories,
                 )
-                
-                if result.data:
-                    found_name = result.data[0].get('substance_name_ua', 'N/A')
-                    logger.info(f"✅ Vitamin/mineral found (UA): '{substance_name}' → '{found_name}'")
-                    return result.data[0]
-            except Exception as e1:
-                logger.debug(f"Search by substance_name_ua failed: {e1}")
-            
-            # Якщо не знайдено по UA, спробувати по EN
+                if row is not None and select != "*":
+                    row = {column: row.get(column) for column in select.replace(" ", "").split(",")}
+                if row is not None:
+                    logger.info(f"✅ {label} found (postgres): '{pattern[:-1]}' → '{row.get('substance_name_ua', 'N/A')}'")
+                return row, True
+            except Exception as e:
+                logger.debug(f"Postgres lookup in {table} failed: {e}")
+        
+        complete = True
+        for column, lang in (("substance_name_ua", "UA"), ("substance_name_en", "EN")):
             try:
-                result = (
-                    self.supabase.table("allowed_vitamins_minerals")
-                    .select("*")
-                    .ilike("substance_name_en", pattern)
-                    .limit(1)
-                    .execute()
-                )
+                query = self.supabase.table(table).select(select).ilike(column, pattern)
+                if categories is not None:
+                    query = query.in_("category", categories)
+                rows = await self.supabase.execute(query.limit(1))
                 
-                if result.data:
-                    found_name = result.data[0].get('substance_name_ua', 'N/A')
-                    logger.info(f"✅ Vitamin/mineral found (EN): '{substance_name}' → '{found_name}'")
-                    return result.data[0]
-            except Exception as e2:
-                logger.debug(f"Search by substance_name_en failed: {e2}")
-            
-            return None
-            
+                if rows:
+                    found_name = rows[0].get('substance_name_ua', 'N/A')
+                    logger.info(f"✅ {label} found ({lang}): '{pattern[:-1]}' → '{found_name}'")
+                    return rows[0], True
+            except Exception as e:
+                complete = False
+                logger.debug(f"Search by {column} failed: {e}")
+        
+        return None, complete
+    
+    def _snapshot_first(
+        self,
+        snapshot: RegulatorySnapshot,
+        table: str,
+        substance_name: str,
+        label: str,
+        categories: Optional[List[str]] = None,
+    ) -> Optional[Dict]:
+        """_ilike_first по локальному снапшоту (індекс назв, без запитів до БД)"""
+        predicate = (lambda row: row.get("category") in categories) if categories is not None else None
+        for column, lang in (("substance_name_ua", "UA"), ("substance_name_en", "EN")):
+            row = snapshot.find_prefix(table, column, substance_name, predicate)
+            if row is not None:
+                logger.info(f"✅ {label} found ({lang}, snapshot): '{substance_name}' → '{row.get('substance_name_ua', 'N/A')}'")
+                return row
+        return None
+    
+    async def _cached_lookup(
+        self,
+        kind: str,
+        table: str,
+        select: str,
+        name: str,
+        label: str,
+        categories: Optional[List[str]] = None,
+    ) -> Optional[Dict]:
+        """
+        Довідковий рядок: з регуляторного снапшоту, якщо він завантажений,
+        інакше через кеш-бекенд (namespace REFERENCE_CACHE_NAMESPACE)
+
+        Кеш спільний для всіх worker'ів при CACHE_BACKEND=redis; "не знайдено"
+        теж кешується. Інвалідація - scripts/update_regulations.py.
+        """
+        # Normalize: видалити зайві пробіли
+        substance_name = " ".join(name.split()).strip()
+        snapshot = regulatory_snapshot.current()
+        if snapshot is not None and snapshot.has(table):
+            return self._snapshot_first(snapshot, table, substance_name, label, categories)
+        
+        key = cache_key(kind, substance_name, *(sorted(categories) if categories else ()))
+        return await get_cache_backend().get_or_set_async(
+            REFERENCE_CACHE_NAMESPACE,
+            key,
+            lambda: self._ilike_first(table, select, f"{substance_name}%", label, categories),
+            ttl_seconds=settings.reference_cache_ttl,
+        )
+    
+    async def _get_vitamin_mineral(self, ingredient_name: str) -> Optional[Dict]:
+        """LIKE пошук в allowed_vitamins_minerals"""
+        try:
+            return await self._cached_lookup(
+                "vitamin_mineral", "allowed_vitamins_minerals", "*", ingredient_name, "Vitamin/mineral"
+            )
         except Exception as e:
             logger.error(f"Error getting vitamin/mineral info for {ingredient_name}: {e}")
             return None
@@ -1067,49 +1479,16 @@ class DosageService:
         Знайде: "Магній", "Магній (цитрат)", "Магній будь-що"
         """
         try:
-            # Normalize: видалити зайві пробіли
-            substance_name = " ".join(substance_name.split()).strip()
-            pattern = f"{substance_name}%"
-            
-            # LIKE пошук по початку назви (case-insensitive)
-            # Використовуємо правильний синтаксис для Supabase Python SDK
-            try:
-                # Спробувати пошук по substance_name_ua
-                result = (
-                    self.supabase.table("efsa_limits")
-                    .select("substance_name_ua, substance_name_en, ul_value, ul_unit, safe_level_value, safe_level_unit, notes")
-                    .ilike("substance_name_ua", pattern)
-                    .limit(1)
-                    .execute()
-                )
-                
-                if result.data:
-                    found_name = result.data[0].get('substance_name_ua', 'N/A')
-                    logger.info(f"✅ EFSA limit found (UA): '{substance_name}' → '{found_name}'")
-                    return result.data[0]
-            except Exception as e1:
-                logger.debug(f"Search by substance_name_ua failed: {e1}")
-            
-            # Якщо не знайдено по UA, спробувати по EN
-            try:
-                result = (
-                    self.supabase.table("efsa_limits")
-                    .select("substance_name_ua, substance_name_en, ul_value, ul_unit, safe_level_value, safe_level_unit, notes")
-                    .ilike("substance_name_en", pattern)
-                    .limit(1)
-                    .execute()
-                )
-                
-                if result.data:
-                    found_name = result.data[0].get('substance_name_ua', 'N/A')
-                    logger.info(f"✅ EFSA limit found (EN): '{substance_name}' → '{found_name}'")
-                    return result.data[0]
-            except Exception as e2:
-                logger.debug(f"Search by substance_name_en failed: {e2}")
-            
-            logger.info(f"⚠️ EFSA limit not found for: {substance_name}")
-            return None
-            
+            efsa_data = await self._cached_lookup(
+                "efsa_limits",
+                "efsa_limits",
+                "substance_name_ua, substance_name_en, ul_value, ul_unit, safe_level_value, safe_level_unit, notes",
+                substance_name,
+                "EFSA limit",
+            )
+            if efsa_data is None:
+                logger.info(f"⚠️ EFSA limit not found for: {substance_name}")
+            return efsa_data
         except Exception as e:
             logger.error(f"Error getting EFSA limits for {substance_name}: {e}")
             return None
@@ -1121,49 +1500,9 @@ class DosageService:
     ) -> Optional[Dict]:
         """LIKE пошук в max_doses_table1"""
         try:
-            # Normalize: видалити зайві пробіли
-            substance_name = " ".join(ingredient_name.split()).strip()
-            pattern = f"{substance_name}%"
-            
-            # LIKE пошук по початку назви (case-insensitive)
-            # Спробувати пошук по substance_name_ua
-            try:
-                result = (
-                    self.supabase.table("max_doses_table1")
-                    .select("*")
-                    .ilike("substance_name_ua", pattern)
-                    .in_("category", categories)
-                    .limit(1)
-                    .execute()
-                )
-                
-                if result.data:
-                    found_name = result.data[0].get('substance_name_ua', 'N/A')
-                    logger.info(f"✅ Table1 dose found (UA): '{substance_name}' → '{found_name}'")
-                    return result.data[0]
-            except Exception as e1:
-                logger.debug(f"Search by substance_name_ua failed: {e1}")
-            
-            # Якщо не знайдено по UA, спробувати по EN
-            try:
-                result = (
-                    self.supabase.table("max_doses_table1")
-                    .select("*")
-                    .ilike("substance_name_en", pattern)
-                    .in_("category", categories)
-                    .limit(1)
-                    .execute()
-                )
-                
-                if result.data:
-                    found_name = result.data[0].get('substance_name_ua', 'N/A')
-                    logger.info(f"✅ Table1 dose found (EN): '{substance_name}' → '{found_name}'")
-                    return result.data[0]
-            except Exception as e2:
-                logger.debug(f"Search by substance_name_en failed: {e2}")
-            
-            return None
-            
+            return await self._cached_lookup(
+                "table1", "max_doses_table1", "*", ingredient_name, "Table1 dose", categories
+            )
         except Exception as e:
             logger.error(f"Error getting Table1 dose for {ingredient_name}: {e}")
             return None
@@ -1,11 +1,15 @@
 """Service for checking forbidden phrases on labels"""
 
 import logging
-import re
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
+from app.config import settings
 from app.db.supabase_client import SupabaseClient
+from app.db.dataset_version import dataset_version
+from app.db.regulatory_snapshot import regulatory_snapshot
+from app.db.table_snapshot import TableSnapshot
 from app.api.schemas.compliance import ComplianceError
+from app.utils.phrase_matcher import PhraseMatcher, normalize_phrase
 
 logger = logging.getLogger(__name__)
 
@@ -15,11 +19,25 @@ class ForbiddenPhrasesService:
     Перевірка заборонених фраз згідно Наказу МОЗ №1114
     
     Використовує таблицю: forbidden_phrases
+    
+    Фрази та автомат пошуку (PhraseMatcher) тримаються в снапшоті таблиці
+    і перебудовуються тільки при зміні версії снапшоту.
     """
 
+    _phrases_snapshot: Optional[TableSnapshot] = None
+
     def __init__(self):
         """Ініціалізація з підключенням до Supabase"""
         self.supabase = SupabaseClient().client
+        if ForbiddenPhrasesService._phrases_snapshot is None:
+            ForbiddenPhrasesService._phrases_snapshot = TableSnapshot(
+                "forbidden_phrases",
+                loader=self._load_phrase_rows,
+                builder=self._build_matcher,
+                ttl_seconds=settings.reference_cache_ttl,
+            )
+            regulatory_snapshot.add_listener(ForbiddenPhrasesService._phrases_snapshot.invalidate)
+            dataset_version.add_listener("forbidden_phrases", ForbiddenPhrasesService._phrases_snapshot.invalidate)
 
     async def check_phrases(self, full_text: str) -> List[ComplianceError]:
         """
@@ -36,40 +54,34 @@ class ForbiddenPhrasesService:
             return []
 
         try:
-            result = self.supabase.table("forbidden_phrases").select(
-                "phrase, phrase_variations, category, regulatory_source, explanation, severity"
-            ).execute()
-            records = result.data or []
+            records, matcher = await self._phrases_snapshot.get()
         except Exception as exc:
             logger.error(f"Error fetching forbidden phrases: {exc}", exc_info=True)
             raise
 
         logger.info(f"Checking forbidden phrases against {len(records)} records")
 
-        errors: List[ComplianceError] = []
+        # Один прохід по тексту для всіх фраз та варіацій
+        found = matcher.find_all(full_text)
 
-        for record in records:
-            phrase = record.get("phrase")
-            variations: Optional[List[str]] = record.get("phrase_variations")
+        errors: List[ComplianceError] = []
 
-            candidates: List[str] = []
-            if phrase:
-                candidates.append(phrase)
-            if variations:
-                candidates.extend(filter(None, variations))
+        for record, candidates in records:
+            if not found:
+                break
 
             violation_found = False
 
             for candidate in candidates:
-                for match in self._find_phrase_matches(candidate, full_text):
-                    if self._has_negation_context(full_text, match.start()):
+                for start, end in found.get(candidate, []):
+                    if self._has_negation_context(full_text, start):
                         logger.debug(
                             "Skipping forbidden phrase '%s' due to negation context",
                             candidate,
                         )
                         continue
 
-                    found_phrase = match.group(0)
+                    found_phrase = " ".join(full_text[start:end].split())
                     logger.info(f"Forbidden phrase detected: {found_phrase}")
                     explanation = record.get("explanation") or ""
                     recommendation_suffix = explanation.strip()
@@ -108,14 +120,41 @@ class ForbiddenPhrasesService:
             return ""
         return " ".join(text.lower().split())
 
-    def _find_phrase_matches(self, phrase: str, text: str) -> List[re.Match]:
-        """Знайти входження фрази у тексті (цілі слова, без урахування регістру)"""
+    async def _load_phrase_rows(self) -> List[Dict]:
+        """Завантажити всі рядки forbidden_phrases (зі снапшоту, якщо є)"""
+        snapshot = regulatory_snapshot.current()
+        if snapshot is not None and snapshot.has("forbidden_phrases"):
+            return snapshot.rows("forbidden_phrases")
+        result = self.supabase.table("forbidden_phrases").select(
+            "phrase, phrase_variations, category, regulatory_source, explanation, severity"
+        ).execute()
+        return result.data or []
+
+    def _build_matcher(self, rows: List[Dict]) -> Tuple[List[Tuple[Dict, List[str]]], PhraseMatcher]:
+        """
+        Підготувати записи (з нормалізованими кандидатами) та автомат пошуку
+
+        Returns:
+            ([(запис, [фраза, варіації...]), ...], PhraseMatcher)
+        """
+        records: List[Tuple[Dict, List[str]]] = []
+        for record in rows:
+            phrase = record.get("phrase")
+            variations: Optional[List[str]] = record.get("phrase_variations")
 
-        if not phrase or not text:
-            return []
+            candidates: List[str] = []
+            if phrase:
+                candidates.append(phrase)
+            if variations:
+                candidates.extend(filter(None, variations))
+
+            normalized = [normalize_phrase(candidate) for candidate in candidates]
+            records.append((record, [candidate for candidate in normalized if candidate]))
 
-        pattern = re.compile(rf"\b{re.escape(phrase)}\b", re.IGNORECASE | re.UNICODE)
-        return list(pattern.finditer(text))
+        matcher = PhraseMatcher(
+            candidate for _, candidates in records for candidate in candidates
+        )
+        return records, matcher
 
     def _has_negation_context(self, text: str, match_start: int) -> bool:
         """Перевірити чи є заперечення перед знайденою фразою"""
@@ -0,0 +1,158 @@
+"""Local background job queue with a bounded worker pool"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Черга заповнена - запит треба повторити пізніше"""
+
+
+@dataclass
+class Job:
+    """Задача в черзі"""
+    job_id: str
+    run: Callable[[], Awaitable[Any]] = field(repr=False)
+    status: str = "queued"  # queued, running, completed, failed
+    result: Any = field(default=None, repr=False)
+    error: Optional[str] = None
+    error_status: Optional[int] = None  # HTTP статус помилки (404 тощо)
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    started_at: Optional[str] = None
+    completed_at: Optional[str] = None
+    duration_ms: Optional[float] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def to_dict(self) -> Dict:
+        """Стан задачі без результату"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "error": self.error,
+            "error_status": self.error_status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "duration_ms": self.duration_ms,
+        }
+
+
+class JobQueue:
+    """
+    Черга задач з пулом воркерів у процесі API
+
+    Воркери стартують при першій задачі (потрібен event loop). Черга
+    обмежена max_size - при перевантаженні submit кидає QueueFullError
+    замість нескінченного накопичення задач у пам'яті.
+    """
+
+    def __init__(self, workers: int = 4, max_size: int = 1000, max_finished: int = 1000):
+        """
+        Args:
+            workers: Кількість воркерів
+            max_size: Максимум задач у черзі (очікують виконання)
+            max_finished: Скільки завершених задач тримати для polling
+        """
+        self.workers = workers
+        self.max_size = max_size
+        self.max_finished = max_finished
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def submit(self, job_id: str, run: Callable[[], Awaitable[Any]]) -> Job:
+        """
+        Поставити задачу в чергу
+
+        Повторний submit задачі, що ще не завершилась, повертає існуючу.
+
+        Raises:
+            QueueFullError: У черзі вже max_size задач
+        """
+        existing = self.jobs.get(job_id)
+        if existing and existing.status in ("queued", "running"):
+            return existing
+
+        self._ensure_workers()
+        if self._queue.qsize() >= self.max_size:
+            raise QueueFullError(f"Job queue is full ({self.max_size} jobs)")
+
+        job = Job(job_id=job_id, run=run)
+        self.jobs[job_id] = job
+        self.jobs.move_to_end(job_id)
+        self._queue.put_nowait(job)
+        self._evict()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Задача цього процесу або None"""
+        return self.jobs.get(job_id)
+
+    def stats(self) -> Dict:
+        """Розмір черги та кількість задач по статусах"""
+        counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return {"workers": len(self._tasks), **counts}
+
+    async def stop(self) -> None:
+        """Зупинити воркерів (при зупинці застосунку)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._loop = None
+
+    def _ensure_workers(self) -> None:
+        # Новий event loop (перезапуск застосунку в тому ж процесі) - нові воркери
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._tasks = []
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._execute(job)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = datetime.utcnow().isoformat()
+        started = time.perf_counter()
+        try:
+            job.result = await job.run()
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "Cancelled"
+            raise
+        except Exception as exc:
+            job.status = "failed"
+            job.error = str(getattr(exc, "detail", None) or exc) or exc.__class__.__name__
+            job.error_status = getattr(exc, "status_code", None)
+            logger.error(f"Job {job.job_id} failed: {job.error}")
+        finally:
+            job.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            job.completed_at = datetime.utcnow().isoformat()
+            job.done.set()
+
+    def _evict(self) -> None:
+        """Прибрати найстаріші завершені задачі понад max_finished"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.done.is_set()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
@@ -3,7 +3,12 @@
 import logging
 from typing import Any, Callable, Dict, List, Optional
 
+from app.config import settings
+from app.data.loader import RegulatoryDataLoader
 from app.db.supabase_client import SupabaseClient
+from app.db.dataset_version import dataset_version
+from app.db.regulatory_snapshot import regulatory_snapshot
+from app.db.table_snapshot import TableSnapshot
 from app.api.schemas.compliance import ComplianceError
 
 logger = logging.getLogger(__name__)
@@ -75,6 +80,19 @@ FIELD_MAPPING: Dict[str, Callable[[Dict], Any]] = {
     "net_quantity": lambda d: d.get("product_info", {}).get("quantity") or d.get("quantity"),
     "batch_number": lambda d: d.get("product_info", {}).get("batch_number") or d.get("batch_number"),
     "allergen_info": lambda d: _check_allergen_compliance(d),
+    "storage_conditions": lambda d: d.get("storage"),
+    "not_medicinal_product": lambda d: d.get("mandatory_phrases", {}).get("has_not_medicine"),
+    "ingredient_quantities": lambda d: any(
+        i.get("quantity") is not None for i in d.get("ingredients", []) if i.get("type") != "excipient"
+    ),
+    "manufacturer_info": lambda d: (d.get("manufacturer") or {}).get("name") or d.get("operator", {}).get("name"),
+}
+
+# Назви полів у локальному mandatory_fields.json → назви в таблиці mandatory_fields
+JSON_FIELD_ALIASES: Dict[str, str] = {
+    "operator_full_address": "operator_address",
+    "ingredients_list": "composition",
+    "daily_dose": "recommended_dose",
 }
 
 
@@ -82,12 +100,25 @@ class MandatoryFieldsService:
     """
     Перевірка обов'язкових полів згідно Закону №2639-VIII та Наказу №1114
     
-    Використовує таблицю: mandatory_fields
+    Використовує таблицю: mandatory_fields (критичні поля кешуються в снапшоті;
+    якщо БД недоступна - mandatory_fields.json)
     """
 
+    _fields_snapshot: Optional[TableSnapshot] = None
+
     def __init__(self):
         """Ініціалізація з підключенням до Supabase"""
         self.supabase = SupabaseClient().client
+        if MandatoryFieldsService._fields_snapshot is None:
+            MandatoryFieldsService._fields_snapshot = TableSnapshot(
+                "mandatory_fields",
+                loader=self._load_critical_fields,
+                builder=list,
+                ttl_seconds=settings.reference_cache_ttl,
+                fallback=self._load_fallback_fields,
+            )
+            regulatory_snapshot.add_listener(MandatoryFieldsService._fields_snapshot.invalidate)
+            dataset_version.add_listener("mandatory_fields", MandatoryFieldsService._fields_snapshot.invalidate)
 
     async def check_fields(self, label_data: Dict) -> List[ComplianceError]:
         """
@@ -102,10 +133,7 @@ class MandatoryFieldsService:
         label_data = label_data or {}
 
         try:
-            result = self.supabase.table("mandatory_fields").select("*").eq(
-                "criticality", "critical"
-            ).execute()
-            records = result.data or []
+            records = await self._fields_snapshot.get()
         except Exception as exc:
             logger.error(f"Error fetching mandatory fields: {exc}", exc_info=True)
             raise
@@ -143,6 +171,44 @@ class MandatoryFieldsService:
         logger.info(f"Mandatory fields check completed: {len(errors)} errors found")
         return errors
 
+    async def _load_critical_fields(self) -> List[Dict]:
+        """Завантажити критичні поля з mandatory_fields (зі снапшоту, якщо є)"""
+        snapshot = regulatory_snapshot.current()
+        if snapshot is not None and snapshot.has("mandatory_fields"):
+            return [row for row in snapshot.rows("mandatory_fields") if row.get("criticality") == "critical"]
+        result = self.supabase.table("mandatory_fields").select("*").eq(
+            "criticality", "critical"
+        ).execute()
+        return result.data or []
+
+    @staticmethod
+    def _load_fallback_fields() -> List[Dict]:
+        """
+        Критичні поля з mandatory_fields.json у форматі таблиці
+
+        Поля, які неможливо перевірити за даними OCR (немає мапінгу),
+        пропускаються - інакше вони завжди давали б хибну помилку.
+        """
+        records: List[Dict] = []
+        for item in RegulatoryDataLoader.load_mandatory_fields():
+            if item.get("criticality") != "critical":
+                continue
+            field_name = JSON_FIELD_ALIASES.get(item.get("field_name"), item.get("field_name"))
+            if field_name not in FIELD_MAPPING:
+                logger.debug(f"Fallback mandatory field skipped (no mapping): {field_name}")
+                continue
+            records.append({
+                "field_name": field_name,
+                "field_name_ua": item.get("description") or field_name,
+                "regulatory_source": item.get("regulatory_source", ""),
+                "article_number": item.get("article"),
+                "criticality": item.get("criticality"),
+                "error_message": item.get("error_message"),
+                "recommendation": item.get("recommendation"),
+                "penalty_amount": item.get("penalty_amount"),
+            })
+        return records
+
     def _evaluate_field(self, field_name: Optional[str], data: Dict) -> Any:
         """Отримати значення поля з використанням мапінгу або шляху"""
 
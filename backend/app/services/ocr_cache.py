@@ -0,0 +1,212 @@
+"""Local cache of Claude OCR results keyed by content hash"""
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import sqlite3
+import time
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+def image_cache_key(image_bytes: bytes, model: str, prompt_version: str) -> str:
+    """
+    Ключ кешу для зображення етикетки
+
+    Хешуються пікселі (після EXIF-орієнтації), а не сирі байти файлу:
+    той самий макет, перезбережений з іншими метаданими, дає той самий ключ.
+    Якщо файл не декодується (PDF, пошкоджений файл) - хешуються сирі байти.
+
+    Args:
+        image_bytes: Байти зображення
+        model: Назва моделі Claude
+        prompt_version: Версія промптів (зміна промпта = новий ключ)
+
+    Returns:
+        sha256 hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{model}\n{prompt_version}\n".encode("utf-8"))
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            normalized = ImageOps.exif_transpose(image)
+            digest.update(f"{normalized.mode}:{normalized.size}\n".encode("utf-8"))
+            digest.update(normalized.tobytes())
+    except Exception:
+        digest.update(b"raw\n")
+        digest.update(image_bytes)
+
+    return digest.hexdigest()
+
+
+def text_cache_key(full_text: str, model: str, prompt_version: str) -> str:
+    """
+    Ключ кешу Stage 2 для тексту етикетки
+
+    Текст нормалізується (Unicode NFC, пробіли та переноси рядків згортаються),
+    тож той самий текст з іншим форматуванням дає той самий ключ.
+    Регістр зберігається - він впливає на відповідь моделі.
+
+    Args:
+        full_text: Текст з Stage 1 (або з текстового шару PDF)
+        model: Назва моделі Claude
+        prompt_version: Версія промптів
+
+    Returns:
+        sha256 hex digest
+    """
+    normalized = " ".join(unicodedata.normalize("NFC", full_text or "").split())
+    digest = hashlib.sha256()
+    digest.update(f"{model}\n{prompt_version}\n".encode("utf-8"))
+    digest.update(normalized.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    SQLite кеш результатів OCR з LRU та TTL витісненням
+
+    Один файл бази може містити кілька просторів імен (namespace),
+    кожен з власним лімітом записів. Помилки кешу ніколи не ламають OCR -
+    вони логуються і трактуються як промах.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        max_entries: int = 5000,
+        ttl_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            path: Шлях до SQLite файлу
+            namespace: Простір імен (наприклад "image")
+            max_entries: Максимум записів у просторі імен (LRU)
+            ttl_seconds: Час життя запису (None - без обмеження)
+        """
+        self.path = Path(path)
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        # Лічильники в межах процесу
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ocr_cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ocr_cache_accessed "
+                "ON ocr_cache(namespace, accessed_at)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Нове з'єднання на кожну операцію: методи виконуються в різних потоках
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    async def get(self, key: str) -> Optional[Dict]:
+        """Отримати значення або None (промах, прострочено, помилка)"""
+        try:
+            value = await asyncio.to_thread(self._get, key)
+        except Exception as exc:
+            logger.warning(f"OCR cache read failed ({self.namespace}): {exc}")
+            value = None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def stats(self) -> Dict:
+        """Статистика влучань кешу"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    async def set(self, key: str, value: Dict) -> None:
+        """Зберегти значення (JSON-серіалізоване)"""
+        try:
+            await asyncio.to_thread(self._set, key, value)
+        except Exception as exc:
+            logger.warning(f"OCR cache write failed ({self.namespace}): {exc}")
+
+    def _get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM ocr_cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                conn.execute(
+                    "DELETE FROM ocr_cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                return None
+
+            conn.execute(
+                "UPDATE ocr_cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+            return json.loads(value)
+
+    def _set(self, key: str, value: Dict) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (namespace, key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            # LRU: залишити max_entries останніх за часом доступу
+            conn.execute(
+                """
+                DELETE FROM ocr_cache WHERE namespace = ? AND key IN (
+                    SELECT key FROM ocr_cache WHERE namespace = ?
+                    ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.namespace, self.namespace, self.max_entries),
+            )
+
+    def clear(self) -> None:
+        """Видалити всі записи простору імен"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM ocr_cache WHERE namespace = ?", (self.namespace,))
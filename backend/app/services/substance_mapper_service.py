@@ -3,9 +3,17 @@
 import json
 import logging
 import re
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from app.db.supabase_client import SupabaseClient
+from app.config import settings
+from app.db.dataset_version import dataset_version
+from app.db.postgres_reference import postgres_reference
+from app.db.regulatory_snapshot import regulatory_snapshot
+from app.db.supabase_client import supabase_client
+from app.db.table_snapshot import TableSnapshot
+from app.utils.cache import TTLCache
+from app.utils.trigram_index import TrigramIndex
+from app.utils.ua_normalizer import normalize_name as lemmatize_name, normalize_names as lemmatize_names
 
 logger = logging.getLogger(__name__)
 
@@ -19,12 +27,60 @@ EXTRACT_KEYWORDS = [
     "витяжка", "настойка", "настой", "тинктура"
 ]
 
+# Таблиці, від яких залежить результат parse_ingredient (інвалідація кешу розборів)
+PARSE_REFERENCE_TABLES = ("substance_form_conversions", "allowed_plants", "excipients")
+
 
 class SubstanceMapperService:
     """Maps ingredient variations to base substances and converts to elemental content"""
 
+    # Снапшот substance_form_conversions спільний для всіх екземплярів
+    _forms_snapshot: Optional[TableSnapshot] = None
+    # Індекс назв allowed_plants (точні назви/леми + триграми для кандидатів)
+    _plants_snapshot: Optional[TableSnapshot] = None
+    # Результати parse_ingredient спільні для route та DosageService
+    _parse_cache: Optional[TTLCache] = None
+    # Форми, вже знайдені classify_ingredients (seed_forms), за назвою інгредієнта
+    _form_cache: Optional[TTLCache] = None
+    # Зростає при кожній інвалідації довідкових даних розбору (частина ключа кешу)
+    _parse_generation: int = 0
+
     def __init__(self):
-        self.supabase = SupabaseClient().client
+        # Async клієнт з пулом: fallback запити не блокують event loop
+        self.supabase = supabase_client
+        if SubstanceMapperService._parse_cache is None:
+            SubstanceMapperService._parse_cache = TTLCache(
+                "parse_ingredient",
+                max_entries=settings.parse_cache_max_entries,
+                ttl_seconds=settings.parse_cache_ttl,
+            )
+            SubstanceMapperService._form_cache = TTLCache(
+                "form_lookup",
+                max_entries=settings.parse_cache_max_entries,
+                ttl_seconds=settings.parse_cache_ttl,
+            )
+            regulatory_snapshot.add_listener(SubstanceMapperService.invalidate_parses)
+            for table in PARSE_REFERENCE_TABLES:
+                dataset_version.add_listener(table, SubstanceMapperService.invalidate_parses)
+        if SubstanceMapperService._forms_snapshot is None:
+            SubstanceMapperService._forms_snapshot = TableSnapshot(
+                "substance_form_conversions",
+                loader=self._load_form_rows,
+                builder=self._build_form_index,
+                ttl_seconds=settings.reference_cache_ttl,
+            )
+            regulatory_snapshot.add_listener(SubstanceMapperService._forms_snapshot.invalidate)
+            dataset_version.add_listener("substance_form_conversions", SubstanceMapperService._forms_snapshot.invalidate)
+        if SubstanceMapperService._plants_snapshot is None:
+            SubstanceMapperService._plants_snapshot = TableSnapshot(
+                "allowed_plants",
+                loader=self._load_plant_rows,
+                builder=self._build_plant_index,
+                ttl_seconds=settings.reference_cache_ttl,
+                fallback=list,  # БД недоступна - порожній індекс, далі ILIKE fallback
+            )
+            regulatory_snapshot.add_listener(SubstanceMapperService._plants_snapshot.invalidate)
+            dataset_version.add_listener("allowed_plants", SubstanceMapperService._plants_snapshot.invalidate)
         logger.info("SubstanceMapperService initialized")
 
     async def parse_ingredient(
@@ -32,6 +88,62 @@ class SubstanceMapperService:
         name: str,
         quantity: Optional[float],
         unit: str,
+    ) -> Dict:
+        """
+        Parse ingredient name and calculate elemental content (memoized)
+
+        Кожен інгредієнт розбирається один раз: в межах запиту (request_scope)
+        та процесу (LRU + TTL). Ключ включає покоління довідкових даних
+        (invalidate_parses) та версію снапшоту форм, тож після оновлення
+        форм, рослин чи excipients старі результати не використовуються.
+        Див. _parse_ingredient.
+        """
+        generation = self._parse_generation
+        cached = self._parse_cache.get((name, quantity, unit, generation, self._forms_snapshot.version))
+        if cached is not None:
+            logger.debug(f"parse_ingredient cache hit: '{name}'")
+            return dict(cached)
+
+        result = await self._parse_ingredient(name, quantity, unit)
+        # Версія після розбору: перший розбір міг завантажити снапшот
+        self._parse_cache.set((name, quantity, unit, generation, self._forms_snapshot.version), dict(result))
+        return result
+
+    @classmethod
+    def invalidate_parses(cls) -> None:
+        """
+        Скинути кеш розборів (змінились форми, рослини або excipients)
+
+        Версія снапшоту форм змінюється лише при перебудові, а влучання в
+        кеш перебудову не запускає - тому окреме покоління.
+        """
+        cls._parse_generation += 1
+        if cls._parse_cache is not None:
+            cls._parse_cache.clear()
+        if cls._form_cache is not None:
+            cls._form_cache.clear()
+
+    def seed_forms(self, forms: Dict[str, Dict]) -> None:
+        """
+        Запам'ятати форми, знайдені RPC classify_ingredients
+
+        Args:
+            forms: {назва інгредієнта: рядок substance_form_conversions}
+
+        _parse_ingredient бере таку форму замість пошуку в снапшоті
+        substance_form_conversions. Назви без форми не передаються: RPC
+        шукає лише точну назву, тож "не знайдено" перевіряє сам mapper
+        (відмінки, перестановка слів).
+        """
+        for name, row in forms.items():
+            if row:
+                self._form_cache.set((" ".join(name.split()), self._parse_generation), row)
+
+    async def _parse_ingredient(
+        self,
+        name: str,
+        quantity: Optional[float],
+        unit: str,
     ) -> Dict:
         """
         Parse ingredient name and calculate elemental content
@@ -164,7 +276,9 @@ class SubstanceMapperService:
 
         # Використовуємо очищену назву для нормалізації та пошуку
         name_normalized = self._normalize_name(name_clean)
-        form_data = await self._find_form_in_db(name_normalized)
+        form_data = self._form_cache.get((" ".join(original_name.split()), self._parse_generation))
+        if form_data is None:
+            form_data = await self._find_form_in_db(name_normalized, name_clean)
 
         if form_data:
             coefficient = form_data.get("elemental_coefficient_max") or form_data.get(
@@ -188,7 +302,7 @@ class SubstanceMapperService:
             if name_clean == "Біотин" and base_substance != "Біотин":
                 # Спробувати знайти "Біотин" в БД
                 biotin_normalized = self._normalize_name("Біотин")
-                biotin_form_data = await self._find_form_in_db(biotin_normalized)
+                biotin_form_data = await self._find_form_in_db(biotin_normalized, "Біотин")
                 original_substance_name = form_data.get("substance_name_ua", "N/A")
                 if biotin_form_data:
                     base_substance = "Біотин"
@@ -313,106 +427,220 @@ class SubstanceMapperService:
             "is_extract": is_extract,
             "extract_type": extract_type,
             "ratio": ratio,
+            # Найсхожіші відомі назви - підказка для "не знайдено"
+            "candidates": await self.suggest(name_clean),
         }
         
         return result
 
-    async def _find_form_in_db(self, name_normalized: str) -> Optional[Dict]:
+    async def _find_form_in_db(self, name_normalized: str, name_raw: Optional[str] = None) -> Optional[Dict]:
         """
-        Search for form in substance_form_conversions table
+        Search for form in substance_form_conversions snapshot
         
         Шукає по:
         1. substance_name_ua (найточніше)
         2. substance_name_en
         3. name_variations (варіанти назв)
 
+        Таблиця не сканується на кожен виклик: індекс з нормалізованих назв
+        будується один раз у _build_form_index і перебудовується за TTL.
+
         Args:
             name_normalized: Normalized ingredient name (lowercase, В→B)
+            name_raw: Назва до _normalize_name (для лем: "вітаміну" → "вітамін"
+                до заміни в→b); None - name_normalized
 
         Returns:
             Row from DB or None
         """
         try:
-            # FIX-7: Генеруємо варіанти з перестановкою слів
-            # "цинк цитрат" → ["цинк цитрат", "цитрат цинк"]
-            name_variants = self._generate_word_permutations(name_normalized)
-            
-            # СПОСІБ 1: Прямий пошук по substance_name_ua (найшвидше)
-            try:
-                # Завантажити всі записи та перевірити нормалізовані назви
-                # (бо ilike не завжди працює з нормалізованими назвами)
-                result_ua = self.supabase.table("substance_form_conversions").select("*").execute()
-                
-                if result_ua.data:
-                    for row in result_ua.data:
-                        substance_ua = row.get("substance_name_ua", "")
-                        substance_ua_normalized = self._normalize_name(substance_ua)
-                        
-                        # Перевірити всі варіанти (включаючи перестановки)
-                        for variant in name_variants:
-                            if substance_ua_normalized == variant:
-                                logger.info(
-                                    f"✅ Form found by substance_name_ua: '{name_normalized}' → '{substance_ua}' ({row.get('form_name_ua')})"
-                                )
-                                return row
-            except Exception as e:
-                logger.debug(f"Search by substance_name_ua failed: {e}")
-            
-            # СПОСІБ 2: Пошук по substance_name_en
-            try:
-                result_en = self.supabase.table("substance_form_conversions").select("*").execute()
-                
-                if result_en.data:
-                    for row in result_en.data:
-                        substance_en = row.get("substance_name_en", "")
-                        substance_en_normalized = self._normalize_name(substance_en)
-                        
-                        # Перевірити всі варіанти (включаючи перестановки)
-                        for variant in name_variants:
-                            if substance_en_normalized == variant:
-                                logger.info(
-                                    f"✅ Form found by substance_name_en: '{name_normalized}' → '{substance_en}' ({row.get('form_name_ua')})"
-                                )
-                                return row
-            except Exception as e:
-                logger.debug(f"Search by substance_name_en failed: {e}")
-            
-            # СПОСІБ 3: Пошук в name_variations (fallback - повільніше)
-            logger.debug(f"🔍 Searching in name_variations for: '{name_normalized}'")
-            result = self.supabase.table("substance_form_conversions").select("*").execute()
-            logger.debug(f"📊 Loaded {len(result.data or [])} forms from DB for variations search")
-
-            for row in result.data or []:
-                name_variations_raw = row.get("name_variations", [])
-                
-                # Визначити тип та парсити правильно
-                if isinstance(name_variations_raw, str):
-                    try:
-                        variations = json.loads(name_variations_raw)  # parse JSON string
-                    except json.JSONDecodeError:
-                        logger.warning(f"Failed to parse name_variations as JSON: {name_variations_raw}")
-                        variations = []
-                elif isinstance(name_variations_raw, list):
-                    variations = name_variations_raw  # вже list
-                else:
-                    variations = []  # fallback
-                
-                for variation in variations or []:
-                    variation_normalized = self._normalize_name(variation)
-                    # Перевірити всі варіанти (включаючи перестановки)
-                    for variant in name_variants:
-                        if variation_normalized == variant:
-                            logger.info(
-                                f"✅ Form found by name_variations: '{name_normalized}' → '{row.get('substance_name_ua')}' ({row.get('form_name_ua')})"
-                            )
-                            return row
-            
-            logger.debug(f"⚠️ Form not found for normalized name: '{name_normalized}'")
-            return None
+            index = await self._forms_snapshot.get()
         except Exception as exc:
-            logger.error(f"Error searching form in DB: {exc}", exc_info=True)
+            logger.error(f"Error loading substance_form_conversions: {exc}", exc_info=True)
             return None
 
+        # FIX-7: Генеруємо варіанти з перестановкою слів
+        # "цинк цитрат" → ["цинк цитрат", "цитрат цинк"]
+        name_variants = self._generate_word_permutations(name_normalized)
+
+        for field in ("substance_name_ua", "substance_name_en", "name_variations"):
+            bucket = index[field]
+            # Якщо кілька варіантів знайдено - перемагає рядок що раніше в таблиці
+            # (так само як при послідовному переборі рядків)
+            matches = [bucket[variant] for variant in name_variants if variant in bucket]
+            if matches:
+                _, row = min(matches, key=lambda match: match[0])
+                logger.info(
+                    f"✅ Form found by {field}: '{name_normalized}' → '{row.get('substance_name_ua')}' ({row.get('form_name_ua')})"
+                )
+                return row
+
+        # Відмінки: "цитрату магнію" і "цитрат магнію" мають однакові леми.
+        # Лематизується сира назва: після _normalize_name (в→b) словоформи
+        # з "в" ("вітаміну", "звіробою") не збігаються з таблицею лем
+        lemma_bucket = index.get("lemmas", {})
+        raw_variants = self._generate_word_permutations(" ".join((name_raw or name_normalized).lower().split()))
+        matches = [
+            lemma_bucket[key]
+            for key in (self._normalize_name(lemma) for lemma in lemmatize_names(raw_variants))
+            if key in lemma_bucket
+        ]
+        if matches:
+            _, row = min(matches, key=lambda match: match[0])
+            logger.info(
+                f"✅ Form found by lemmas: '{name_normalized}' → '{row.get('substance_name_ua')}' ({row.get('form_name_ua')})"
+            )
+            return row
+
+        # Триграмна схожість тут не застосовується: "вітамін b1" ≈ "вітамін b12",
+        # "d3" ≈ "d2" - чужий коефіцієнт і ліміти потрапили б у перевірку дозувань.
+        # Неточні збіги - лише кандидати (suggest) для "не знайдено".
+        logger.debug(f"⚠️ Form not found for normalized name: '{name_normalized}'")
+        return None
+
+    async def suggest(self, name: str, limit: int = 3) -> List[Dict]:
+        """
+        Ранжовані кандидати для інгредієнта, який не знайдено
+
+        Args:
+            name: Назва інгредієнта
+            limit: Максимум кандидатів
+
+        Returns:
+            [{"name": "Магній", "form": "Цитрат", "source": "substance_form_conversions", "score": 0.54}, ...]
+        """
+        candidates: List[Dict] = []
+        try:
+            forms = await self._forms_snapshot.get()
+            for match in forms["fuzzy"].search(
+                self._normalize_name(name), limit=limit, threshold=settings.fuzzy_suggest_threshold
+            ):
+                _, row = match.value
+                candidates.append({
+                    "name": row.get("substance_name_ua"),
+                    "form": row.get("form_name_ua"),
+                    "source": "substance_form_conversions",
+                    "score": match.score,
+                })
+        except Exception as exc:
+            logger.debug(f"Form suggestions unavailable: {exc}")
+
+        try:
+            plants = await self._plants_snapshot.get()
+            for match in plants["fuzzy"].search(name, limit=limit, threshold=settings.fuzzy_suggest_threshold):
+                candidates.append({
+                    "name": self._plant_display_name(match.value),
+                    "form": None,
+                    "source": "allowed_plants",
+                    "score": match.score,
+                })
+        except Exception as exc:
+            logger.debug(f"Plant suggestions unavailable: {exc}")
+
+        candidates.sort(key=lambda candidate: -candidate["score"])
+        return candidates[:limit]
+
+    async def _load_form_rows(self) -> List[Dict]:
+        """Завантажити всі рядки substance_form_conversions (зі снапшоту, якщо є)"""
+        snapshot = regulatory_snapshot.current()
+        if snapshot is not None and snapshot.has("substance_form_conversions"):
+            return snapshot.rows("substance_form_conversions")
+        if postgres_reference.enabled:
+            return await postgres_reference.fetch_all("substance_form_conversions")
+        return await self.supabase.execute(self.supabase.table("substance_form_conversions").select("*"))
+
+    def _build_form_index(self, rows: List[Dict]) -> Dict[str, Any]:
+        """
+        Побудувати індекс нормалізована назва → (позиція, рядок)
+
+        Для кожного поля пошуку окремий dict; при дублікатах лишається
+        перший рядок, позиція потрібна щоб вибрати найранішій рядок
+        серед кількох варіантів назви. "lemmas" - ті самі назви в
+        нормальній формі (відмінки), "fuzzy" - триграмний індекс по всіх
+        назвах та варіантах для кандидатів (suggest), не для збігу.
+        """
+        index: Dict[str, Any] = {
+            "substance_name_ua": {},
+            "substance_name_en": {},
+            "name_variations": {},
+        }
+        fuzzy_entries: List[Tuple[str, Tuple[int, Dict]]] = []
+        raw_names: List[str] = []
+
+        for position, row in enumerate(rows):
+            for field in ("substance_name_ua", "substance_name_en"):
+                key = self._normalize_name(row.get(field, ""))
+                if key:
+                    index[field].setdefault(key, (position, row))
+                    fuzzy_entries.append((key, (position, row)))
+                    raw_names.append(row.get(field, ""))
+
+            for variation in self._parse_name_variations(row.get("name_variations", [])):
+                key = self._normalize_name(variation)
+                if key:
+                    index["name_variations"].setdefault(key, (position, row))
+                    fuzzy_entries.append((key, (position, row)))
+                    raw_names.append(variation)
+
+        index["fuzzy"] = TrigramIndex(fuzzy_entries)
+        # Леми всіх назв - одним проходом по словнику таблиці (леми сирих
+        # назв, потім _normalize_name - як і для запиту)
+        index["lemmas"] = {}
+        for lemma, (_, entry) in zip(lemmatize_names(raw_names), fuzzy_entries):
+            index["lemmas"].setdefault(self._normalize_name(lemma), entry)
+        return index
+
+    async def _load_plant_rows(self) -> List[Dict]:
+        """Завантажити всі рядки allowed_plants (зі снапшоту, якщо є)"""
+        snapshot = regulatory_snapshot.current()
+        if snapshot is not None and snapshot.has("allowed_plants"):
+            return snapshot.rows("allowed_plants")
+        if postgres_reference.enabled:
+            return await postgres_reference.fetch_all("allowed_plants")
+        return await self.supabase.execute(self.supabase.table("allowed_plants").select("*"))
+
+    @staticmethod
+    def _build_plant_index(rows: List[Dict]) -> Dict[str, Any]:
+        """
+        Індекс назв рослин: українська, латинська, родина
+
+        "names" - назва у нижньому регістрі та її леми → рядок (збіг),
+        "fuzzy" - триграмний індекс тих самих назв (лише кандидати)
+        """
+        entries = [
+            (row[field], row)
+            for row in rows
+            for field in ("common_name_ua", "botanical_name_lat", "botanical_family_ua")
+            if row.get(field)
+        ]
+        names: Dict[str, Dict] = {}
+        for (name, row), lemma in zip(entries, lemmatize_names(name for name, _ in entries)):
+            names.setdefault(" ".join(name.lower().split()), row)
+            names.setdefault(lemma, row)
+        return {"names": names, "fuzzy": TrigramIndex(entries)}
+
+    @staticmethod
+    def _plant_display_name(plant: Dict) -> str:
+        """Назва рослини для base_substance (без переносів рядків)"""
+        plant_family = (plant.get('botanical_family_ua') or '').replace('\n', ' ').replace('  ', ' ').strip()
+        plant_name = (plant.get('common_name_ua') or '').replace('\n', ' ').replace('  ', ' ').strip()
+        return plant_family or plant_name
+
+    def _parse_name_variations(self, name_variations_raw) -> list:
+        """name_variations може прийти з БД як list або як JSON string"""
+        if isinstance(name_variations_raw, str):
+            try:
+                variations = json.loads(name_variations_raw)  # parse JSON string
+            except json.JSONDecodeError:
+                logger.warning(f"Failed to parse name_variations as JSON: {name_variations_raw}")
+                return []
+        elif isinstance(name_variations_raw, list):
+            variations = name_variations_raw  # вже list
+        else:
+            return []  # fallback
+
+        return [variation for variation in variations or [] if isinstance(variation, str)]
+
     def _normalize_name(self, name: str) -> str:
         """
         Normalize ingredient name for matching
@@ -486,22 +714,39 @@ class SubstanceMapperService:
         try:
             ingredient_lower = ingredient_name.lower().strip()
             
-            # Пряме співпадіння в excipient_name_ua або excipient_name_en
-            result = self.supabase.table("excipients").select("id").or_(
-                f"excipient_name_ua.ilike.%{ingredient_lower}%,excipient_name_en.ilike.%{ingredient_lower}%"
-            ).execute()
-            
-            if result.data and len(result.data) > 0:
-                return True
+            # Локальний снапшот: назви + name_variations без запитів до БД
+            snapshot = regulatory_snapshot.current()
+            if snapshot is not None and snapshot.has("excipients"):
+                if snapshot.search("excipients", ("excipient_name_ua", "excipient_name_en"), ingredient_lower):
+                    return True
+                return any(
+                    ingredient_lower in variation.lower()
+                    for row in snapshot.rows("excipients")
+                    for variation in self._parse_name_variations(row.get("name_variations"))
+                )
             
+            # Пряме співпадіння в excipient_name_ua або excipient_name_en
+            if postgres_reference.enabled:
+                if await postgres_reference.fetch_matching(
+                    "excipients", ("excipient_name_ua", "excipient_name_en"), [ingredient_lower]
+                ):
+                    return True
+            else:
+                rows = await self.supabase.execute(self.supabase.table("excipients").select("id").or_(
+                    f"excipient_name_ua.ilike.%{ingredient_lower}%,excipient_name_en.ilike.%{ingredient_lower}%"
+                ))
+
+                if rows:
+                    return True
+
             # Якщо не знайдено - шукати в name_variations через SQL функцію
             try:
-                rpc_result = self.supabase.rpc(
+                rows = await self.supabase.execute(self.supabase.rpc(
                     'search_excipient_variations',
                     {'search_term': ingredient_lower}
-                ).execute()
+                ))
                 
-                if rpc_result.data and len(rpc_result.data) > 0:
+                if rows:
                     return True
             except Exception as rpc_exc:
                 logger.debug(f"RPC search_excipient_variations failed: {rpc_exc}")
@@ -535,34 +780,39 @@ class SubstanceMapperService:
             cleaned_name = re.sub(r'\([^)]*\)', '', cleaned_name).strip()
             cleaned_name = re.sub(r'\d+', '', cleaned_name).strip()
             
-            # 2. Зробити stemming (відсікти закінчення)
-            # Простий stemming: видалити останні 2 літери якщо слово довше 4 символів
-            words = cleaned_name.split()
-            stemmed_words = []
-            for word in words:
-                if len(word) > 4:
-                    stemmed_word = word[:-2]  # Видалити останні 2 літери
-                else:
-                    stemmed_word = word
-                stemmed_words.append(stemmed_word)
+            if not cleaned_name:
+                return None
             
-            plant_stem = " ".join(stemmed_words).strip()
+            # 2. Нормальна форма: "півонії" → "півонія", "кореня женьшеню" → "корінь женьшень"
+            plant_lemma = lemmatize_name(cleaned_name)
             
-            if not plant_stem:
-                return None
+            # 3. Точна назва або лема з індексу (без запиту до БД)
+            plant = await self._match_plant(cleaned_name, plant_lemma)
+            if plant is not None:
+                base_substance = self._plant_display_name(plant)
+                logger.info(f"Found plant (index): {ingredient_name} -> {base_substance}")
+                return {
+                    "found": True,
+                    "base_substance": base_substance,  # БЕЗ переносу!
+                    "coefficient_min": 1.0,  # рослини не конвертуються
+                    "coefficient_max": 1.0,
+                    "source": "allowed_plants"
+                }
             
-            # 3. Пошук в БД через ILIKE
-            result = self.supabase.table("allowed_plants").select("*").or_(
-                f"botanical_family_ua.ilike.%{plant_stem}%,common_name_ua.ilike.%{plant_stem}%,botanical_name_lat.ilike.%{plant_stem}%"
-            ).execute()
+            # 4. Пошук леми через ILIKE (в снапшоті, якщо завантажений, інакше в БД)
+            snapshot = regulatory_snapshot.current()
+            if snapshot is not None and snapshot.has("allowed_plants"):
+                plants = snapshot.search(
+                    "allowed_plants", ("botanical_family_ua", "common_name_ua", "botanical_name_lat"), plant_lemma
+                )
+            else:
+                plants = await self.supabase.execute(self.supabase.table("allowed_plants").select("*").or_(
+                    f"botanical_family_ua.ilike.%{plant_lemma}%,common_name_ua.ilike.%{plant_lemma}%,botanical_name_lat.ilike.%{plant_lemma}%"
+                ))
             
-            if result.data and len(result.data) > 0:
-                plant = result.data[0]
-                
+            if plants:
                 # КРИТИЧНО: Прибрати перенос рядка з назви!
-                plant_family = (plant.get('botanical_family_ua') or '').replace('\n', ' ').replace('  ', ' ').strip()
-                plant_name = (plant.get('common_name_ua') or '').replace('\n', ' ').replace('  ', ' ').strip()
-                base_substance = plant_family or plant_name
+                base_substance = self._plant_display_name(plants[0])
                 
                 logger.info(f"Found plant: {ingredient_name} -> {base_substance}")
                 return {
@@ -578,6 +828,24 @@ class SubstanceMapperService:
             logger.debug(f"Error finding plant {ingredient_name}: {e}")
             return None
     
+    async def _match_plant(self, *names: str) -> Optional[Dict]:
+        """
+        Рослина з індексу allowed_plants за точною назвою або лемою, інакше None
+
+        Неточні (триграмні) збіги сюди не входять: рослина пропускає
+        перевірку дозувань, тож часткова схожість - лише кандидат (suggest).
+        """
+        try:
+            index = await self._plants_snapshot.get()
+        except Exception as exc:
+            logger.debug(f"Plant index unavailable: {exc}")
+            return None
+        for name in names:
+            plant = index["names"].get(" ".join(name.lower().split()))
+            if plant is not None:
+                return plant
+        return None
+    
     def split_composition(self, ingredient_name: str, quantity: Optional[float], unit: str) -> list:
         """
         FIX-6: Розбити композицію екстрактів на окремі рослини
@@ -648,16 +916,9 @@ class SubstanceMapperService:
             per_plant_quantity = round(quantity / len(plant_names), 2)
         
         result = []
-        for plant_name in plant_names:
-            # Очистити назву рослини
-            clean_name = plant_name.strip()
-            # Видалити родовий відмінок ("кропиви" → "кропива")
-            # Це спрощений варіант, може потребувати покращення
-            if clean_name.endswith('и') and len(clean_name) > 3:
-                clean_name = clean_name[:-1] + 'а'  # кропиви → кропива
-            elif clean_name.endswith('і') and len(clean_name) > 3:
-                clean_name = clean_name[:-1] + 'я'  # шавлії → шавлія
-            
+        # Родовий відмінок → називний для всіх рослин за один прохід
+        # ("кропиви" → "кропива", "шавлії" → "шавлія", "хвоща" → "хвощ")
+        for clean_name in lemmatize_names(plant_names):
             result.append({
                 "name": clean_name,
                 "quantity": per_plant_quantity,
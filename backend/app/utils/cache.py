@@ -0,0 +1,105 @@
+"""In-process caches: LRU with TTL and request-scoped memoization"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+# Кеш поточного запиту (None - поза request_scope)
+_request_cache: ContextVar[Optional[Dict[Hashable, Any]]] = ContextVar("request_cache", default=None)
+
+
+@contextmanager
+def request_scope() -> Iterator[Dict[Hashable, Any]]:
+    """
+    Кеш на час одного запиту
+
+    Значення, збережені через TTLCache.set всередині scope, гарантовано
+    доступні до кінця запиту, навіть якщо процесний кеш їх витіснив.
+    Контекст успадковується asyncio задачами, asyncio.to_thread та
+    потоками валідаторів /full (checker._run_validator).
+    """
+    scope: Dict[Hashable, Any] = {}
+    token = _request_cache.set(scope)
+    try:
+        yield scope
+    finally:
+        _request_cache.reset(token)
+
+
+class TTLCache:
+    """
+    Процесний LRU кеш з TTL
+
+    Потокобезпечний (валідатори /full виконуються в окремих потоках).
+    """
+
+    def __init__(self, name: str, max_entries: int = 5000, ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            name: Назва (префікс ключів у request scope, логи)
+            max_entries: Максимум записів (LRU)
+            ttl_seconds: Час життя запису (None - без обмеження)
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Отримати значення (request scope → процесний кеш) або None"""
+        scope = _request_cache.get()
+        if scope is not None and (self.name, key) in scope:
+            self.hits += 1
+            return scope[(self.name, key)]
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                    del self._data[key]
+                else:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    if scope is not None:
+                        scope[(self.name, key)] = value
+                    return value
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Зберегти значення"""
+        scope = _request_cache.get()
+        if scope is not None:
+            scope[(self.name, key)] = value
+
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Очистити процесний кеш"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """Статистика влучань кешу"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,244 @@
+"""Pluggable cache backends: in-process LRU or shared Redis-protocol store"""
+
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Маркер "значення немає в кеші" (None - теж валідне закешоване значення)
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """
+    Спільний інтерфейс кешу довідкових запитів
+
+    Ключі групуються в namespace (наприклад "reference"), щоб після
+    оновлення регуляторних даних інвалідувати всю групу одним викликом.
+    Значення - JSON-серіалізовані дані (рядки таблиць, None).
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Any:
+        """Значення або MISSING"""
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Зберегти значення (ttl_seconds=None - без обмеження)"""
+
+    @abstractmethod
+    def invalidate(self, namespace: str, key_prefix: str = "") -> int:
+        """Видалити ключі namespace (лише ті, що починаються з key_prefix); повертає кількість видалених"""
+
+    def get_or_set(
+        self,
+        namespace: str,
+        key: str,
+        compute: Callable[[], Tuple[Any, bool]],
+        ttl_seconds: Optional[float] = None,
+    ) -> Any:
+        """
+        Значення з кешу або compute()
+
+        Args:
+            compute: Повертає (значення, чи можна кешувати) - наприклад,
+                "не знайдено" через помилку БД кешувати не можна
+
+        Помилки самого кешу (Redis недоступний) не ламають запит - значення
+        просто обчислюється.
+        """
+        value = self._safe_get(namespace, key)
+        if value is not MISSING:
+            return value
+
+        value, cacheable = compute()
+        if cacheable:
+            self._safe_set(namespace, key, value, ttl_seconds)
+        return value
+
+    async def get_or_set_async(
+        self,
+        namespace: str,
+        key: str,
+        compute: Callable[[], Awaitable[Tuple[Any, bool]]],
+        ttl_seconds: Optional[float] = None,
+    ) -> Any:
+        """get_or_set з async compute (запити через async клієнт Supabase)"""
+        value = self._safe_get(namespace, key)
+        if value is not MISSING:
+            return value
+
+        value, cacheable = await compute()
+        if cacheable:
+            self._safe_set(namespace, key, value, ttl_seconds)
+        return value
+
+    def _safe_get(self, namespace: str, key: str) -> Any:
+        try:
+            return self.get(namespace, key)
+        except Exception as e:
+            logger.warning(f"Cache {self.name} get failed: {e}")
+            return MISSING
+
+    def _safe_set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float]) -> None:
+        try:
+            self.set(namespace, key, value, ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Cache {self.name} set failed: {e}")
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU кеш у пам'яті процесу з TTL на запис (потокобезпечний)"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Tuple[str, str], Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() > expires_at:
+                del self._data[(namespace, key)]
+                return MISSING
+            self._data.move_to_end((namespace, key))
+            return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            self._data[(namespace, key)] = (expires_at, value)
+            self._data.move_to_end((namespace, key))
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, namespace: str, key_prefix: str = "") -> int:
+        with self._lock:
+            keys = [
+                entry_key for entry_key in self._data
+                if entry_key[0] == namespace and entry_key[1].startswith(key_prefix)
+            ]
+            for entry_key in keys:
+                del self._data[entry_key]
+        return len(keys)
+
+
+def _glob_escape(value: str) -> str:
+    """Екранувати спецсимволи glob-шаблону Redis SCAN MATCH"""
+    return "".join(f"\\{char}" if char in "*?[]\\" else char for char in value)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Кеш у Redis-сумісному сховищі (Redis, Valkey, KeyDB, Dragonfly)
+
+    Спільний для всіх uvicorn worker'ів та реплік. Синхронний клієнт
+    з пулом з'єднань - методи сервісів викликаються і з event loop, і з
+    потоків валідаторів /full.
+
+    Requires: redis
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "labelcheck", client: Any = None):
+        """
+        Args:
+            url: Redis URL
+            prefix: Префікс усіх ключів (кілька застосунків в одному Redis)
+            client: Готовий клієнт (локальний stand-in, напр. fakeredis)
+        """
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError(
+                    "CACHE_BACKEND=redis requires the redis package (pip install redis)"
+                )
+            client = redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def get(self, namespace: str, key: str) -> Any:
+        raw = self.client.get(self._key(namespace, key))
+        if raw is None:
+            return MISSING
+        return json.loads(raw)
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        raw = json.dumps(value, ensure_ascii=False, default=str)
+        if ttl_seconds is not None:
+            self.client.set(self._key(namespace, key), raw, px=max(1, int(ttl_seconds * 1000)))
+        else:
+            self.client.set(self._key(namespace, key), raw)
+
+    def invalidate(self, namespace: str, key_prefix: str = "") -> int:
+        deleted = 0
+        batch = []
+        pattern = f"{self.prefix}:{namespace}:{_glob_escape(key_prefix)}*"
+        for redis_key in self.client.scan_iter(match=pattern, count=500):
+            batch.append(redis_key)
+            if len(batch) >= 500:
+                deleted += self.client.delete(*batch)
+                batch = []
+        if batch:
+            deleted += self.client.delete(*batch)
+        return deleted
+
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_cache_backend() -> CacheBackend:
+    """
+    Кеш-бекенд процесу (CACHE_BACKEND: memory | redis)
+
+    Якщо Redis налаштовано, але він недоступний при старті - використовується
+    memory, щоб API працював і без спільного кешу.
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    with _backend_lock:
+        if _backend is None:
+            if settings.cache_backend == "redis":
+                try:
+                    backend = RedisCacheBackend(settings.redis_url, prefix=settings.cache_key_prefix)
+                    backend.client.ping()
+                    _backend = backend
+                    logger.info(f"Cache backend: redis ({settings.redis_url})")
+                except Exception as e:
+                    logger.warning(f"Redis cache unavailable ({e}), falling back to in-process cache")
+            if _backend is None:
+                _backend = MemoryCacheBackend(max_entries=settings.cache_max_entries)
+    return _backend
+
+
+def set_cache_backend(backend: Optional[CacheBackend]) -> None:
+    """Замінити кеш-бекенд процесу (тести, локальний stand-in); None - скинути"""
+    global _backend
+    _backend = backend
+
+
+def cache_key(*parts: Hashable) -> str:
+    """Ключ кешу з нормалізованих частин (регістр та пробіли не враховуються)"""
+    return "|".join(" ".join(str(part).split()).lower() for part in parts)
@@ -1,12 +1,49 @@
 """Image processing utilities"""
 
-from PIL import Image
+from PIL import Image, ImageChops, ImageOps
+from dataclasses import dataclass, field
 import io
 import logging
-from typing import Optional
+import time
+from typing import Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Поріг різниці з кольором фону (0-255) для автообрізки: шум JPEG, тіні від сканера
+BORDER_THRESHOLD = 24
+# Відступ навколо вмісту після обрізки (частка від розміру)
+BORDER_MARGIN = 0.02
+# Обрізати тільки якщо рамка займає помітну частину зображення
+MIN_CROP_GAIN = 0.05
+
+
+@dataclass
+class PreparedImage:
+    """Результат підготовки зображення для Claude Vision"""
+    data: bytes
+    media_type: str
+    original_bytes: int
+    original_size: Tuple[int, int] = (0, 0)
+    size: Tuple[int, int] = (0, 0)
+    steps: List[str] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.data)
+
+    def stats(self) -> Dict:
+        """Статистика для відповіді API / логів"""
+        return {
+            "original_bytes": self.original_bytes,
+            "processed_bytes": len(self.data),
+            "bytes_saved": self.bytes_saved,
+            "original_size": list(self.original_size),
+            "size": list(self.size),
+            "steps": self.steps,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+        }
+
 
 class ImageProcessor:
     """Utility for processing images"""
@@ -68,4 +105,147 @@ class ImageProcessor:
         except Exception as e:
             logger.error(f"Error optimizing image: {e}", exc_info=True)
             raise
+    
+    def prepare_for_vision(
+        self,
+        image_bytes: bytes,
+        max_edge: int = 1568,
+        max_pixels: int = 1_150_000,
+        quality: int = 90,
+    ) -> PreparedImage:
+        """
+        Підготувати фото етикетки перед відправкою в Claude Vision
+        
+        EXIF-орієнтація → обрізка порожніх полів → зменшення до max_edge /
+        max_pixels → JPEG. Claude все одно зменшує більші зображення на своїй
+        стороні, тож якість OCR не змінюється, а upload і кількість
+        input-токенів (~ ширина × висота / 750) зменшуються.
+        
+        Синхронний (CPU-bound) - викликати через asyncio.to_thread.
+        При будь-якій помилці повертає оригінал без змін.
+        
+        Args:
+            image_bytes: Байти зображення (JPEG, PNG, WebP)
+            max_edge: Максимальна довша сторона, px
+            max_pixels: Максимальна кількість пікселів
+            quality: Якість JPEG
+            
+        Returns:
+            PreparedImage
+        """
+        started = time.perf_counter()
+        original = PreparedImage(
+            data=image_bytes,
+            media_type=_sniff_media_type(image_bytes),
+            original_bytes=len(image_bytes),
+        )
+        
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as source:
+                original.original_size = original.size = source.size
+                steps: List[str] = []
+                
+                image = ImageOps.exif_transpose(source)
+                if source.getexif().get(0x0112, 1) != 1:  # EXIF Orientation
+                    steps.append("exif_transpose")
+                
+                image = _flatten(image)
+                
+                cropped = _crop_borders(image)
+                if cropped is not None:
+                    image = cropped
+                    steps.append("crop")
+                
+                scale = min(
+                    1.0,
+                    max_edge / max(image.size),
+                    (max_pixels / (image.width * image.height)) ** 0.5,
+                )
+                if scale < 1.0:
+                    target = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+                    image = image.resize(target, Image.LANCZOS)
+                    steps.append("downscale")
+                
+                output = io.BytesIO()
+                image.save(output, format="JPEG", quality=quality, optimize=True)
+                data = output.getvalue()
+            
+            # Геометрія не змінилась і JPEG не менший - перекодування не потрібне
+            if not steps and len(data) >= len(image_bytes):
+                original.elapsed_ms = (time.perf_counter() - started) * 1000
+                return original
+            
+            steps.append("jpeg")
+            return PreparedImage(
+                data=data,
+                media_type="image/jpeg",
+                original_bytes=len(image_bytes),
+                original_size=original.original_size,
+                size=image.size,
+                steps=steps,
+                elapsed_ms=(time.perf_counter() - started) * 1000,
+            )
+            
+        except Exception as e:
+            logger.warning(f"Image pre-processing skipped: {e}")
+            original.elapsed_ms = (time.perf_counter() - started) * 1000
+            return original
+
+
+def _sniff_media_type(image_bytes: bytes) -> str:
+    """Media type за magic bytes"""
+    if image_bytes[:2] == b'\xff\xd8':
+        return "image/jpeg"
+    if image_bytes[:8] == b'\x89PNG\r\n\x1a\n':
+        return "image/png"
+    if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+        return "image/webp"
+    if image_bytes[:4] == b'%PDF':
+        return "application/pdf"
+    return "application/octet-stream"
 
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """Прозорість → білий фон, будь-який режим → RGB / L (JPEG-сумісний)"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    if image.mode not in ("RGB", "L"):
+        return image.convert("RGB")
+    return image
+
+
+def _crop_borders(image: Image.Image) -> Optional[Image.Image]:
+    """
+    Обрізати однорідні поля навколо етикетки
+    
+    Колір фону береться з лівого верхнього кута. Повертає None якщо
+    обрізати нічого (або вміст підозріло малий - тоді краще не чіпати).
+    """
+    background = Image.new(image.mode, image.size, image.getpixel((0, 0)))
+    diff = ImageChops.difference(image, background).convert("L")
+    mask = diff.point(lambda value: 255 if value > BORDER_THRESHOLD else 0)
+    bbox = mask.getbbox()
+    if not bbox:
+        return None
+    
+    left, top, right, bottom = bbox
+    width, height = image.size
+    if (right - left) < width * 0.1 or (bottom - top) < height * 0.1:
+        return None
+    
+    margin_x = int(width * BORDER_MARGIN)
+    margin_y = int(height * BORDER_MARGIN)
+    box = (
+        max(0, left - margin_x),
+        max(0, top - margin_y),
+        min(width, right + margin_x),
+        min(height, bottom + margin_y),
+    )
+    
+    gain = 1 - ((box[2] - box[0]) * (box[3] - box[1])) / (width * height)
+    if gain < MIN_CROP_GAIN:
+        return None
+    return image.crop(box)
@@ -0,0 +1,137 @@
+"""PDF processing utilities"""
+
+import io
+import logging
+import unicodedata
+from typing import Iterator
+
+from PyPDF2 import PdfReader
+
+from app.utils.image_processing import ImageProcessor
+
+logger = logging.getLogger(__name__)
+
+# Мінімум символів текстового шару щоб пропустити Stage 1 OCR
+MIN_TEXT_LAYER_CHARS = 50
+# Частка "нормальних" символів (літери, цифри, пунктуація, пробіли).
+# Шрифти без ToUnicode дають сміття (cid:123, private use area)
+MIN_PRINTABLE_RATIO = 0.85
+
+
+def is_pdf(file_bytes: bytes) -> bool:
+    """Перевірити чи файл є PDF (за magic bytes)"""
+    return file_bytes[:4] == b"%PDF"
+
+
+class PDFProcessor:
+    """Utility for processing PDF labels"""
+
+    def __init__(self):
+        self.image_processor = ImageProcessor()
+
+    def extract_text_layer(self, pdf_bytes: bytes, max_pages: int = 10) -> str:
+        """
+        Витягти вбудований текстовий шар PDF
+
+        Args:
+            pdf_bytes: PDF file bytes
+            max_pages: Максимум сторінок
+
+        Returns:
+            Текст усіх сторінок або "" якщо шару немає / він непридатний
+        """
+        try:
+            reader = PdfReader(io.BytesIO(pdf_bytes))
+            pages = [
+                (page.extract_text() or "").strip()
+                for page in reader.pages[:max_pages]
+            ]
+        except Exception as e:
+            logger.warning(f"Could not read PDF text layer: {e}")
+            return ""
+
+        text = "\n\n".join(page for page in pages if page)
+        if not self.is_usable_text(text):
+            logger.info(f"PDF text layer not usable ({len(text)} chars), falling back to OCR")
+            return ""
+        return text
+
+    @staticmethod
+    def is_usable_text(text: str) -> bool:
+        """
+        Чи можна використати текст замість OCR
+
+        Векторні PDF від дизайнерів часто мають текст, переведений у криві
+        (шару немає), або шрифти без ToUnicode (шар є, але це сміття).
+        """
+        stripped = "".join(text.split())
+        if len(stripped) < MIN_TEXT_LAYER_CHARS or "(cid:" in text:
+            return False
+
+        printable = sum(
+            1 for char in stripped
+            if unicodedata.category(char)[0] in ("L", "N", "P", "S")
+            and unicodedata.category(char) != "Co"
+        )
+        return printable / len(stripped) >= MIN_PRINTABLE_RATIO
+
+    def iter_page_images(
+        self,
+        pdf_bytes: bytes,
+        dpi: int = 200,
+        max_pages: int = 10,
+        max_edge: int = 1568,
+        max_pixels: int = 1_150_000,
+        quality: int = 90,
+    ) -> Iterator[bytes]:
+        """
+        Растеризувати сторінки PDF по одній (JPEG, готові для Claude Vision)
+
+        Генератор: одночасно в пам'яті тільки одна відрендерена сторінка.
+        Кожна сторінка проходить ImageProcessor.prepare_for_vision
+        (обрізка полів, зменшення).
+
+        Requires: pypdfium2
+
+        Args:
+            pdf_bytes: PDF file bytes
+            dpi: Роздільна здатність рендеру
+            max_pages: Максимум сторінок
+            max_edge, max_pixels, quality: Див. prepare_for_vision
+
+        Yields:
+            JPEG bytes кожної сторінки
+        """
+        try:
+            import pypdfium2 as pdfium
+        except ImportError:
+            raise RuntimeError(
+                "PDF without text layer requires pypdfium2. Install it: pip install pypdfium2"
+            )
+
+        document = pdfium.PdfDocument(pdf_bytes)
+        try:
+            page_count = min(len(document), max_pages)
+            if len(document) > max_pages:
+                logger.warning(f"PDF has {len(document)} pages, only first {max_pages} will be processed")
+
+            for index in range(page_count):
+                page = document[index]
+                try:
+                    bitmap = page.render(scale=dpi / 72)
+                    image = bitmap.to_pil()
+                    output = io.BytesIO()
+                    image.save(output, format="PNG")
+                finally:
+                    page.close()
+
+                prepared = self.image_processor.prepare_for_vision(
+                    output.getvalue(), max_edge, max_pixels, quality
+                )
+                logger.info(
+                    f"📄 PDF page {index + 1}/{page_count} rasterized: "
+                    f"{prepared.size[0]}x{prepared.size[1]}, {len(prepared.data)} bytes"
+                )
+                yield prepared.data
+        finally:
+            document.close()
@@ -0,0 +1,141 @@
+"""Multi-pattern phrase matching (Aho–Corasick) with word boundaries"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+def _is_word_char(char: str) -> bool:
+    """Те саме визначення що й \\w у re з Unicode"""
+    return char.isalnum() or char == "_"
+
+
+def _fold(char: str) -> str:
+    """Нижній регістр без зміни довжини (позиції мають збігатися з оригіналом)"""
+    lowered = char.lower()
+    return lowered if len(lowered) == 1 else char
+
+
+def normalize_phrase(text: str) -> str:
+    """Нижній регістр + будь-які пробіли/переноси → один пробіл"""
+    return " ".join("".join(_fold(char) for char in text).split())
+
+
+class PhraseMatcher:
+    """
+    Пошук усіх фраз у тексті за один прохід
+
+    Автомат будується один раз для набору фраз; пошук лінійний від довжини
+    тексту незалежно від кількості фраз. Текст нормалізується так само як
+    фрази (регістр, пробіли), позиції результатів - в оригінальному тексті.
+
+    Збіг приймається тільки на межах слів, як у регулярному виразі
+    ``\\bфраза\\b``. Для кожної фрази збіги не перекриваються (як re.finditer).
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for phrase in phrases:
+            normalized = normalize_phrase(phrase or "")
+            if normalized and normalized not in self._ids:
+                self._ids[normalized] = len(self.phrases)
+                self.phrases.append(normalized)
+                self._add(normalized, self._ids[normalized])
+
+        self._build_links()
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def _add(self, phrase: str, phrase_id: int) -> None:
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(phrase_id)
+
+    def _build_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                link = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = link if link != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Знайти всі входження фраз
+
+        Args:
+            text: Текст (оригінальний, не нормалізований)
+
+        Returns:
+            {нормалізована фраза: [(start, end), ...]} - позиції в text,
+            відсортовані за start; фрази без збігів відсутні
+        """
+        if not text or not self.phrases:
+            return {}
+
+        # Нормалізований текст + позиція кожного символу в оригіналі
+        chars: List[str] = []
+        positions: List[int] = []
+        pending_space = False
+        for index, char in enumerate(text):
+            if char.isspace():
+                pending_space = bool(chars)
+                continue
+            if pending_space:
+                chars.append(" ")
+                positions.append(index - 1)
+                pending_space = False
+            chars.append(_fold(char))
+            positions.append(index)
+
+        found: Dict[int, List[Tuple[int, int]]] = {}
+        state = 0
+        for end, char in enumerate(chars):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for phrase_id in self._output[state]:
+                start = end - len(self.phrases[phrase_id]) + 1
+                found.setdefault(phrase_id, []).append((start, end + 1))
+
+        matches: Dict[str, List[Tuple[int, int]]] = {}
+        for phrase_id, spans in found.items():
+            accepted: List[Tuple[int, int]] = []
+            last_end = 0
+            for start, end in spans:
+                if start < last_end or not self._on_boundaries(chars, start, end):
+                    continue
+                accepted.append((positions[start], positions[end - 1] + 1))
+                last_end = end
+            if accepted:
+                matches[self.phrases[phrase_id]] = accepted
+        return matches
+
+    @staticmethod
+    def _on_boundaries(chars: List[str], start: int, end: int) -> bool:
+        """\\b на початку та в кінці збігу"""
+        def boundary(position: int) -> bool:
+            before = position > 0 and _is_word_char(chars[position - 1])
+            after = position < len(chars) and _is_word_char(chars[position])
+            return before != after
+
+        return boundary(start) and boundary(end)
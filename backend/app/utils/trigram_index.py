@@ -0,0 +1,117 @@
+"""Trigram similarity index for fuzzy name matching (OCR typos, inflections)"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar
+
+from app.utils.phrase_matcher import normalize_phrase
+
+T = TypeVar("T")
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Триграми як у pg_trgm: кожне слово доповнюється "  " зліва та " " справа
+
+    Пунктуація розділяє слова, регістр не враховується.
+    """
+    words = "".join(char if char.isalnum() else " " for char in normalize_phrase(text)).split()
+    grams: Set[str] = set()
+    for word in words:
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass(frozen=True)
+class TrigramMatch(Generic[T]):
+    """Кандидат пошуку"""
+    score: float  # схожість 0..1 (1 - однакові набори триграм)
+    name: str  # нормалізована назва з індексу
+    value: T
+
+
+class TrigramIndex(Generic[T]):
+    """
+    Інвертований індекс триграма → назви
+
+    Схожість - коефіцієнт Жаккара наборів триграм (як similarity() у
+    pg_trgm). Пошук рахує спільні триграми лише для назв, що мають хоча б
+    одну спільну триграму із запитом, тож не сканує весь словник.
+    Для однакової назви з кількома значеннями лишається перше додане.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, T]] = ()):
+        self._names: List[str] = []
+        self._values: List[T] = []
+        self._sizes: List[int] = []
+        self._ids: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        for name, value in entries:
+            self.add(name, value)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str, value: T) -> None:
+        """Додати назву (повторна назва ігнорується)"""
+        normalized = normalize_phrase(name or "")
+        grams = trigrams(normalized)
+        if not grams or normalized in self._ids:
+            return
+        entry_id = len(self._names)
+        self._ids[normalized] = entry_id
+        self._names.append(normalized)
+        self._values.append(value)
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings[gram].append(entry_id)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        threshold: float = 0.3,
+        containment: bool = False,
+    ) -> List[TrigramMatch[T]]:
+        """
+        Найсхожіші назви
+
+        Args:
+            query: Назва для пошуку
+            limit: Максимум кандидатів
+            threshold: Мінімальна схожість
+            containment: Оцінювати, яку частку триграм запиту містить назва
+                (як word_similarity() у pg_trgm) - для пошуку короткого
+                запиту в довгих назвах ("півонії" → "Півонія лікарська")
+
+        Returns:
+            Кандидати за спаданням схожості; при рівній - вища схожість
+            Жаккара, далі порядок додавання
+        """
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for entry_id in self._postings.get(gram, ()):
+                shared[entry_id] += 1
+
+        scored = []
+        for entry_id, common in shared.items():
+            jaccard = common / (len(grams) + self._sizes[entry_id] - common)
+            score = common / len(grams) if containment else jaccard
+            if score >= threshold:
+                scored.append((-score, -jaccard, entry_id))
+        scored.sort()
+
+        return [
+            TrigramMatch(score=round(-neg_score, 4), name=self._names[entry_id], value=self._values[entry_id])
+            for neg_score, _, entry_id in scored[:limit]
+        ]
+
+    def best(self, query: str, threshold: float, containment: bool = False) -> Optional[TrigramMatch[T]]:
+        """Найкращий кандидат зі схожістю не нижче threshold або None"""
+        matches = self.search(query, limit=1, threshold=threshold, containment=containment)
+        return matches[0] if matches else None
@@ -0,0 +1,85 @@
+"""Ukrainian morphological normalization of ingredient and plant names"""
+
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+LEMMA_TABLE_PATH = Path(__file__).resolve().parent.parent / "data" / "linguistic" / "ua_lemmas.json"
+
+# Апострофи з OCR/клавіатури → один символ (м’ята, мʼята, м'ята)
+_APOSTROPHES = str.maketrans({"’": "'", "ʼ": "'", "`": "'", "´": "'"})
+_TOKEN_RE = re.compile(r"[\w']+|[^\w']+")
+_CYRILLIC_RE = re.compile(r"[а-яіїєґ]")
+
+
+@lru_cache(maxsize=1)
+def _lemma_table() -> Tuple[Dict[str, str], FrozenSet[str], Tuple[Tuple[str, str, int], ...]]:
+    """
+    Таблиця лем та суфіксних правил (завантажується один раз на процес)
+
+    Returns:
+        (словоформа → лема, множина лем, правила (суфікс, заміна, мін.
+        довжина основи) від найдовшого суфікса до найкоротшого)
+    """
+    with open(LEMMA_TABLE_PATH, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    suffixes = sorted(
+        ((suffix, replacement, int(min_stem)) for suffix, replacement, min_stem in data.get("suffixes", [])),
+        key=lambda rule: -len(rule[0]),
+    )
+    lemmas = data.get("lemmas", {})
+    return lemmas, frozenset(lemmas.values()), tuple(suffixes)
+
+
+@lru_cache(maxsize=20000)
+def lemmatize(token: str) -> str:
+    """
+    Лема одного слова (нижній регістр)
+
+    Спочатку точний запис таблиці, потім перше суфіксне правило з
+    достатньо довгою основою. Слова без кирилиці (латина, "b6") не змінюються.
+    """
+    token = token.lower().translate(_APOSTROPHES)
+    lemmas, known_lemmas, suffixes = _lemma_table()
+    if token in lemmas:
+        return lemmas[token]
+    if token in known_lemmas or not _CYRILLIC_RE.search(token):
+        return token
+    for suffix, replacement, min_stem in suffixes:
+        if token.endswith(suffix) and len(token) - len(suffix) >= min_stem:
+            return token[:-len(suffix)] + replacement
+    return token
+
+
+def normalize_name(text: str) -> str:
+    """
+    Назва у нормальній формі: нижній регістр, один пробіл, кожне слово - лема
+
+    "Екстракт  кропиви" → "екстракт кропива", "цитрату магнію" → "цитрат магній".
+    Пунктуація між словами зберігається.
+    """
+    text = " ".join((text or "").split()).lower().translate(_APOSTROPHES)
+    return "".join(
+        lemmatize(token) if token[0].isalnum() else token
+        for token in _TOKEN_RE.findall(text)
+    )
+
+
+def normalize_names(names: Iterable[str]) -> List[str]:
+    """
+    Нормалізувати всі назви етикетки за один прохід
+
+    Унікальні слова всіх назв лематизуються один раз (повтори на кшталт
+    "екстракт", "вітамін", "кислота" - з кешу), далі назви збираються з лем.
+    """
+    texts = [" ".join((name or "").split()).lower().translate(_APOSTROPHES) for name in names]
+    tokenized = [_TOKEN_RE.findall(text) for text in texts]
+    lemmas = {
+        token: lemmatize(token)
+        for tokens in tokenized
+        for token in set(tokens)
+        if token[0].isalnum()
+    }
+    return ["".join(lemmas.get(token, token) for token in tokens) for tokens in tokenized]
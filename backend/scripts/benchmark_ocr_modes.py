@@ -0,0 +1,231 @@
+"""Benchmark OCR modes: two_stage vs fused (latency, tokens, accuracy)"""
+
+import argparse
+import asyncio
+import difflib
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.claude_ocr_service import ClaudeOCRService, OCR_MODES
+
+# Configure logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def _normalize(value) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+def ingredient_scores(expected: List[Dict], actual: List[Dict]) -> Dict:
+    """
+    Точність інгредієнтів: F1 по назвах та частка збігів кількості
+
+    Args:
+        expected: Еталонні інгредієнти
+        actual: Розпізнані інгредієнти
+    """
+    expected_by_name = {_normalize(i.get("name")): i for i in expected or []}
+    actual_by_name = {_normalize(i.get("name")): i for i in actual or []}
+    matched = set(expected_by_name) & set(actual_by_name)
+
+    precision = len(matched) / len(actual_by_name) if actual_by_name else 0.0
+    recall = len(matched) / len(expected_by_name) if expected_by_name else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    quantity_matches = sum(
+        1 for name in matched
+        if expected_by_name[name].get("quantity") == actual_by_name[name].get("quantity")
+        and _normalize(expected_by_name[name].get("unit")) == _normalize(actual_by_name[name].get("unit"))
+    )
+    return {
+        "ingredient_f1": round(f1, 3),
+        "quantity_accuracy": round(quantity_matches / len(expected_by_name), 3) if expected_by_name else 0.0,
+    }
+
+
+def compare(expected: Dict, actual: Dict) -> Dict:
+    """Порівняти результат з еталоном (full_text, інгредієнти, обов'язкові фрази)"""
+    scores = ingredient_scores(expected.get("ingredients", []), actual.get("ingredients", []))
+    scores["text_similarity"] = round(
+        difflib.SequenceMatcher(
+            None, _normalize(expected.get("full_text")), _normalize(actual.get("full_text"))
+        ).ratio(),
+        3,
+    )
+
+    expected_phrases = expected.get("mandatory_phrases") or {}
+    actual_phrases = actual.get("mandatory_phrases") or {}
+    if expected_phrases:
+        scores["mandatory_phrases_accuracy"] = round(
+            sum(1 for key, value in expected_phrases.items() if actual_phrases.get(key) == value)
+            / len(expected_phrases),
+            3,
+        )
+    return scores
+
+
+class UsageRecorder:
+    """Підрахунок викликів Claude та токенів (обгортка над _create_message)"""
+
+    def __init__(self, service: ClaudeOCRService):
+        self.calls = 0
+        self.input_tokens = 0
+        self.cache_read_tokens = 0
+        self.output_tokens = 0
+        original = service._create_message
+
+        async def recording_create_message(**kwargs):
+            response = await original(**kwargs)
+            self.calls += 1
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+                self.cache_read_tokens += getattr(usage, "cache_read_input_tokens", 0) or 0
+                self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+            return response
+
+        service._create_message = recording_create_message
+
+    def snapshot(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "output_tokens": self.output_tokens,
+        }
+
+
+async def run_one(
+    service: ClaudeOCRService,
+    recorder: UsageRecorder,
+    image_bytes: bytes,
+    mode: str,
+) -> Dict:
+    """Один прогін: результат, латентність, виклики та токени"""
+    before = recorder.snapshot()
+    started = time.perf_counter()
+    result = await service.analyze_label(image_bytes, mode=mode)
+    latency = time.perf_counter() - started
+    after = recorder.snapshot()
+
+    return {
+        "result": result,
+        "latency_s": round(latency, 2),
+        **{key: after[key] - before[key] for key in after},
+    }
+
+
+async def benchmark(images: List[Path], modes: List[str], repeats: int) -> Dict:
+    """
+    Прогнати всі зображення в кожному режимі
+
+    Еталон для точності: <image>.json поруч із зображенням (поля як у
+    відповіді /quick: full_text, ingredients, mandatory_phrases). Якщо
+    еталону немає - результат two_stage вважається еталоном для fused.
+    """
+    service = ClaudeOCRService()
+    # Кеш вимкнено - інакше другий прогін не викликає Claude
+    service.image_cache = None
+    service.parse_cache = None
+    recorder = UsageRecorder(service)
+
+    runs: Dict[str, List[Dict]] = {mode: [] for mode in modes}
+
+    for image_path in images:
+        image_bytes = image_path.read_bytes()
+        truth_path = image_path.with_suffix(".json")
+        truth: Optional[Dict] = json.loads(truth_path.read_text(encoding="utf-8")) if truth_path.exists() else None
+
+        per_mode: Dict[str, Dict] = {}
+        for mode in modes:
+            for attempt in range(repeats):
+                try:
+                    run = await run_one(service, recorder, image_bytes, mode)
+                except Exception as exc:
+                    logger.error(f"{image_path.name} [{mode}] failed: {exc}")
+                    runs[mode].append({"image": image_path.name, "error": str(exc)})
+                    continue
+                per_mode.setdefault(mode, run)
+                run["image"] = image_path.name
+                runs[mode].append(run)
+                print(
+                    f"{image_path.name:40} {mode:10} #{attempt + 1} "
+                    f"{run['latency_s']:6.2f}s  calls={run['calls']}  "
+                    f"in={run['input_tokens']}  cache_read={run['cache_read_tokens']}  out={run['output_tokens']}"
+                )
+
+        reference = truth or (per_mode.get("two_stage") or {}).get("result")
+        for mode, run in per_mode.items():
+            if reference is not None and not (truth is None and mode == "two_stage"):
+                run["accuracy"] = compare(reference, run["result"])
+
+    return {mode: summarize(mode_runs) for mode, mode_runs in runs.items()}
+
+
+def summarize(runs: List[Dict]) -> Dict:
+    """Агреговані метрики режиму"""
+    ok = [run for run in runs if "error" not in run]
+    summary: Dict = {"runs": len(runs), "errors": len(runs) - len(ok)}
+    if not ok:
+        return summary
+
+    latencies = sorted(run["latency_s"] for run in ok)
+    summary.update({
+        "latency_p50_s": round(statistics.median(latencies), 2),
+        "latency_p90_s": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))], 2),
+        "avg_calls": round(statistics.mean(run["calls"] for run in ok), 2),
+        "avg_input_tokens": round(statistics.mean(run["input_tokens"] for run in ok)),
+        "avg_cache_read_tokens": round(statistics.mean(run["cache_read_tokens"] for run in ok)),
+        "avg_output_tokens": round(statistics.mean(run["output_tokens"] for run in ok)),
+    })
+
+    scored = [run["accuracy"] for run in ok if "accuracy" in run]
+    if scored:
+        for metric in scored[0]:
+            values = [scores[metric] for scores in scored if metric in scores]
+            summary[f"avg_{metric}"] = round(statistics.mean(values), 3)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("images", type=Path, help="Директорія з фото етикеток (і опційно <name>.json еталонами)")
+    parser.add_argument("--modes", nargs="+", default=list(OCR_MODES), choices=OCR_MODES)
+    parser.add_argument("--repeats", type=int, default=1, help="Прогонів на зображення в кожному режимі")
+    parser.add_argument("--output", type=Path, help="Зберегти підсумок у JSON")
+    args = parser.parse_args()
+
+    images = sorted(path for path in args.images.iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+    if not images:
+        parser.error(f"No images found in {args.images}")
+
+    # two_stage першим - він еталон для fused, якщо немає <name>.json
+    modes = sorted(args.modes, key=lambda mode: mode != "two_stage")
+    summary = asyncio.run(benchmark(images, modes, args.repeats))
+
+    print("\n" + "=" * 60)
+    print("📊 SUMMARY")
+    print("=" * 60)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+    if args.output:
+        args.output.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n💾 Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
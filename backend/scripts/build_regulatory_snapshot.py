@@ -0,0 +1,41 @@
+"""Export reference tables from Supabase into the precompiled regulatory snapshot"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.db.regulatory_snapshot import publish_snapshot
+from app.db.supabase_client import SupabaseClient
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--output",
+        default=settings.regulatory_snapshot_path,
+        help="Snapshot file (default: REGULATORY_SNAPSHOT_PATH)",
+    )
+    args = parser.parse_args()
+    if not args.output:
+        parser.error("REGULATORY_SNAPSHOT_PATH is empty, pass --output")
+
+    meta = publish_snapshot(SupabaseClient().client, args.output)
+    print(f"\n✅ Snapshot {meta['version']} → {args.output}")
+    for table, count in meta["tables"].items():
+        print(f"   • {table}: {count} rows")
+
+
+if __name__ == "__main__":
+    main()
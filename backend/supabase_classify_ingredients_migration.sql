@@ -0,0 +1,169 @@
+-- =====================================================
+-- SUPABASE MIGRATION: classify_ingredients RPC
+-- =====================================================
+-- Класифікація всього списку інгредієнтів етикетки одним викликом
+-- (замість десятків PostgREST запитів по довідкових таблицях)
+-- Автор: LabelCheck UA Team
+-- Версія: 1.1
+
+-- =====================================================
+-- ФУНКЦІЯ: classify_ingredients(names TEXT[])
+-- =====================================================
+-- Для кожної назви повертає:
+--   category - перша категорія за пріоритетом DosageService.check_dosages
+--              (banned_substance, excipient, vitamin_mineral, amino_acid, plant,
+--              microorganism, physiological, novel_food, other_substance) або NULL
+--   matches  - {категорія: [рядки]} - ті самі збіги, що й resolve_references
+--              (ILIKE '%назва%'; мікроорганізми - точна пара genus + species)
+--   form     - рядок substance_form_conversions (точна назва або name_variations)
+--              + "coefficient" (elemental_coefficient_max або elemental_coefficient)
+--   limits   - {"base_substance", "vitamin_mineral", "efsa", "table1"} -
+--              перші збіги по початку назви базової речовини (як _cached_lookup);
+--              EFSA - по efsa_mapping рядка vitamin_mineral, якщо він заданий
+--              (як _check_vitamin_mineral)
+--
+-- Виклик: supabase.rpc('classify_ingredients', {'names': [...]})
+-- plpgsql: таблиці перевіряються при виконанні, а не при створенні функції
+
+CREATE OR REPLACE FUNCTION classify_ingredients(names TEXT[])
+RETURNS TABLE (
+    name TEXT,
+    category TEXT,
+    matches JSONB,
+    form JSONB,
+    limits JSONB
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    WITH input AS (
+        SELECT DISTINCT ON (t.n)
+            t.n AS name,
+            regexp_replace(trim(t.n), '\s+', ' ', 'g') AS clean,
+            replace(replace(replace(regexp_replace(trim(t.n), '\s+', ' ', 'g'), '\', '\\'), '%', '\%'), '_', '\_') AS escaped
+        FROM unnest(names) WITH ORDINALITY AS t(n, position)
+        WHERE coalesce(trim(t.n), '') <> ''
+        ORDER BY t.n, t.position
+    ),
+    matched AS (
+        SELECT
+            i.name,
+            i.clean,
+            i.escaped,
+            jsonb_build_object(
+                'banned_substance', (
+                    SELECT coalesce(jsonb_agg(to_jsonb(r) ORDER BY r.id), '[]'::jsonb) FROM banned_substances r
+                    WHERE r.substance_name_ua ILIKE '%' || i.escaped || '%' OR r.substance_name_en ILIKE '%' || i.escaped || '%'
+                ),
+                'excipient', (
+                    SELECT coalesce(jsonb_agg(to_jsonb(r) ORDER BY r.id), '[]'::jsonb) FROM excipients r
+                    WHERE r.excipient_name_ua ILIKE '%' || i.escaped || '%' OR r.excipient_name_en ILIKE '%' || i.escaped || '%'
+                       OR r.name_variations::text ILIKE '%' || i.escaped || '%'
+                ),
+                'vitamin_mineral', (
+                    SELECT coalesce(jsonb_agg(to_jsonb(r) ORDER BY r.id), '[]'::jsonb) FROM allowed_vitamins_minerals r
+                    WHERE r.substance_name_ua ILIKE '%' || i.escaped || '%' OR r.substance_name_en ILIKE '%' || i.escaped || '%'
+                ),
+                'amino_acid', (
+                    SELECT coalesce(jsonb_agg(to_jsonb(r) ORDER BY r.id), '[]'::jsonb) FROM amino_acids r
+                    WHERE r.amino_acid_name_ua ILIKE '%' || i.escaped || '%' OR r.amino_acid_name_en ILIKE '%' || i.escaped || '%'
+                ),
+                'plant', (
+                    SELECT coalesce(jsonb_agg(to_jsonb(r) ORDER BY r.id), '[]'::jsonb) FROM allowed_plants r
+                    WHERE r.botanical_name_lat ILIKE '%' || i.escaped || '%' OR r.common_name_ua ILIKE '%' || i.escaped || '%'
+                ),
+                'microorganism', (
+                    SELECT coalesce(jsonb_agg(to_jsonb(r) ORDER BY r.id), '[]'::jsonb) FROM microorganisms r
+                    WHERE split_part(i.clean, ' ', 2) <> ''
+                      AND r.genus = split_part(i.clean, ' ', 1)
+                      AND r.species = split_part(i.clean, ' ', 2)
+                ),
+                'physiological', (
+                    SELECT coalesce(jsonb_agg(to_jsonb(r) ORDER BY r.id), '[]'::jsonb) FROM max_doses_table1 r
+                    WHERE (r.substance_name_ua ILIKE '%' || i.escaped || '%' OR r.substance_name_en ILIKE '%' || i.escaped || '%')
+                      AND r.category = 'physiological'
+                ),
+                'novel_food', (
+                    SELECT coalesce(jsonb_agg(to_jsonb(r) ORDER BY r.id), '[]'::jsonb) FROM novel_foods r
+                    WHERE r.substance_name_ua ILIKE '%' || i.escaped || '%' OR r.substance_name_en ILIKE '%' || i.escaped || '%'
+                ),
+                'other_substance', (
+                    SELECT coalesce(jsonb_agg(to_jsonb(r) ORDER BY r.id), '[]'::jsonb) FROM other_substances r
+                    WHERE r.substance_name_ua ILIKE '%' || i.escaped || '%' OR r.substance_name_en ILIKE '%' || i.escaped || '%'
+                )
+            ) AS matches,
+            (
+                SELECT to_jsonb(c) || jsonb_build_object(
+                    'coefficient', coalesce(to_jsonb(c) -> 'elemental_coefficient_max', to_jsonb(c) -> 'elemental_coefficient')
+                )
+                FROM substance_form_conversions c
+                WHERE lower(c.substance_name_ua) = lower(i.clean)
+                   OR lower(c.substance_name_en) = lower(i.clean)
+                   OR c.name_variations::text ILIKE '%"' || i.escaped || '"%'
+                ORDER BY c.id
+                LIMIT 1
+            ) AS form
+        FROM input i
+    ),
+    based AS (
+        SELECT
+            m.*,
+            coalesce(m.form ->> 'substance_name_ua', m.clean) AS base_substance,
+            replace(replace(replace(coalesce(m.form ->> 'substance_name_ua', m.clean), '\', '\\'), '%', '\%'), '_', '\_') || '%' AS base_prefix
+        FROM matched m
+    )
+    SELECT
+        b.name,
+        CASE
+            WHEN jsonb_array_length(b.matches -> 'banned_substance') > 0 THEN 'banned_substance'
+            WHEN jsonb_array_length(b.matches -> 'excipient') > 0 THEN 'excipient'
+            WHEN jsonb_array_length(b.matches -> 'vitamin_mineral') > 0 THEN 'vitamin_mineral'
+            WHEN jsonb_array_length(b.matches -> 'amino_acid') > 0 THEN 'amino_acid'
+            WHEN jsonb_array_length(b.matches -> 'plant') > 0 THEN 'plant'
+            WHEN jsonb_array_length(b.matches -> 'microorganism') > 0 THEN 'microorganism'
+            WHEN jsonb_array_length(b.matches -> 'physiological') > 0 THEN 'physiological'
+            WHEN jsonb_array_length(b.matches -> 'novel_food') > 0 THEN 'novel_food'
+            WHEN jsonb_array_length(b.matches -> 'other_substance') > 0 THEN 'other_substance'
+        END,
+        b.matches,
+        b.form,
+        jsonb_build_object(
+            'base_substance', b.base_substance,
+            'vitamin_mineral', vm.data,
+            'efsa', (
+                SELECT to_jsonb(r) FROM efsa_limits r
+                WHERE r.substance_name_ua ILIKE e.efsa_prefix OR r.substance_name_en ILIKE e.efsa_prefix
+                ORDER BY (r.substance_name_ua ILIKE e.efsa_prefix) DESC, r.id
+                LIMIT 1
+            ),
+            'table1', (
+                SELECT to_jsonb(r) FROM max_doses_table1 r
+                WHERE (r.substance_name_ua ILIKE b.base_prefix OR r.substance_name_en ILIKE b.base_prefix)
+                  AND r.category IN ('vitamin', 'mineral')
+                ORDER BY (r.substance_name_ua ILIKE b.base_prefix) DESC, r.id
+                LIMIT 1
+            )
+        )
+    FROM based b
+    LEFT JOIN LATERAL (
+        SELECT to_jsonb(r) AS data FROM allowed_vitamins_minerals r
+        WHERE r.substance_name_ua ILIKE b.base_prefix OR r.substance_name_en ILIKE b.base_prefix
+        ORDER BY (r.substance_name_ua ILIKE b.base_prefix) DESC, r.id
+        LIMIT 1
+    ) vm ON true
+    CROSS JOIN LATERAL (
+        SELECT replace(replace(replace(
+            regexp_replace(trim(coalesce(nullif(vm.data ->> 'efsa_mapping', ''), b.base_substance)), '\s+', ' ', 'g'),
+            '\', '\\'), '%', '\%'), '_', '\_') || '%' AS efsa_prefix
+    ) e;
+END;
+$$;
+
+COMMENT ON FUNCTION classify_ingredients(TEXT[]) IS
+    'Класифікація списку інгредієнтів по всіх довідкових таблицях одним викликом (DosageService.classify_ingredients)';
+
+-- Доступ через PostgREST (anon / authenticated ключі API)
+GRANT EXECUTE ON FUNCTION classify_ingredients(TEXT[]) TO anon, authenticated, service_role;
@@ -0,0 +1,26 @@
+-- =====================================================
+-- SUPABASE MIGRATION: regulatory_dataset_versions table
+-- =====================================================
+-- Опубліковані версії регуляторного датасету (scripts/update_regulations.py)
+-- Автор: LabelCheck UA Team
+-- Версія: 1.0
+
+-- =====================================================
+-- ТАБЛИЦЯ: regulatory_dataset_versions
+-- =====================================================
+-- Кожне оновлення регуляцій додає рядок з хешами вмісту таблиць.
+-- API процеси опитують останню версію (DATASET_VERSION_CHECK_INTERVAL)
+-- і інвалідують кеші лише таблиць, чий хеш змінився - без рестарту.
+
+CREATE TABLE IF NOT EXISTS regulatory_dataset_versions (
+    version SERIAL PRIMARY KEY,
+    table_hashes JSONB NOT NULL DEFAULT '{}'::jsonb,
+    changed_tables TEXT[] NOT NULL DEFAULT '{}',
+    published_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Коментарі для документації
+COMMENT ON TABLE regulatory_dataset_versions IS 'Опубліковані версії регуляторного датасету (delta sync)';
+COMMENT ON COLUMN regulatory_dataset_versions.version IS 'Монотонний номер версії (призначає БД)';
+COMMENT ON COLUMN regulatory_dataset_versions.table_hashes IS 'Хеш вмісту кожної синхронізованої таблиці {таблиця: хеш}';
+COMMENT ON COLUMN regulatory_dataset_versions.changed_tables IS 'Таблиці, змінені цим оновленням';
@@ -0,0 +1,33 @@
+"""Shared pytest fixtures"""
+
+import pytest
+
+from app.services.claude_ocr_service import ClaudeOCRService
+from app.db.regulatory_snapshot import regulatory_snapshot
+from app.services.ocr_cache import OCRCache
+from app.utils.cache_backend import MemoryCacheBackend, set_cache_backend
+
+
+@pytest.fixture(autouse=True)
+def reference_cache():
+    """Свіжий in-process кеш довідкових lookup'ів для кожного тесту"""
+    backend = MemoryCacheBackend()
+    set_cache_backend(backend)
+    yield backend
+    set_cache_backend(None)
+
+
+@pytest.fixture
+def ocr_service(tmp_path):
+    """ClaudeOCRService з кешами у тимчасовій директорії (messages.create підміняється в тестах)"""
+    service = ClaudeOCRService()
+    service.image_cache = OCRCache(str(tmp_path / "ocr.sqlite3"), namespace="image")
+    service.parse_cache = OCRCache(str(tmp_path / "ocr.sqlite3"), namespace="parse")
+    return service
+
+
+@pytest.fixture(autouse=True)
+def no_regulatory_snapshot(monkeypatch):
+    """Тести працюють з моками Supabase, а не з локально зібраним снапшотом"""
+    monkeypatch.setattr(regulatory_snapshot, "path", None)
+    monkeypatch.setattr(regulatory_snapshot, "_snapshot", None)
@@ -0,0 +1,167 @@
+"""Tests for batch check API (OCR та валідатори замокано)"""
+
+import io
+import time
+import zipfile
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def _zip(files) -> bytes:
+    """Zip архів з {ім'я: байти}"""
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return output.getvalue()
+
+
+def _report(check_id, label_data):
+    """Мінімальний звіт /full"""
+    is_valid = label_data["product_name"] != "BAD"
+    return {
+        "check_id": check_id,
+        "is_valid": is_valid,
+        "partial": False,
+        "product_info": {"name": label_data["product_name"]},
+        "stats": {"total_ingredients": 1, "total_dosage_errors": 0 if is_valid else 2},
+        "penalties": {"total_amount": 0 if is_valid else 640000},
+    }
+
+
+def _wait(client, job_id, timeout=5.0):
+    """Дочекатися завершення job"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = client.get(f"/api/check-label/batch/{job_id}").json()
+        if data["status"] == "completed":
+            return data
+        time.sleep(0.02)
+    pytest.fail("Batch job did not complete")
+
+
+@patch('app.api.routes.checker._validate_label')
+@patch('app.api.routes.checker.ocr_service')
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
+def test_batch_zip_and_files(mock_supabase, mock_ocr_service, mock_validate_label):
+    """Zip + окремі файли: всі етикетки перевірені, підсумок JSON та CSV"""
+    names = {b"ok-1": "ЦИНК", b"ok-2": "МАГНІЙ", b"bad": "BAD"}
+
+    async def extract_label_data(file_bytes, mode=None):
+        if file_bytes == b"broken":
+            raise RuntimeError("Claude unavailable")
+        return {"product_name": names[file_bytes], "ingredients": []}
+
+    mock_ocr_service.extract_label_data = extract_label_data
+    mock_ocr_service.aclose = AsyncMock()
+    mock_validate_label.side_effect = _report
+
+    archive = _zip({"labels/ok-1.png": b"ok-1", "labels/bad.pdf": b"bad", "labels/readme.txt": b"-", "__MACOSX/._x.png": b"-"})
+    files = [
+        ("files", ("catalog.zip", io.BytesIO(archive), "application/zip")),
+        ("files", ("ok-2.jpg", io.BytesIO(b"ok-2"), "image/jpeg")),
+        ("files", ("broken.webp", io.BytesIO(b"broken"), "image/webp")),
+        ("files", ("notes.txt", io.BytesIO(b"text"), "text/plain")),
+    ]
+
+    with TestClient(app) as client:
+        response = client.post("/api/check-label/batch", files=files)
+        assert response.status_code == 202
+        created = response.json()
+        assert created["progress"]["total"] == 5
+        assert created["skipped"] == ["labels/readme.txt"]
+
+        status = _wait(client, created["job_id"])
+        summary = client.get(f"/api/check-label/batch/{created['job_id']}/summary").json()
+        csv_response = client.get(f"/api/check-label/batch/{created['job_id']}/summary?format=csv")
+
+    by_name = {item["filename"]: item for item in status["items"]}
+    assert status["progress"]["completed"] == 3
+    assert status["progress"]["failed"] == 2
+    assert by_name["labels/bad.pdf"]["is_valid"] is False
+    assert by_name["broken.webp"]["error"] == "Claude unavailable"
+    assert by_name["notes.txt"]["error"].startswith("Invalid file type")
+    assert by_name["ok-2.jpg"]["check_id"]
+
+    assert summary["totals"]["valid"] == 2
+    assert summary["totals"]["invalid"] == 1
+    assert summary["totals"]["failed"] == 2
+    assert summary["totals"]["penalty_total"] == 640000
+
+    assert csv_response.headers["content-type"].startswith("text/csv")
+    rows = csv_response.text.strip().splitlines()
+    assert rows[0].startswith("index,filename,status,check_id")
+    assert len(rows) == 6
+
+    # Чекпойнт у check_sessions після завершення
+    mock_supabase.update.assert_awaited()
+    assert mock_supabase.update.call_args[0][1]["status"] == "batch_completed"
+
+
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
+def test_batch_status_from_checkpoint(mock_supabase):
+    """Job іншого worker'а - стан з останнього чекпойнту в check_sessions"""
+    snapshot = {
+        "job_id": "other-job",
+        "status": "running",
+        "progress": {"total": 2, "done": 1},
+        "items": [
+            {"index": 0, "filename": "a.png", "status": "completed", "is_valid": True},
+            {"index": 1, "filename": "b.png", "status": "pending"},
+        ],
+    }
+    mock_supabase.select.return_value = [{"check_id": "other-job", "status": "batch_running", "report": snapshot}]
+
+    client = TestClient(app)
+    response = client.get("/api/check-label/batch/other-job?offset=1&limit=1")
+
+    assert response.status_code == 200
+    assert [item["filename"] for item in response.json()["items"]] == ["b.png"]
+    assert client.get("/api/check-label/batch/other-job/summary").json()["totals"]["valid"] == 1
+
+
+def test_batch_invalid_zip():
+    """Пошкоджений архів - 400"""
+    client = TestClient(app)
+    files = [("files", ("catalog.zip", io.BytesIO(b"not a zip"), "application/zip"))]
+
+    response = client.post("/api/check-label/batch", files=files)
+
+    assert response.status_code == 400
+    assert "Invalid zip" in response.json()["detail"]
+
+
+@patch('app.api.routes.checker._validate_label')
+@patch('app.api.routes.checker.ocr_service')
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
+def test_batch_offline_ocr(mock_supabase, mock_ocr_service, mock_validate_label):
+    """offline: один виклик analyze_labels_offline на всі файли, далі валідація як у /full"""
+    calls = []
+
+    async def analyze_labels_offline(images):
+        calls.append(sorted(images))
+        return {key: {"product_name": "BAD" if key == "1" else "ЦИНК", "ingredients": []} for key in images}
+
+    mock_ocr_service.analyze_labels_offline = analyze_labels_offline
+    mock_ocr_service.extract_label_data = AsyncMock(side_effect=AssertionError("interactive OCR"))
+    mock_ocr_service.aclose = AsyncMock()
+    mock_validate_label.side_effect = _report
+
+    files = [("files", ("catalog.zip", io.BytesIO(_zip({"a.png": b"a", "b.png": b"b"})), "application/zip"))]
+
+    with TestClient(app) as client:
+        assert client.post("/api/check-label/batch?offline=true&mode=fused", files=files).status_code == 400
+
+        files[0][1][1].seek(0)
+        response = client.post("/api/check-label/batch?offline=true", files=files)
+        assert response.status_code == 202
+        status = _wait(client, response.json()["job_id"])
+
+    assert calls == [["0", "1"]]
+    assert status["offline"] is True
+    assert status["progress"]["completed"] == 2
+    assert [item["is_valid"] for item in status["items"]] == [True, False]
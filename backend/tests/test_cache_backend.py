@@ -0,0 +1,169 @@
+"""Tests for pluggable reference lookup cache backends"""
+
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services.dosage_service import REFERENCE_CACHE_NAMESPACE, DosageService, invalidate_reference_cache
+from app.utils.cache_backend import MISSING, CacheBackend, MemoryCacheBackend, RedisCacheBackend, set_cache_backend
+
+
+def _redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisCacheBackend(prefix="test", client=fakeredis.FakeRedis(server=fakeredis.FakeServer()))
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    """Обидва бекенди з однаковою поведінкою (redis - через fakeredis)"""
+    if request.param == "memory":
+        return MemoryCacheBackend(max_entries=3)
+    return _redis_backend()
+
+
+def test_get_set_ttl_and_invalidate(backend):
+    """None кешується; TTL; invalidate зачіпає лише свій namespace"""
+    backend.set("reference", "a", None, ttl_seconds=60)
+    backend.set("reference", "b", {"ul_value": 25}, ttl_seconds=0.05)
+    backend.set("other", "a", [1, 2])
+
+    assert backend.get("reference", "a") is None
+    assert backend.get("reference", "b") == {"ul_value": 25}
+    time.sleep(0.15)
+    assert backend.get("reference", "b") is MISSING
+
+    backend.invalidate("reference")
+    assert backend.get("reference", "a") is MISSING
+    assert backend.get("other", "a") == [1, 2]
+
+
+def test_invalidate_by_key_prefix(backend):
+    """Оновлення однієї таблиці скидає лише її lookup'и"""
+    set_cache_backend(backend)
+    backend.set(REFERENCE_CACHE_NAMESPACE, "efsa_limits|магній", {"ul_value": 250})
+    backend.set(REFERENCE_CACHE_NAMESPACE, "table1|магній|mineral|vitamin", None)
+    backend.set(REFERENCE_CACHE_NAMESPACE, "vitamin_mineral|магній", {"max": 400})
+
+    assert invalidate_reference_cache(["efsa_limits", "max_doses_table1", "forbidden_phrases"]) == 2
+    assert backend.get(REFERENCE_CACHE_NAMESPACE, "efsa_limits|магній") is MISSING
+    assert backend.get(REFERENCE_CACHE_NAMESPACE, "table1|магній|mineral|vitamin") is MISSING
+    assert backend.get(REFERENCE_CACHE_NAMESPACE, "vitamin_mineral|магній") == {"max": 400}
+    assert backend.invalidate(REFERENCE_CACHE_NAMESPACE, "vitamin_mineral[") == 0
+
+
+def test_memory_backend_lru():
+    """Найстаріший за використанням запис витісняється"""
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("ns", "a", 1)
+    backend.set("ns", "b", 2)
+    backend.get("ns", "a")
+    backend.set("ns", "c", 3)
+
+    assert backend.get("ns", "b") is MISSING
+    assert backend.get("ns", "a") == 1
+
+
+def test_incomplete_backend_fails_on_instantiation():
+    """Бекенд без invalidate() не створюється (а не падає при першому виклику)"""
+
+    class GetSetOnly(CacheBackend):
+        def get(self, namespace, key):
+            return MISSING
+
+        def set(self, namespace, key, value, ttl_seconds=None):
+            pass
+
+    with pytest.raises(TypeError):
+        GetSetOnly()
+
+
+def test_get_or_set_skips_uncacheable_and_survives_backend_errors():
+    """Неповний результат не кешується; збій кешу - значення обчислюється"""
+    backend = MemoryCacheBackend()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return None, False
+
+    backend.get_or_set("ns", "k", compute)
+    backend.get_or_set("ns", "k", compute)
+    assert len(calls) == 2
+
+    broken = MemoryCacheBackend()
+    broken.get = MagicMock(side_effect=ConnectionError("down"))
+    broken.set = MagicMock(side_effect=ConnectionError("down"))
+    assert broken.get_or_set("ns", "k", lambda: ({"x": 1}, True)) == {"x": 1}
+
+
+def _dosage_service(rows_by_column):
+    """DosageService з підрахунком PostgREST запитів ((таблиця, ilike колонка) → рядки)"""
+    service = DosageService.__new__(DosageService)
+    queries = []
+
+    def table(name):
+        query = MagicMock()
+        state = {}
+
+        def ilike(column, pattern):
+            state["column"] = column
+            queries.append((name, column, pattern))
+            return query
+
+        def execute():
+            return MagicMock(data=rows_by_column.get((name, state["column"]), []))
+
+        query.select.return_value = query
+        query.ilike.side_effect = ilike
+        query.in_.return_value = query
+        query.limit.return_value = query
+        query.execute.side_effect = execute
+        return query
+
+    service.supabase = MagicMock()
+    service.supabase.table.side_effect = table
+    service.supabase.execute = AsyncMock(side_effect=lambda query: query.execute().data)
+    service.queries = queries
+    return service
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("kind", ["memory", "redis"])
+async def test_dosage_lookups_shared_across_workers(kind):
+    """Другий "worker" бере рядок з кешу; після invalidate - знову з БД"""
+    backend = MemoryCacheBackend() if kind == "memory" else _redis_backend()
+    set_cache_backend(backend)
+    row = {"substance_name_ua": "Магній", "ul_value": 250, "ul_unit": "мг"}
+    worker_a = _dosage_service({("efsa_limits", "substance_name_en"): [row]})
+    worker_b = _dosage_service({("efsa_limits", "substance_name_en"): [row]})
+
+    assert await worker_a._get_efsa_limits("магній") == row
+    assert await worker_b._get_efsa_limits("  Магній ") == row
+    assert await worker_b._get_max_dose_table1("кальцій", ["vitamin", "mineral"]) is None
+    assert await worker_a._get_max_dose_table1("Кальцій", ["mineral", "vitamin"]) is None
+
+    assert worker_a.queries == [
+        ("efsa_limits", "substance_name_ua", "магній%"),
+        ("efsa_limits", "substance_name_en", "магній%"),
+    ]
+    assert len(worker_b.queries) == 2  # лише table1
+
+    backend.invalidate(REFERENCE_CACHE_NAMESPACE)
+    await worker_b._get_efsa_limits("магній")
+    assert len(worker_b.queries) == 4
+
+
+@pytest.mark.asyncio
+async def test_dosage_lookup_not_cached_on_db_error():
+    """Помилка запиту не закріплює "не знайдено" на TTL"""
+    service = _dosage_service({})
+    service.supabase.table.side_effect = RuntimeError("connection reset")
+
+    assert await service._get_vitamin_mineral("цинк") is None
+
+    service.supabase.table.side_effect = None
+    service.supabase.table.return_value.select.return_value.ilike.return_value.limit.return_value.execute.return_value = (
+        MagicMock(data=[{"substance_name_ua": "Цинк"}])
+    )
+    assert await service._get_vitamin_mineral("цинк") == {"substance_name_ua": "Цинк"}
@@ -1,10 +1,15 @@
 """Tests for checker API endpoints"""
 
+import asyncio
+
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch, AsyncMock
+from unittest.mock import patch, AsyncMock
 import io
 import json
+import threading
+import time
 
 from app.main import app
 
@@ -81,12 +86,12 @@ def mock_dosage_result():
 
 
 @patch('app.api.routes.checker.ocr_service')
-@patch('app.api.routes.checker.supabase')
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
 def test_quick_check_success(mock_supabase, mock_ocr_service, mock_label_data):
     """Test quick check endpoint with valid image"""
     # Setup mocks
     mock_ocr_service.extract_label_data = AsyncMock(return_value=mock_label_data)
-    mock_supabase.table.return_value.insert.return_value.execute.return_value = Mock(data=[{"check_id": "test-uuid"}])
+    mock_supabase.insert.return_value = {"check_id": "test-uuid"}
     
     # Create dummy image
     image_data = b"fake_image_data"
@@ -114,7 +119,7 @@ def test_quick_check_invalid_file_type():
     assert "Invalid file type" in response.json()["detail"]
 
 
-@patch('app.api.routes.checker.supabase')
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
 def test_quick_check_file_too_large(mock_supabase):
     """Test quick check with file too large"""
     # Create large file (11MB)
@@ -128,19 +133,17 @@ def test_quick_check_file_too_large(mock_supabase):
     assert "too large" in response.json()["detail"].lower()
 
 
-@patch('app.api.routes.checker.supabase')
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
 @patch('app.api.routes.checker.dosage_service')
 def test_full_check_success(mock_dosage_service, mock_supabase, mock_label_data, mock_dosage_result):
     """Test full check endpoint"""
     # Setup mocks
-    mock_supabase.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value = Mock(
-        data={
-            "check_id": "test-uuid",
-            "label_data": mock_label_data,
-            "status": "extracted"
-        }
-    )
-    mock_supabase.table.return_value.update.return_value.eq.return_value.execute.return_value = Mock()
+    mock_supabase.select.return_value = [{
+        "check_id": "test-uuid",
+        "label_data": mock_label_data,
+        "status": "extracted"
+    }]
+    mock_supabase.update.return_value = {}
     
     mock_dosage_service.check_dosages = AsyncMock(return_value=mock_dosage_result)
     
@@ -162,12 +165,10 @@ def test_full_check_success(mock_dosage_service, mock_supabase, mock_label_data,
     assert len(data["warnings"]) == 1
 
 
-@patch('app.api.routes.checker.supabase')
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
 def test_full_check_not_found(mock_supabase):
     """Test full check with non-existent check_id"""
-    mock_supabase.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value = Mock(
-        data=None
-    )
+    mock_supabase.select.return_value = []
     
     response = client.post(
         "/api/check-label/full",
@@ -178,7 +179,7 @@ def test_full_check_not_found(mock_supabase):
     assert "not found" in response.json()["detail"].lower()
 
 
-@patch('app.api.routes.checker.supabase')
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
 @patch('app.api.routes.checker.report_service')
 def test_download_pdf_report(mock_report_service, mock_supabase):
     """Test PDF download endpoint"""
@@ -192,12 +193,10 @@ def test_download_pdf_report(mock_report_service, mock_supabase):
         "checked_at": "2024-01-01T00:00:00"
     }
     
-    mock_supabase.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value = Mock(
-        data={
-            "check_id": "test-uuid",
-            "report": mock_report_data
-        }
-    )
+    mock_supabase.select.return_value = [{
+        "check_id": "test-uuid",
+        "report": mock_report_data
+    }]
     
     mock_report_service.generate_pdf_report = AsyncMock(return_value="/tmp/test-uuid.pdf")
     
@@ -211,14 +210,199 @@ def test_download_pdf_report(mock_report_service, mock_supabase):
             assert response.status_code in [200, 404, 500]
 
 
-@patch('app.api.routes.checker.supabase')
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
 def test_download_pdf_report_not_found(mock_supabase):
     """Test PDF download with non-existent report"""
-    mock_supabase.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value = Mock(
-        data=None
-    )
+    mock_supabase.select.return_value = []
     
     response = client.get("/api/check-label/non-existent/report.pdf")
     
     assert response.status_code == 404
 
+
+
+@patch('app.api.routes.checker.mandatory_service')
+@patch('app.api.routes.checker.forbidden_service')
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
+@patch('app.api.routes.checker.dosage_service')
+def test_full_check_runs_validators_concurrently(
+    mock_dosage_service, mock_supabase, mock_forbidden_service, mock_mandatory_service,
+    mock_label_data, mock_dosage_result
+):
+    """Валідатори виконуються паралельно; помилка одного дає частковий звіт"""
+    mock_supabase.select.return_value = [{"check_id": "test-uuid", "label_data": {**mock_label_data, "full_text": "текст"}}]
+
+    def blocking(result):
+        async def check(*args):
+            time.sleep(0.3)  # синхронний запит до БД
+            return result
+        return check
+
+    async def failing(*args):
+        time.sleep(0.3)
+        raise RuntimeError("forbidden_phrases unavailable")
+
+    mock_dosage_service.check_dosages = blocking(mock_dosage_result)
+    mock_forbidden_service.check_phrases = failing
+    mock_mandatory_service.check_fields = blocking([])
+
+    started = time.perf_counter()
+    response = client.post("/api/check-label/full", json={"check_id": "test-uuid"})
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    data = response.json()
+    assert elapsed < 0.8
+    assert data["partial"] is True
+    assert data["is_valid"] is False
+    assert data["validators"]["forbidden_phrases"]["status"] == "error"
+    assert data["validators"]["dosage"]["status"] == "ok"
+    assert len(data["errors"]) == 1
+
+
+@patch('app.api.routes.checker.ocr_service')
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
+def test_quick_check_stream_events(mock_supabase, mock_ocr_service, mock_label_data):
+    """SSE: текст Stage 1, інгредієнти, результат з check_id"""
+    async def analyze_label_events(image_bytes, mode=None):
+        yield "text", {"text": "ДІЄТИЧНА ДОБАВКА "}
+        yield "text", {"text": "ЦИНК"}
+        yield "ocr_complete", {"characters": 22, "cached": False}
+        yield "parsed", {**mock_label_data, "full_text": "ДІЄТИЧНА ДОБАВКА ЦИНК"}
+
+    mock_ocr_service.analyze_label_events = analyze_label_events
+
+    files = {"file": ("test.jpg", io.BytesIO(b"fake_image_data"), "image/jpeg")}
+    response = client.post("/api/check-label/quick/stream", files=files)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":"))
+        events.append((lines["event"], json.loads(lines["data"])))
+
+    names = [name for name, _ in events]
+    assert names == ["preprocessed", "text", "text", "ocr_complete", "ingredients", "result", "done"]
+    assert len(events[4][1]["ingredients"]) == 2
+    assert events[5][1]["check_id"] == events[6][1]["check_id"]
+    assert events[5][1]["product_info"]["name"] == "ЦИНК"
+    assert mock_supabase.insert.await_args[0][0] == "check_sessions"
+
+
+def test_quick_check_stream_invalid_file_type():
+    """Помилка валідації файлу - звичайний 400, без стріму"""
+    files = {"file": ("test.txt", io.BytesIO(b"text"), "text/plain")}
+
+    response = client.post("/api/check-label/quick/stream", files=files)
+
+    assert response.status_code == 400
+
+
+@patch('app.api.routes.checker._full_check')
+@patch('app.api.routes.checker.ocr_service')
+def test_full_check_async_queue(mock_ocr_service, mock_full_check):
+    """?async=true: 202 одразу, звіт через polling та SSE"""
+    mock_ocr_service.aclose = AsyncMock()
+
+    async def full_check(request):
+        await asyncio.sleep(0.2)
+        if request.check_id == "missing":
+            raise HTTPException(status_code=404, detail="Check ID not found")
+        return {"check_id": request.check_id, "is_valid": True}
+
+    mock_full_check.side_effect = full_check
+
+    with TestClient(app) as async_client:
+        response = async_client.post("/api/check-label/full?async=true", json={"check_id": "queued-uuid"})
+        assert response.status_code == 202
+        assert response.json()["status"] == "queued"
+
+        assert async_client.get("/api/check-label/full/queued-uuid").json()["status"] in ("queued", "running")
+
+        stream = async_client.get("/api/check-label/full/queued-uuid/stream")
+        names = [line.split(": ", 1)[1] for line in stream.text.splitlines() if line.startswith("event:")]
+        assert names == ["status", "report", "done"]
+
+        status = async_client.get("/api/check-label/full/queued-uuid").json()
+        assert status["status"] == "completed"
+        assert status["report"]["is_valid"] is True
+
+        async_client.post("/api/check-label/full?async=true", json={"check_id": "missing"})
+        deadline = time.monotonic() + 5
+        while async_client.get("/api/check-label/full/missing").json()["status"] != "failed":
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+        assert async_client.get("/api/check-label/full/missing").json()["error"] == "Check ID not found"
+
+
+@patch('app.api.routes.checker.mandatory_service')
+@patch('app.api.routes.checker.forbidden_service')
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
+@patch('app.api.routes.checker.dosage_service')
+def test_full_check_validator_timeout_reported_as_still_running(
+    mock_dosage_service, mock_supabase, mock_forbidden_service, mock_mandatory_service,
+    mock_label_data, mock_dosage_result, monkeypatch
+):
+    """Таймаут: потік валідатора лишається в окремому пулі, звіт це показує"""
+    from app.api.routes import checker
+
+    monkeypatch.setattr(checker.settings, "validator_timeout", 0.2)
+    mock_supabase.select.return_value = [{"check_id": "test-uuid", "label_data": {**mock_label_data, "full_text": "текст"}}]
+    threads = []
+
+    async def hanging(*args):
+        threads.append(threading.current_thread().name)
+        time.sleep(0.6)  # синхронний запит до БД, який не скасувати
+        return []
+
+    async def dosage(*args):
+        return mock_dosage_result
+
+    mock_dosage_service.check_dosages = dosage
+    mock_forbidden_service.check_phrases = hanging
+    mock_mandatory_service.check_fields = AsyncMock(return_value=[])
+
+    response = client.post("/api/check-label/full", json={"check_id": "test-uuid"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["partial"] is True
+    assert data["validators"]["forbidden_phrases"]["status"] == "timeout"
+    assert data["validators"]["forbidden_phrases"]["still_running"] is True
+    assert data["validators"]["dosage"]["still_running"] is False
+    assert threads[0].startswith("validator")
+
+
+@patch('app.api.routes.checker.mandatory_service')
+@patch('app.api.routes.checker.forbidden_service')
+@patch('app.api.routes.checker.supabase', new_callable=AsyncMock)
+@patch('app.api.routes.checker.dosage_service')
+def test_full_check_validators_see_request_scope(
+    mock_dosage_service, mock_supabase, mock_forbidden_service, mock_mandatory_service,
+    mock_label_data, mock_dosage_result
+):
+    """Кеш request_scope доступний у потоках валідаторів (як з asyncio.to_thread)"""
+    from app.utils.cache import _request_cache
+
+    mock_supabase.select.return_value = [{"check_id": "test-uuid", "label_data": {**mock_label_data, "full_text": "текст"}}]
+    scopes = []
+
+    def recording(result):
+        async def check(*args):
+            scopes.append(_request_cache.get())
+            return result
+        return check
+
+    mock_dosage_service.check_dosages = recording(mock_dosage_result)
+    mock_forbidden_service.check_phrases = recording([])
+    mock_mandatory_service.check_fields = recording([])
+
+    response = client.post("/api/check-label/full", json={"check_id": "test-uuid"})
+
+    assert response.status_code == 200
+    assert len(scopes) == 3
+    assert all(scope is not None for scope in scopes)
+    # Один scope на весь запит
+    assert len({id(scope) for scope in scopes}) == 1
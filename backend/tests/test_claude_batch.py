@@ -0,0 +1,127 @@
+"""Tests for offline OCR через Message Batches API (локальний stub сервер)"""
+
+import base64
+import io
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from PIL import Image
+
+from app.services.claude_batch_client import MessageBatchClient
+
+LABEL_TEXTS = {
+    (255, 255, 255): "ДІЄТИЧНА ДОБАВКА ЦИНК Склад: цинку глюконат 25 мг. Не є лікарським засобом.",
+    (0, 0, 0): "ДІЄТИЧНА ДОБАВКА МАГНІЙ Склад: магнію цитрат 500 мг. Не є лікарським засобом.",
+}
+
+
+def _png(color) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (64, 32), color).save(output, format="PNG")
+    return output.getvalue()
+
+
+def _stub_server(state):
+    """
+    Stub Message Batches API: batch завершується після першого опитування
+
+    Stage 1 (зображення) → текст за кольором пікселя, Stage 2 → JSON з назвою продукту.
+    """
+    app = FastAPI()
+
+    def answer(params):
+        content = params["messages"][0]["content"]
+        if isinstance(content, list):
+            image = Image.open(io.BytesIO(base64.b64decode(content[0]["source"]["data"])))
+            color = image.convert("RGB").getpixel((0, 0))
+            if color not in LABEL_TEXTS:
+                return {"type": "errored", "error": {"type": "error", "error": {"message": "overloaded"}}}
+            text = LABEL_TEXTS[color]
+        else:
+            name = "ЦИНК" if "ЦИНК" in content else "МАГНІЙ"
+            text = json.dumps({"product_name": name, "ingredients": [{"name": name.lower()}]})
+        return {
+            "type": "succeeded",
+            "message": {
+                "content": [{"type": "text", "text": text}],
+                "usage": {"input_tokens": 10, "cache_read_input_tokens": 2000},
+            },
+        }
+
+    @app.post("/v1/messages/batches")
+    async def create(request: Request):
+        assert request.headers["x-api-key"] == "test-key"
+        body = await request.json()
+        batch_id = f"msgbatch_{len(state['batches'])}"
+        state["batches"][batch_id] = {"requests": body["requests"], "polls": 0}
+        return {"id": batch_id, "type": "message_batch", "processing_status": "in_progress"}
+
+    @app.get("/v1/messages/batches/{batch_id}")
+    async def retrieve(batch_id: str):
+        state["batches"][batch_id]["polls"] += 1
+        return {
+            "id": batch_id,
+            "processing_status": "ended",
+            "request_counts": {"succeeded": len(state["batches"][batch_id]["requests"])},
+            "results_url": f"http://stub/v1/messages/batches/{batch_id}/results",
+        }
+
+    @app.get("/v1/messages/batches/{batch_id}/results")
+    async def results(batch_id: str):
+        lines = [
+            json.dumps({"custom_id": request["custom_id"], "result": answer(request["params"])})
+            for request in state["batches"][batch_id]["requests"]
+        ]
+        return PlainTextResponse("\n".join(lines))
+
+    return app
+
+
+@pytest.fixture
+def batch_state(ocr_service):
+    """ocr_service.batch_client → локальний stub сервер"""
+    state = {"batches": {}}
+    ocr_service.batch_client = MessageBatchClient(
+        api_key="test-key",
+        base_url="http://stub",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=_stub_server(state))),
+        poll_interval=0,
+    )
+    return state
+
+
+@pytest.mark.asyncio
+async def test_offline_two_batches_and_cache(ocr_service, batch_state):
+    """Stage 1 та Stage 2 - по одному batch на всі етикетки; повтор - з кешу"""
+    images = {"0": _png((255, 255, 255)), "1": _png((0, 0, 0))}
+
+    results = await ocr_service.analyze_labels_offline(images)
+
+    assert len(batch_state["batches"]) == 2
+    stage1, stage2 = batch_state["batches"].values()
+    assert [r["custom_id"] for r in stage1["requests"]] == ["s1-0-0", "s1-1-0"]
+    assert [r["custom_id"] for r in stage2["requests"]] == ["s2-0", "s2-1"]
+    assert stage2["requests"][0]["params"]["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert results["0"]["product_name"] == "ЦИНК"
+    assert results["1"]["product_name"] == "МАГНІЙ"
+    assert results["1"]["full_text"] == LABEL_TEXTS[(0, 0, 0)]
+    assert ocr_service.cache_stats()["prompt"]["cache_read_input_tokens"] == 8000
+
+    cached = await ocr_service.analyze_labels_offline(images)
+
+    assert len(batch_state["batches"]) == 2
+    assert cached == results
+
+
+@pytest.mark.asyncio
+async def test_offline_errored_request(ocr_service, batch_state):
+    """Помилка одного запиту batch - error тільки для цієї етикетки"""
+    images = {"0": _png((255, 255, 255)), "1": _png((255, 0, 0))}
+
+    results = await ocr_service.analyze_labels_offline(images)
+
+    assert results["0"]["product_name"] == "ЦИНК"
+    assert "overloaded" in results["1"]["error"]
@@ -0,0 +1,239 @@
+"""Tests for ClaudeOCRService (Claude API замокано)"""
+
+import asyncio
+import io
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from app.services.ocr_cache import OCRCache, image_cache_key
+
+
+def _message(text: str) -> SimpleNamespace:
+    """Відповідь Messages API з одним текстовим блоком"""
+    return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+
+def _png(color=(255, 255, 255), **save_kwargs) -> bytes:
+    """Згенерувати PNG зображення"""
+    output = io.BytesIO()
+    Image.new("RGB", (64, 32), color).save(output, format="PNG", **save_kwargs)
+    return output.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit(ocr_service):
+    """Одночасно виконується не більше ніж дозволяє семафор"""
+    ocr_service._semaphore = asyncio.Semaphore(2)
+    state = {"active": 0, "peak": 0}
+
+    async def create(**kwargs):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return _message("текст етикетки")
+
+    ocr_service.client.messages.create = create
+
+    await asyncio.gather(*(ocr_service.extract_full_text(b"\xff\xd8" + b"0" * 20) for _ in range(6)))
+
+    assert state["peak"] == 2
+
+
+@pytest.mark.asyncio
+async def test_parse_structured_data_markdown_json(ocr_service):
+    """JSON в markdown блоці розпізнається"""
+    payload = {"product_name": "ЦИНК", "ingredients": [{"name": "цинк"}]}
+
+    async def create(**kwargs):
+        return _message(f"```json\n{json.dumps(payload, ensure_ascii=False)}\n```")
+
+    ocr_service.client.messages.create = create
+
+    result = await ocr_service.parse_structured_data("ЦИНК Склад: цинк")
+
+    assert result["product_name"] == "ЦИНК"
+
+
+@pytest.mark.asyncio
+async def test_analyze_label_uses_image_cache(ocr_service):
+    """Повторне завантаження того самого зображення не викликає Claude"""
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs["max_tokens"])
+        if len(calls) % 2 == 1:
+            return _message("ДІЄТИЧНА ДОБАВКА ЦИНК Склад: цинку глюконат 25 мг. Не є лікарським засобом.")
+        return _message(json.dumps({"product_name": "ЦИНК", "ingredients": []}))
+
+    ocr_service.client.messages.create = create
+
+    first = await ocr_service.analyze_label(_png())
+    second = await ocr_service.analyze_label(_png())
+
+    assert len(calls) == 2  # Stage 1 + Stage 2 тільки для першого завантаження
+    assert second == first
+    assert second["full_text"].startswith("ДІЄТИЧНА ДОБАВКА")
+
+
+def test_image_cache_key_ignores_metadata():
+    """Ключ залежить від пікселів, моделі та версії промпта, а не від метаданих файлу"""
+    plain = _png()
+    with_metadata = _png(optimize=True, dpi=(300, 300))
+
+    assert plain != with_metadata
+    assert image_cache_key(plain, "model", "v1") == image_cache_key(with_metadata, "model", "v1")
+    assert image_cache_key(plain, "model", "v1") != image_cache_key(plain, "model", "v2")
+    assert image_cache_key(plain, "model", "v1") != image_cache_key(_png((0, 0, 0)), "model", "v1")
+
+
+@pytest.mark.asyncio
+async def test_ocr_cache_lru_and_ttl(tmp_path):
+    """LRU витіснення та прострочення по TTL"""
+    cache = OCRCache(str(tmp_path / "ocr.sqlite3"), namespace="image", max_entries=2, ttl_seconds=60)
+
+    await cache.set("a", {"v": 1})
+    await cache.set("b", {"v": 2})
+    assert await cache.get("a") == {"v": 1}  # "a" тепер новіший за "b"
+    await cache.set("c", {"v": 3})
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == {"v": 1}
+    assert await cache.get("c") == {"v": 3}
+
+    cache.ttl_seconds = 0
+    time.sleep(0.01)
+    assert await cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_parse_cache_skips_repeat_text(ocr_service):
+    """Той самий текст (з іншими пробілами) не відправляється в Stage 2 вдруге"""
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return _message(json.dumps({"product_name": "ЦИНК", "ingredients": [{"name": "цинк"}]}))
+
+    ocr_service.client.messages.create = create
+
+    first = await ocr_service.parse_structured_data("ЦИНК\nСклад: цинк  25 мг")
+    second = await ocr_service.parse_structured_data("ЦИНК Склад: цинк 25 мг ")
+
+    assert len(calls) == 1
+    assert second == first
+    assert ocr_service.parse_cache.stats()["hits"] == 1
+    assert ocr_service.parse_cache.stats()["misses"] == 1
+
+
+class _FakeStream:
+    """messages.stream(...) з фіксованими фрагментами тексту"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+        async def text_stream():
+            for chunk in chunks:
+                yield chunk
+        self.text_stream = text_stream()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get_final_message(self):
+        return _message("".join(self.chunks))
+
+
+@pytest.mark.asyncio
+async def test_analyze_label_events_streams_stage1(ocr_service):
+    """Stage 1 віддається фрагментами, потім результат Stage 2; повтор - з кешу"""
+    chunks = ["ДІЄТИЧНА ДОБАВКА ЦИНК ", "Склад: цинку глюконат 25 мг. ", "Не є лікарським засобом."]
+    ocr_service.client.messages.stream = lambda **kwargs: _FakeStream(chunks)
+
+    async def create(**kwargs):
+        return _message(json.dumps({"product_name": "ЦИНК", "ingredients": [{"name": "цинк"}]}))
+
+    ocr_service.client.messages.create = create
+
+    events = [event async for event in ocr_service.analyze_label_events(_png())]
+    cached = [event async for event in ocr_service.analyze_label_events(_png())]
+
+    assert [name for name, _ in events] == ["text", "text", "text", "ocr_complete", "parsed"]
+    assert events[-1][1]["full_text"] == "".join(chunks).strip()
+    assert cached[1] == ("ocr_complete", {"characters": len("".join(chunks).strip()), "cached": True})
+    assert cached[-1][1]["product_name"] == "ЦИНК"
+
+
+LABEL_TEXT = "ДІЄТИЧНА ДОБАВКА ЦИНК Склад: цинку глюконат 25 мг. Не є лікарським засобом."
+
+
+@pytest.mark.asyncio
+async def test_fused_mode_single_call(ocr_service):
+    """fused: один vision виклик повертає full_text + структуру"""
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return _message(json.dumps({"full_text": LABEL_TEXT, "product_name": "ЦИНК", "ingredients": []}))
+
+    ocr_service.client.messages.create = create
+
+    result = await ocr_service.analyze_label(_png(), mode="fused")
+    await ocr_service.analyze_label(_png(), mode="fused")
+
+    assert len(calls) == 1
+    assert calls[0]["messages"][0]["content"][0]["type"] == "image"
+    assert result["full_text"] == LABEL_TEXT
+    assert result["product_name"] == "ЦИНК"
+
+
+@pytest.mark.asyncio
+async def test_fused_mode_falls_back_to_two_stage(ocr_service):
+    """fused відповідь без тексту → two_stage"""
+    responses = iter([
+        _message('{"product_name": "ЦИНК"}'),  # fused без full_text
+        _message(LABEL_TEXT),  # Stage 1
+        _message(json.dumps({"product_name": "ЦИНК", "ingredients": []})),  # Stage 2
+    ])
+
+    async def create(**kwargs):
+        return next(responses)
+
+    ocr_service.client.messages.create = create
+
+    result = await ocr_service.analyze_label(_png(), mode="fused")
+
+    assert result["full_text"] == LABEL_TEXT
+    with pytest.raises(ValueError):
+        await ocr_service.analyze_label(_png(), mode="three_stage")
+
+
+@pytest.mark.asyncio
+async def test_stage2_static_prompt_cached(ocr_service):
+    """Статичний промпт Stage 2 - system з cache_control, текст етикетки - user; cache_read враховується"""
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        response = _message(json.dumps({"product_name": "ЦИНК", "ingredients": []}))
+        response.usage = SimpleNamespace(input_tokens=40, cache_read_input_tokens=2500, cache_creation_input_tokens=0)
+        return response
+
+    ocr_service.client.messages.create = create
+
+    await ocr_service.parse_structured_data("ЦИНК Склад: цинк 25 мг")
+    await ocr_service.parse_structured_data("МАГНІЙ Склад: магній 100 мг")
+
+    assert calls[0]["system"] == calls[1]["system"]
+    assert calls[0]["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert "ЦИНК" not in calls[0]["system"][0]["text"]
+    assert "ЦИНК" in calls[0]["messages"][0]["content"]
+    assert ocr_service.cache_stats()["prompt"]["cache_read_input_tokens"] == 5000
+    assert ocr_service.cache_stats()["prompt"]["requests"] == 2
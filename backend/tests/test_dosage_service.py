@@ -1,5 +1,7 @@
 """Pytest tests for DosageService with 4-level hierarchy"""
 
+from unittest.mock import AsyncMock
+
 import pytest
 from app.services.dosage_service import DosageService
 
@@ -263,3 +265,159 @@ async def test_multiple_ingredients(dosage_service):
     # Може бути valid або warnings, але не errors (якщо дози валідні)
     assert result.all_valid == True or len(result.errors) == 0 or len(result.warnings) > 0
 
+
+
+# ==================== ТЕСТ 13: Пакетна класифікація ====================
+class _FakeQuery:
+    """Мінімальний PostgREST query builder: повертає всі рядки таблиці"""
+
+    def __init__(self, rows, calls, table):
+        self._rows = rows
+        self._calls = calls
+        self._table = table
+
+    def select(self, *args):
+        return self
+
+    def or_(self, *args):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def execute(self):
+        self._calls.append(self._table)
+        return type("Result", (), {"data": list(self._rows)})()
+
+
+class _FakeSupabase:
+    def __init__(self, tables):
+        self.tables = tables
+        self.calls = []
+
+    def table(self, name):
+        return _FakeQuery(self.tables.get(name, []), self.calls, name)
+
+    async def execute(self, query, timeout=None):
+        return query.execute().data
+
+
+@pytest.mark.asyncio
+async def test_resolve_references_one_query_per_table(dosage_service):
+    """Кількість запитів не залежить від кількості інгредієнтів"""
+    fake = _FakeSupabase({
+        "allowed_vitamins_minerals": [{"id": 1, "substance_name_ua": "Вітамін C", "substance_name_en": "Vitamin C"}],
+        "amino_acids": [{"id": 2, "amino_acid_name_ua": "L-лізин", "amino_acid_name_en": "L-Lysine"}],
+        "microorganisms": [{"id": 3, "genus": "Lactobacillus", "species": "Acidophilus"}],
+    })
+    dosage_service.supabase = fake
+
+    names = ["вітамін c", "L-лізин", "Lactobacillus Acidophilus"] + [f"Речовина {i}" for i in range(20)]
+    references = await dosage_service.resolve_references(names)
+
+    assert len(fake.calls) == 8  # 7 таблиць з ILIKE + microorganisms
+    assert references["вітамін c"]["vitamin_mineral"][0]["id"] == 1
+    assert references["L-лізин"]["amino_acid"][0]["id"] == 2
+    assert references["Lactobacillus Acidophilus"]["microorganism"][0]["id"] == 3
+    assert references["Речовина 5"]["vitamin_mineral"] == []
+
+    # _check_amino_acid використовує прикріплені рядки без нового запиту
+    fake.tables["amino_acids"][0]["max_daily_dose"] = 3.0
+    fake.tables["amino_acids"][0]["unit"] = "г/день"
+    calls_before = len(fake.calls)
+    result = await dosage_service._check_amino_acid(
+        "L-лізин", 7.0, "г", "", references["L-лізин"]["amino_acid"]
+    )
+    assert result["type"] == "error"
+    assert len(fake.calls) == calls_before
+
+
+class _FakeRPC:
+    def __init__(self, result):
+        self._result = result
+
+    def execute(self):
+        if isinstance(self._result, Exception):
+            raise self._result
+        return type("Result", (), {"data": self._result})()
+
+
+@pytest.mark.asyncio
+async def test_resolve_references_one_classify_rpc(dosage_service, monkeypatch):
+    """CLASSIFY_RPC_ENABLED: один виклик classify_ingredients замість запитів по таблицях"""
+    monkeypatch.setattr("app.services.dosage_service.settings.classify_rpc_enabled", True)
+    fake = _FakeSupabase({})
+    rpc_calls = []
+    fake.rpc = lambda name, params: rpc_calls.append((name, params)) or _FakeRPC([{
+        "name": "магнію цитрат",
+        "category": "vitamin_mineral",
+        "matches": {"vitamin_mineral": [{"id": 7, "substance_name_ua": "Магній"}]},
+        "form": {"substance_name_ua": "Магній", "form_name_ua": "Цитрат", "elemental_coefficient_max": 0.16, "coefficient": 0.16},
+        "limits": {
+            "base_substance": "Магній",
+            "vitamin_mineral": {"id": 7, "substance_name_ua": "Магній"},
+            "efsa": {"substance_name_ua": "Магній", "ul_value": 250, "ul_unit": "мг"},
+            "table1": None,
+        },
+    }])
+    dosage_service.supabase = fake
+
+    references = await dosage_service.resolve_references(["магнію цитрат", "Невідома речовина"])
+
+    assert rpc_calls == [("classify_ingredients", {"names": ["магнію цитрат", "Невідома речовина"]})]
+    assert fake.calls == []
+    assert references["магнію цитрат"]["vitamin_mineral"][0]["id"] == 7
+    assert references["магнію цитрат"]["banned_substance"] == []
+    assert references["Невідома речовина"] == {}
+
+    # Ліміти базової речовини вже в кеші: lookup'и без запитів до таблиць
+    assert (await dosage_service._get_efsa_limits("Магній"))["ul_value"] == 250
+    assert await dosage_service._get_max_dose_table1("магній", ["vitamin", "mineral"]) is None
+    assert fake.calls == []
+
+    # Форма з RPC: parse_ingredient не шукає її в substance_form_conversions
+    monkeypatch.setattr(dosage_service.mapper, "_is_excipient", AsyncMock(return_value=False))
+    monkeypatch.setattr(dosage_service.mapper, "_find_form_in_db", AsyncMock(side_effect=AssertionError("form lookup")))
+    parsed = await dosage_service.mapper.parse_ingredient("магнію цитрат", 500.0, "мг")
+    assert parsed["base_substance"] == "Магній"
+    assert parsed["form"] == "Цитрат"
+    assert parsed["elemental_quantity"] == 80.0
+
+
+@pytest.mark.asyncio
+async def test_classify_rpc_efsa_keyed_by_efsa_mapping(dosage_service, monkeypatch):
+    """EFSA ліміт з RPC кешується під efsa_mapping - саме за ним шукає _check_vitamin_mineral"""
+    monkeypatch.setattr("app.services.dosage_service.settings.classify_rpc_enabled", True)
+    fake = _FakeSupabase({})
+    fake.rpc = lambda name, params: _FakeRPC([{
+        "name": "холекальциферол",
+        "category": "vitamin_mineral",
+        "matches": {"vitamin_mineral": [{"id": 9, "substance_name_ua": "Вітамін D3"}]},
+        "form": None,
+        "limits": {
+            "base_substance": "холекальциферол",
+            "vitamin_mineral": {"id": 9, "substance_name_ua": "Вітамін D3", "efsa_mapping": "Вітамін D"},
+            "efsa": {"substance_name_ua": "Вітамін D", "ul_value": 100, "ul_unit": "мкг"},
+            "table1": None,
+        },
+    }])
+    dosage_service.supabase = fake
+
+    await dosage_service.resolve_references(["холекальциферол"])
+
+    assert (await dosage_service._get_efsa_limits("Вітамін D"))["ul_value"] == 100
+    assert fake.calls == []
+
+
+@pytest.mark.asyncio
+async def test_classify_rpc_failure_falls_back_to_tables(dosage_service, monkeypatch):
+    """Функцію не задеплоєно - звичайний запит по кожній таблиці"""
+    monkeypatch.setattr("app.services.dosage_service.settings.classify_rpc_enabled", True)
+    fake = _FakeSupabase({"amino_acids": [{"id": 2, "amino_acid_name_ua": "L-лізин", "amino_acid_name_en": "L-Lysine"}]})
+    fake.rpc = lambda name, params: _FakeRPC(RuntimeError("PGRST202: function not found"))
+    dosage_service.supabase = fake
+
+    references = await dosage_service.resolve_references(["L-лізин"])
+
+    assert len(fake.calls) == 7  # 7 таблиць з ILIKE (назва з одного слова - не мікроорганізм)
+    assert references["L-лізин"]["amino_acid"][0]["id"] == 2
@@ -0,0 +1,88 @@
+"""Tests for forbidden phrases matching"""
+
+import re
+
+import pytest
+
+from app.db.table_snapshot import TableSnapshot
+from app.services.forbidden_phrases_service import ForbiddenPhrasesService
+from app.utils.phrase_matcher import PhraseMatcher
+
+
+PHRASE_ROWS = [
+    {
+        "phrase": "лікує",
+        "phrase_variations": ["вилікує", "лікування"],
+        "category": "medicinal_claims",
+        "regulatory_source": "Наказ МОЗ №1114",
+        "explanation": "Дієтичні добавки не можуть мати лікувальних властивостей.",
+        "severity": "critical",
+    },
+    {
+        "phrase": "схуднення без дієти",
+        "phrase_variations": None,
+        "category": "weight_loss",
+        "regulatory_source": "Наказ МОЗ №1114",
+        "explanation": None,
+        "severity": "high",
+    },
+]
+
+
+@pytest.fixture
+def service():
+    """Сервіс з локальним снапшотом замість Supabase"""
+    service = ForbiddenPhrasesService()
+    calls = {"count": 0}
+
+    async def loader():
+        calls["count"] += 1
+        return PHRASE_ROWS
+
+    service._phrases_snapshot = TableSnapshot(
+        "forbidden_phrases", loader=loader, builder=service._build_matcher
+    )
+    service.loader_calls = calls
+    return service
+
+
+@pytest.mark.parametrize("phrase, text", [
+    ("лікує", "Продукт ЛІКУЄ застуду, лікує та вилікує"),
+    ("лікує", "вилікує, лікуєте"),
+    ("a a", "a a a a"),
+    ("c++", "мова c++ та c++x"),
+    ("(tm)", "brand(tm) (tm)"),
+])
+def test_matcher_agrees_with_word_boundary_regex(phrase, text):
+    """Ті самі збіги, що й re.finditer(r'\\bфраза\\b', IGNORECASE)"""
+    pattern = re.compile(rf"\b{re.escape(phrase)}\b", re.IGNORECASE)
+    expected = [match.span() for match in pattern.finditer(text)]
+
+    found = PhraseMatcher([phrase]).find_all(text)
+
+    assert found.get(phrase, []) == expected
+
+
+def test_matcher_normalizes_whitespace_and_case():
+    """Фраза розбита переносом рядка все одно знаходиться; позиції в оригіналі"""
+    text = "Сприяє СХУДНЕННЮ.\nСхуднення\n  без   дієти!"
+
+    found = PhraseMatcher(["схуднення без дієти", "без"]).find_all(text)
+
+    start, end = found["схуднення без дієти"][0]
+    assert text[start:end] == "Схуднення\n  без   дієти"
+    assert len(found["без"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_check_phrases_one_error_per_record(service):
+    """Одна помилка на запис, заперечення пропускається, таблиця читається один раз"""
+    text = "Вилікує все. Лікування. Схуднення без\nдієти."
+
+    first = await service.check_phrases(text)
+    second = await service.check_phrases("Продукт не є засобом що лікує.")
+
+    assert [error.phrase for error in first] == ["Вилікує", "Схуднення без дієти"]
+    assert first[0].severity == "critical"
+    assert second == []
+    assert service.loader_calls["count"] == 1
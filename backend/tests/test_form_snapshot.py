@@ -0,0 +1,105 @@
+"""Tests for substance_form_conversions snapshot index"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.db.table_snapshot import TableSnapshot
+from app.services.substance_mapper_service import SubstanceMapperService
+
+
+FORM_ROWS = [
+    {
+        "substance_name_ua": "Цинк цитрат",
+        "substance_name_en": "Zinc citrate",
+        "form_name_ua": "Цитрат",
+        "name_variations": ["цитрат цинку"],
+        "elemental_coefficient_max": 0.31,
+    },
+    {
+        "substance_name_ua": "Вітамін В6",
+        "substance_name_en": "Pyridoxine hydrochloride",
+        "form_name_ua": "Піридоксину гідрохлорид",
+        "name_variations": '["піридоксину гідрохлорид"]',  # JSON string з БД
+        "elemental_coefficient_max": 0.82,
+    },
+]
+
+
+@pytest.fixture
+def mapper():
+    """Mapper з локальним снапшотом замість Supabase"""
+    service = SubstanceMapperService()
+    calls = {"count": 0}
+
+    async def loader():
+        calls["count"] += 1
+        return FORM_ROWS
+
+    service._forms_snapshot = TableSnapshot(
+        "substance_form_conversions",
+        loader=loader,
+        builder=service._build_form_index,
+    )
+    service.loader_calls = calls
+    return service
+
+
+@pytest.mark.asyncio
+async def test_form_lookup_uses_single_table_load(mapper):
+    """20 пошуків - одне завантаження таблиці"""
+    for _ in range(20):
+        row = await mapper._find_form_in_db(mapper._normalize_name("Вітамін B6"))
+        assert row["form_name_ua"] == "Піридоксину гідрохлорид"
+
+    assert mapper.loader_calls["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_form_lookup_by_en_variation_and_permutation(mapper):
+    """Пошук по substance_name_en, name_variations та перестановці слів"""
+    by_en = await mapper._find_form_in_db(mapper._normalize_name("zinc citrate"))
+    by_variation = await mapper._find_form_in_db(mapper._normalize_name("піридоксину гідрохлорид"))
+    by_permutation = await mapper._find_form_in_db(mapper._normalize_name("цитрат цинк"))
+
+    assert by_en["substance_name_ua"] == "Цинк цитрат"
+    assert by_variation["substance_name_ua"] == "Вітамін В6"
+    assert by_permutation["substance_name_ua"] == "Цинк цитрат"
+    assert await mapper._find_form_in_db("невідома речовина") is None
+
+
+@pytest.mark.asyncio
+async def test_form_snapshot_invalidate_bumps_version(mapper):
+    """invalidate() перебудовує індекс при наступному пошуку"""
+    await mapper._find_form_in_db("цинк цитрат")
+    version = mapper._forms_snapshot.version
+
+    mapper._forms_snapshot.invalidate()
+    await mapper._find_form_in_db("цинк цитрат")
+
+    assert mapper._forms_snapshot.version == version + 1
+    assert mapper.loader_calls["count"] == 2
+
+
+def test_snapshot_refreshes_once_across_validator_threads():
+    """Холодний старт та invalidate(): потоки з різними loop читають таблицю один раз"""
+    calls = {"count": 0}
+
+    async def loader():
+        calls["count"] += 1
+        await asyncio.sleep(0.05)
+        return FORM_ROWS
+
+    snapshot = TableSnapshot("substance_form_conversions", loader=loader, builder=len)
+
+    def run_in_own_loop(_):
+        return asyncio.run(snapshot.get())
+
+    for expected_loads in (1, 2):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(run_in_own_loop, range(8)))
+
+        assert results == [len(FORM_ROWS)] * 8
+        assert calls["count"] == expected_loads
+        snapshot.invalidate()
@@ -0,0 +1,57 @@
+"""Tests for image pre-processing before Claude Vision"""
+
+import io
+
+from PIL import Image, ImageDraw
+
+from app.utils.image_processing import ImageProcessor
+
+
+def _label_photo(size=(4000, 3000), orientation=None) -> bytes:
+    """Фото етикетки: білі поля навколо темного блоку тексту"""
+    image = Image.new("RGB", size, (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((1000, 800, 3000, 2200), fill=(20, 20, 20))
+    output = io.BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    image.save(output, format="JPEG", quality=95, exif=exif)
+    return output.getvalue()
+
+
+def test_prepare_for_vision_crops_and_downscales():
+    """Поля обрізаються, довша сторона ≤ max_edge, файл меншає"""
+    raw = _label_photo()
+
+    prepared = ImageProcessor().prepare_for_vision(raw, max_edge=1568)
+
+    assert prepared.media_type == "image/jpeg"
+    assert prepared.steps == ["crop", "downscale", "jpeg"]
+    assert max(prepared.size) <= 1568
+    assert prepared.size[0] / prepared.size[1] < 4000 / 3000 + 0.1
+    assert prepared.bytes_saved > 0
+    assert prepared.stats()["processed_bytes"] == len(prepared.data)
+
+
+def test_prepare_for_vision_applies_exif_orientation():
+    """Орієнтація 6 (поворот на 90°) застосовується до пікселів"""
+    raw = _label_photo(size=(1200, 800), orientation=6)
+
+    prepared = ImageProcessor().prepare_for_vision(raw)
+
+    assert prepared.steps[0] == "exif_transpose"
+    with Image.open(io.BytesIO(prepared.data)) as image:
+        assert image.height > image.width
+        assert image.getexif().get(0x0112) is None
+
+
+def test_prepare_for_vision_falls_back_to_original():
+    """Не-зображення (PDF, пошкоджений файл) повертається без змін"""
+    raw = b"%PDF-1.4 not an image"
+
+    prepared = ImageProcessor().prepare_for_vision(raw)
+
+    assert prepared.data == raw
+    assert prepared.bytes_saved == 0
+    assert prepared.steps == []
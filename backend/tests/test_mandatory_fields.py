@@ -0,0 +1,75 @@
+"""Tests for cached mandatory fields"""
+
+import pytest
+
+from app.db.table_snapshot import TableSnapshot
+from app.services.mandatory_fields_service import MandatoryFieldsService
+
+
+FIELD_ROWS = [
+    {
+        "field_name": "edrpou_code",
+        "field_name_ua": "Код ЄДРПОУ",
+        "regulatory_source": "Закон №2639-VIII",
+        "article_number": "ст. 3",
+        "criticality": "critical",
+        "error_message": "Відсутній код ЄДРПОУ",
+        "recommendation": "Додайте код ЄДРПОУ",
+        "penalty_amount": 640000,
+    },
+]
+
+LABEL_DATA = {
+    "ingredients": [{"name": "цинк", "quantity": 25, "unit": "мг", "type": "active"}],
+    "operator": {"name": "ТОВ «Компанія»", "edrpou": None, "address": "м. Київ"},
+}
+
+
+def _service(loader) -> MandatoryFieldsService:
+    service = MandatoryFieldsService()
+    service._fields_snapshot = TableSnapshot(
+        "mandatory_fields",
+        loader=loader,
+        builder=list,
+        fallback=service._load_fallback_fields,
+    )
+    return service
+
+
+@pytest.mark.asyncio
+async def test_fields_loaded_once():
+    """Таблиця читається один раз на всі перевірки"""
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return FIELD_ROWS
+
+    service = _service(loader)
+    for _ in range(5):
+        errors = await service.check_fields(LABEL_DATA)
+        assert [error.field_name for error in errors] == ["Код ЄДРПОУ"]
+
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_fallback_to_json_when_db_unreachable():
+    """БД недоступна - критичні поля з mandatory_fields.json, повтор не частіше retry_seconds"""
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        raise ConnectionError("Connection refused")
+
+    service = _service(loader)
+    errors = await service.check_fields(LABEL_DATA)
+    await service.check_fields(LABEL_DATA)
+
+    assert service._fields_snapshot.source == "fallback"
+    assert len(calls) == 1
+    field_names = {error.field_name for error in errors}
+    assert "Код ЄДРПОУ виробника/імпортера" in field_names
+    # Поля, присутні в даних OCR, не дають помилок
+    assert "Повний перелік інгредієнтів у порядку зменшення маси" not in field_names
+    assert "Кількісний вміст кожного активного інгредієнта" not in field_names
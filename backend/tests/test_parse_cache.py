@@ -0,0 +1,76 @@
+"""Tests for memoized ingredient parsing"""
+
+import time
+
+import pytest
+
+from app.services.substance_mapper_service import SubstanceMapperService
+from app.utils.cache import TTLCache, request_scope
+
+
+@pytest.fixture
+def mapper():
+    """Mapper з власним кешем і підрахунком реальних розборів"""
+    service = SubstanceMapperService()
+    service._parse_cache = TTLCache("parse_ingredient", max_entries=100, ttl_seconds=60)
+    calls = []
+
+    async def parse(name, quantity, unit):
+        calls.append(name)
+        return {"base_substance": name.capitalize(), "elemental_quantity": quantity, "unit": unit}
+
+    service._parse_ingredient = parse
+    service.parse_calls = calls
+    return service
+
+
+@pytest.mark.asyncio
+async def test_parse_ingredient_resolved_once(mapper):
+    """Повторний розбір тієї самої назви/кількості/одиниці береться з кешу"""
+    first = await mapper.parse_ingredient("цинк", 25, "мг")
+    first["base_substance"] = "змінено"  # зміна результату не псує кеш
+    second = await mapper.parse_ingredient("цинк", 25, "мг")
+    await mapper.parse_ingredient("цинк", 50, "мг")
+
+    assert second["base_substance"] == "Цинк"
+    assert mapper.parse_calls == ["цинк", "цинк"]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_version_change_invalidates(mapper):
+    """Нова версія снапшоту форм - новий розбір"""
+    await mapper.parse_ingredient("магній", 100, "мг")
+    mapper._forms_snapshot.version += 1
+    await mapper.parse_ingredient("магній", 100, "мг")
+
+    assert mapper.parse_calls == ["магній", "магній"]
+
+
+def test_ttl_cache_lru_ttl_and_request_scope():
+    """LRU, TTL; значення з request scope доступне навіть після витіснення"""
+    cache = TTLCache("test", max_entries=2, ttl_seconds=60)
+
+    with request_scope():
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)  # "a" витіснено з процесного кешу
+        assert cache.get("a") == 1
+
+    assert cache.get("a") is None
+    assert cache.get("c") == 3
+
+    cache.ttl_seconds = 0
+    time.sleep(0.01)
+    assert cache.get("c") is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_parses_before_snapshot_rebuild(mapper):
+    """Інвалідація довідкових даних скидає розбори, навіть якщо снапшот ще не перебудовано"""
+    await mapper.parse_ingredient("магній", 100, "мг")
+    mapper._forms_snapshot.invalidate()
+    await mapper.parse_ingredient("магній", 100, "мг")  # снапшот не читається - влучання в кеш
+    SubstanceMapperService.invalidate_parses()
+    await mapper.parse_ingredient("магній", 100, "мг")
+
+    assert mapper.parse_calls == ["магній", "магній"]
@@ -0,0 +1,87 @@
+"""Tests for PDF label ingestion"""
+
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+from reportlab.lib.pagesizes import A6
+from reportlab.pdfgen import canvas
+
+from app.utils.pdf_processing import PDFProcessor, is_pdf
+
+
+LABEL_TEXT = [
+    "DIETARY SUPPLEMENT ZINC 25 mg",
+    "Ingredients: zinc gluconate 25 mg, microcrystalline cellulose.",
+    "Not a medicinal product. Store in a dry place.",
+]
+
+
+def _message(text: str) -> SimpleNamespace:
+    """Відповідь Messages API з одним текстовим блоком"""
+    return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+
+def _pdf(pages=1, with_text=True) -> bytes:
+    """Згенерувати PDF: з текстовим шаром або тільки з графікою"""
+    output = io.BytesIO()
+    pdf = canvas.Canvas(output, pagesize=A6)
+    for _ in range(pages):
+        if with_text:
+            for line, text in enumerate(LABEL_TEXT):
+                pdf.drawString(20, 350 - line * 20, text)
+        else:
+            pdf.rect(40, 150, 200, 120, fill=1)
+        pdf.showPage()
+    pdf.save()
+    return output.getvalue()
+
+
+def test_extract_text_layer():
+    """Текстовий шар витягується, PDF без тексту дає порожній рядок"""
+    processor = PDFProcessor()
+
+    assert is_pdf(_pdf())
+    assert "zinc gluconate" in processor.extract_text_layer(_pdf())
+    assert processor.extract_text_layer(_pdf(with_text=False)) == ""
+    assert not PDFProcessor.is_usable_text("(cid:12)(cid:15)" * 20)
+
+
+@pytest.mark.asyncio
+async def test_analyze_pdf_with_text_layer_skips_vision(ocr_service):
+    """PDF з текстом: тільки Stage 2, без зображень"""
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return _message(json.dumps({"product_name": "ZINC", "ingredients": [{"name": "zinc gluconate"}]}))
+
+    ocr_service.client.messages.create = create
+
+    result = await ocr_service.extract_label_data(_pdf())
+
+    assert len(calls) == 1
+    assert calls[0]["max_tokens"] == 8192
+    assert "zinc gluconate 25 mg" in result["full_text"]
+
+
+@pytest.mark.asyncio
+async def test_analyze_pdf_without_text_layer_rasterizes_pages(ocr_service):
+    """PDF без тексту: кожна сторінка йде в Stage 1 як JPEG"""
+    pytest.importorskip("pypdfium2")
+    media_types = []
+
+    async def create(**kwargs):
+        content = kwargs["messages"][0]["content"]
+        if isinstance(content, list) and content[0]["type"] == "image":
+            media_types.append(content[0]["source"]["media_type"])
+            return _message(" ".join(LABEL_TEXT))
+        return _message(json.dumps({"product_name": "ZINC", "ingredients": []}))
+
+    ocr_service.client.messages.create = create
+
+    result = await ocr_service.extract_label_data(_pdf(pages=2, with_text=False))
+
+    assert media_types == ["image/jpeg", "image/jpeg"]
+    assert result["full_text"].count("DIETARY SUPPLEMENT") == 2
@@ -0,0 +1,174 @@
+"""Tests for the direct Postgres fast path (stub pool; real Postgres via TEST_POSTGRES_DSN)"""
+
+import asyncio
+import os
+import threading
+import uuid
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.db.postgres_reference import (
+    PostgresReferenceRepository,
+    like_escape,
+    matching_sql,
+    postgres_reference,
+)
+from app.services.dosage_service import DosageService
+
+VITAMINS = [
+    {"id": 1, "substance_name_ua": "Магній", "substance_name_en": "Magnesium", "max_dose": Decimal("400.5")},
+    {"id": 2, "substance_name_ua": "Цинк", "substance_name_en": "Zinc", "max_dose": Decimal("25")},
+]
+
+
+class StubConnection:
+    """asyncpg з'єднання: ILIKE ANY по рядках у пам'яті, запити записуються"""
+
+    def __init__(self, rows, calls):
+        self.rows = rows
+        self.calls = calls
+
+    async def fetch(self, sql, *args):
+        self.calls.append((sql, args, threading.get_ident()))
+        if not args:
+            return self.rows
+        needles = [pattern.strip("%").lower() for pattern in args[0]]
+        return [
+            row for row in self.rows
+            if any(needle in str(value).lower() for needle in needles for value in row.values())
+        ]
+
+
+class StubPool:
+    def __init__(self, rows):
+        self.calls = []
+        self.rows = rows
+        self.closed = False
+
+    def acquire(self):
+        pool = self
+
+        class Acquire:
+            async def __aenter__(self):
+                return StubConnection(pool.rows, pool.calls)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Acquire()
+
+    async def close(self):
+        self.closed = True
+
+
+def test_matching_sql_uses_one_array_parameter():
+    sql = matching_sql("max_doses_table1", ("substance_name_ua", "substance_name_en"), ("category",))
+
+    assert sql == (
+        'SELECT * FROM "max_doses_table1" WHERE ("substance_name_ua" ILIKE ANY($1::text[]) '
+        'OR "substance_name_en" ILIKE ANY($1::text[])) AND "category" = ANY($2::text[]) ORDER BY id'
+    )
+    with pytest.raises(ValueError):
+        matching_sql("check_sessions", ("label_data",))
+    with pytest.raises(ValueError):
+        matching_sql("excipients", ("id; DROP TABLE excipients",))
+    assert like_escape("100%_a\\b") == "100\\%\\_a\\\\b"
+
+
+@pytest.mark.asyncio
+async def test_calls_from_validator_threads_run_on_pool_loop():
+    """Валідатори /full (власні loop у потоках) користуються пулом застосунку"""
+    pool = StubPool(VITAMINS)
+    repository = PostgresReferenceRepository("postgresql://stub")
+    await repository.start(pool=pool)
+
+    async def in_validator():
+        return await repository.fetch_matching(
+            "allowed_vitamins_minerals", ("substance_name_ua", "substance_name_en"), ["цинк", "магн", "цинк"]
+        )
+
+    rows = await asyncio.to_thread(asyncio.run, in_validator())
+    row = await asyncio.to_thread(
+        repository.blocking, repository.first_by_prefix,
+        "allowed_vitamins_minerals", ("substance_name_ua", "substance_name_en"), "zin",
+    )
+    with pytest.raises(RuntimeError):
+        repository.blocking(repository.fetch_all, "excipients")
+    await repository.close()
+
+    assert [row["id"] for row in rows] == [1, 2]
+    assert rows[0]["max_dose"] == 400.5
+    assert row["id"] == 2
+    # Один запит на всі назви, виконаний у потоці loop пулу
+    assert pool.calls[0][1][0] == ["%цинк%", "%магн%"]
+    assert {thread for _, _, thread in pool.calls} == {threading.get_ident()}
+    assert pool.closed and not repository.enabled
+
+
+@pytest.mark.asyncio
+async def test_resolve_references_uses_postgres_fast_path(monkeypatch):
+    pool = StubPool(VITAMINS)
+    await postgres_reference.start(pool=pool)
+    try:
+        service = DosageService.__new__(DosageService)
+        service.supabase = MagicMock()
+        service.supabase.execute = AsyncMock(return_value=[])
+
+        references = await service.resolve_references(["Цинк", "Магній"])
+    finally:
+        await postgres_reference.close()
+
+    assert [row["id"] for row in references["Цинк"]["vitamin_mineral"]] == [2]
+    assert [row["id"] for row in references["Магній"]["vitamin_mineral"]] == [1]
+    queried_tables = [call.args[0] for call in service.supabase.table.call_args_list]
+    assert "allowed_vitamins_minerals" not in queried_tables
+    assert "banned_substances" in queried_tables
+
+
+@pytest.mark.skipif(
+    not os.getenv("TEST_POSTGRES_DSN"),
+    reason="TEST_POSTGRES_DSN not set (docker run -e POSTGRES_PASSWORD=test -p 5432:5432 postgres:16)",
+)
+@pytest.mark.asyncio
+async def test_local_postgres():
+    """Справжній Postgres (локальний контейнер): схема створюється і видаляється тестом"""
+    asyncpg = pytest.importorskip("asyncpg")
+    dsn = os.environ["TEST_POSTGRES_DSN"]
+    schema = f"labelcheck_test_{uuid.uuid4().hex[:8]}"
+
+    admin = await asyncpg.connect(dsn)
+    try:
+        await admin.execute(f"CREATE SCHEMA {schema}")
+        await admin.execute(
+            f"CREATE TABLE {schema}.max_doses_table1 (id serial PRIMARY KEY, substance_name_ua text, "
+            f"substance_name_en text, category text, max_dose_value numeric, name_variations jsonb)"
+        )
+        await admin.execute(
+            f"INSERT INTO {schema}.max_doses_table1 (substance_name_ua, substance_name_en, category, max_dose_value, name_variations) "
+            f"VALUES ('Цинк', 'Zinc', 'mineral', 25, '[\"цинку\"]'), ('Таурин', 'Taurine', 'physiological', 2000, NULL), "
+            f"('100% екстракт', 'Extract', 'physiological', 1, NULL)"
+        )
+
+        repository = PostgresReferenceRepository(dsn, schema=schema)
+        await repository.start()
+        try:
+            rows = await repository.fetch_matching(
+                "max_doses_table1", ("substance_name_ua", "substance_name_en"),
+                ["таур", "zinc", "0%"], {"category": "physiological"},
+            )
+            zinc = await repository.first_by_prefix(
+                "max_doses_table1", ("substance_name_ua", "substance_name_en"), "ЦИН", ["vitamin", "mineral"]
+            )
+            everything = await repository.fetch_all("max_doses_table1")
+        finally:
+            await repository.close()
+    finally:
+        await admin.execute(f"DROP SCHEMA {schema} CASCADE")
+        await admin.close()
+
+    assert [row["substance_name_en"] for row in rows] == ["Taurine", "Extract"]
+    assert zinc["max_dose_value"] == 25
+    assert zinc["name_variations"] == ["цинку"]
+    assert [row["id"] for row in everything] == [1, 2, 3]
@@ -0,0 +1,118 @@
+"""Tests for the precompiled regulatory snapshot"""
+
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.db.regulatory_snapshot import (
+    RegulatorySnapshot,
+    RegulatorySnapshotStore,
+    build_snapshot,
+    export_tables,
+    regulatory_snapshot,
+)
+from app.services.dosage_service import DosageService
+
+TABLES = {
+    "allowed_vitamins_minerals": [
+        {"id": 1, "substance_name_ua": "Магній", "substance_name_en": "Magnesium"},
+        {"id": 2, "substance_name_ua": "Цинк", "substance_name_en": "Zinc"},
+    ],
+    "efsa_limits": [
+        {"id": 1, "substance_name_ua": "Магній (додатковий)", "substance_name_en": "Magnesium", "ul_value": 250, "ul_unit": "мг"},
+    ],
+    "max_doses_table1": [
+        {"id": 1, "substance_name_ua": "Цинк", "substance_name_en": "Zinc", "category": "mineral", "max_dose_value": 25},
+        {"id": 2, "substance_name_ua": "Таурин", "substance_name_en": "Taurine", "category": "physiological", "max_dose_value": 2000},
+    ],
+    "microorganisms": [{"id": 1, "genus": "Lactobacillus", "species": "acidophilus"}],
+    "mandatory_fields": [
+        {"id": 1, "field_name": "product_name", "criticality": "critical"},
+        {"id": 2, "field_name": "barcode", "criticality": "optional"},
+    ],
+}
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = tmp_path / "regulatory.sqlite3"
+    build_snapshot(TABLES, str(path))
+    return path
+
+
+def test_build_and_load_snapshot(snapshot_path):
+    """Рядки, версія з хешу вмісту та індекс префіксів"""
+    snapshot = RegulatorySnapshot.load(str(snapshot_path))
+
+    assert snapshot.rows("allowed_vitamins_minerals") == TABLES["allowed_vitamins_minerals"]
+    assert snapshot.meta["tables"]["efsa_limits"] == 1
+    assert not snapshot.has("novel_foods")
+    assert snapshot.version == build_snapshot(TABLES, str(snapshot_path.with_suffix(".copy")))["version"]
+
+    assert snapshot.find_prefix("efsa_limits", "substance_name_ua", "  МАГНІЙ ")["ul_value"] == 250
+    assert snapshot.find_prefix("allowed_vitamins_minerals", "substance_name_en", "zi")["id"] == 2
+    assert snapshot.find_prefix("allowed_vitamins_minerals", "substance_name_en", "iron") is None
+    assert snapshot.find_prefix(
+        "max_doses_table1", "substance_name_en", "z", lambda row: row["category"] == "vitamin"
+    ) is None
+    assert [row["id"] for row in snapshot.search("allowed_vitamins_minerals", ("substance_name_en",), "NES")] == [1]
+
+
+def test_export_tables_pages():
+    """Таблиці вивантажуються сторінками до неповної сторінки"""
+    pages = {0: [{"id": 1}, {"id": 2}], 2: [{"id": 3}]}
+    client = MagicMock()
+    query = client.table.return_value.select.return_value.order.return_value
+    query.range.side_effect = lambda start, end: MagicMock(execute=lambda: MagicMock(data=pages.get(start, [])))
+
+    assert export_tables(client, tables=["efsa_limits"], page_size=2) == {"efsa_limits": [{"id": 1}, {"id": 2}, {"id": 3}]}
+
+
+def test_store_hot_reload(snapshot_path):
+    """Новий файл підхоплюється при наступній перевірці, listeners викликаються лише на нову версію"""
+    store = RegulatorySnapshotStore(str(snapshot_path), check_interval=0)
+    reloads = []
+    store.add_listener(lambda: reloads.append(store.current().version))
+
+    first = store.current()
+    assert first is not None and len(reloads) == 1
+
+    os.utime(snapshot_path, ns=(0, 0))
+    assert store.current().version == first.version
+    assert len(reloads) == 1  # той самий вміст
+
+    updated = {**TABLES, "efsa_limits": [{**TABLES["efsa_limits"][0], "ul_value": 350}]}
+    build_snapshot(updated, str(snapshot_path))
+    assert store.current().find_prefix("efsa_limits", "substance_name_ua", "магній")["ul_value"] == 350
+    assert len(reloads) == 2
+
+    snapshot_path.write_bytes(b"broken")
+    assert store.current().version == reloads[-1]  # зламаний файл - лишається попередня версія
+
+
+def test_store_without_file(tmp_path):
+    assert RegulatorySnapshotStore(str(tmp_path / "missing.sqlite3")).current() is None
+    assert RegulatorySnapshotStore(None).current() is None
+
+
+@pytest.mark.asyncio
+async def test_dosage_service_reads_snapshot(snapshot_path, monkeypatch):
+    """Зі снапшотом класифікація та lookup'и дозувань не звертаються до Supabase"""
+    monkeypatch.setattr(regulatory_snapshot, "path", str(snapshot_path))
+    regulatory_snapshot.reload(force=True)
+
+    service = DosageService.__new__(DosageService)
+    service.supabase = MagicMock()
+    service.supabase.table.side_effect = AssertionError("Supabase must not be queried")
+
+    references = await service.resolve_references(["Цинк", "Таурин", "Lactobacillus acidophilus"])
+    assert [row["id"] for row in references["Цинк"]["vitamin_mineral"]] == [2]
+    assert [row["id"] for row in references["Таурин"]["physiological"]] == [2]
+    assert references["Цинк"]["physiological"] == []
+    assert "novel_food" not in references["Таурин"]  # таблиці немає в снапшоті → live запит не вдався
+    assert len(references["Lactobacillus acidophilus"]["microorganism"]) == 1
+
+    assert (await service._get_efsa_limits("Магній"))["ul_value"] == 250
+    assert (await service._get_max_dose_table1("цинк", ["vitamin", "mineral"]))["max_dose_value"] == 25
+    assert await service._get_max_dose_table1("таурин", ["vitamin", "mineral"]) is None
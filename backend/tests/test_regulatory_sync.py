@@ -0,0 +1,133 @@
+"""Tests for content-hash delta sync and dataset version watcher"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from app.db.dataset_version import DatasetVersionWatcher, dataset_version
+from app.db.regulatory_sync import (
+    apply_diff,
+    diff_table,
+    fetch_rows,
+    publish_dataset_version,
+    row_hash,
+    table_hash,
+)
+from app.services.substance_mapper_service import SubstanceMapperService
+
+SOURCE = [
+    {"id": 1, "phrase": "лікує", "severity": "critical", "variations": ["лікують"]},
+    {"id": 2, "phrase": "виліковує", "severity": "high", "variations": []},
+    {"id": 3, "phrase": "гарантує", "severity": "medium", "variations": None},
+]
+
+DB_ROWS = [
+    # id у БД відрізняються від JSON (seed не переносить id)
+    {"id": 10, "phrase": "лікує", "severity": "critical", "variations": ["лікують"], "created_at": "2025-01-01"},
+    {"id": 11, "phrase": "виліковує", "severity": "critical", "variations": []},
+    {"id": 12, "phrase": "застаріла", "severity": "low", "variations": []},
+    {"id": 13, "phrase": "лікує", "severity": "critical", "variations": ["лікують"]},
+]
+
+
+def test_row_and_table_hash_ignore_service_columns_and_order():
+    assert row_hash({"id": 1, "a": 800.0, "created_at": "x"}) == row_hash({"a": 800})
+    assert row_hash({"a": 1}, ["a", "b"]) == row_hash({"a": 1, "b": None}, ["a", "b"])
+    assert row_hash({"a": [1, 2]}) != row_hash({"a": [2, 1]})
+    assert table_hash(SOURCE) == table_hash(list(reversed(SOURCE)))
+    assert len(table_hash(SOURCE)) == 16
+
+
+def test_diff_table_by_natural_key():
+    """Нові, змінені, видалені та дублікати ключа; незмінні рядки не чіпаються"""
+    diff = diff_table("forbidden_phrases", "phrase", SOURCE, DB_ROWS)
+
+    assert diff.columns == ["phrase", "severity", "variations"]
+    assert diff.inserts == [{"phrase": "гарантує", "severity": "medium", "variations": None}]
+    assert diff.updates == [{"id": 11, "phrase": "виліковує", "severity": "high", "variations": []}]
+    assert sorted(diff.deletes) == [12, 13]
+    assert diff.unchanged == 1
+    assert diff.changed and diff.source_hash != diff.db_hash
+
+    synced = [{"id": 20 + index, **record} for index, record in enumerate(SOURCE)]
+    unchanged = diff_table("forbidden_phrases", "phrase", SOURCE, synced)
+    assert not unchanged.changed
+    assert unchanged.source_hash == unchanged.db_hash
+
+
+def test_apply_diff_in_chunks():
+    client = MagicMock()
+    diff = diff_table("forbidden_phrases", "phrase", SOURCE, DB_ROWS)
+    diff.inserts = diff.inserts * 5
+
+    assert apply_diff(client, diff, chunk_size=2) == (5, 1, 2)
+
+    table = client.table.return_value
+    assert [len(call.args[0]) for call in table.insert.call_args_list] == [2, 2, 1]
+    table.upsert.assert_called_once_with(diff.updates, on_conflict="id")
+    table.delete.return_value.in_.assert_called_once_with("id", diff.deletes)
+
+
+def test_fetch_rows_pages_and_publish_merges_hashes():
+    client = MagicMock()
+    query = client.table.return_value.select.return_value.order.return_value
+    query.range.return_value.execute.side_effect = [
+        MagicMock(data=[{"id": 1}, {"id": 2}]),
+        MagicMock(data=[{"id": 3}]),
+    ]
+    assert [row["id"] for row in fetch_rows(client, "mandatory_fields", page_size=2)] == [1, 2, 3]
+    assert [call.args for call in query.range.call_args_list] == [(0, 1), (2, 3)]
+
+    client = MagicMock()
+    latest = client.table.return_value.select.return_value.order.return_value.limit.return_value
+    latest.execute.return_value = MagicMock(data=[{"version": 4, "table_hashes": {"a": "1", "b": "2"}}])
+    client.table.return_value.insert.return_value.execute.return_value = MagicMock(data=[{"version": 5}])
+
+    assert publish_dataset_version(client, {"b": "3"}, ["b"]) == {"version": 5}
+    client.table.return_value.insert.assert_called_once_with(
+        {"table_hashes": {"a": "1", "b": "3"}, "changed_tables": ["b"]}
+    )
+
+
+def test_watcher_invalidates_only_changed_tables():
+    watcher = DatasetVersionWatcher(check_interval=0)
+    calls = []
+    watcher.add_listener("forbidden_phrases", lambda: calls.append("phrases"))
+    watcher.add_listener("mandatory_fields", lambda: calls.append("fields"))
+    old = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+
+    # Перша версія (опублікована до старту) - лише базова лінія
+    assert watcher.apply({"version": 1, "table_hashes": {"forbidden_phrases": "a", "mandatory_fields": "b"},
+                          "changed_tables": ["forbidden_phrases"], "published_at": old}) == []
+    assert watcher.apply({"version": 2, "table_hashes": {"forbidden_phrases": "c", "mandatory_fields": "b"},
+                          "changed_tables": ["forbidden_phrases"]}) == ["forbidden_phrases"]
+    assert watcher.apply({"version": 2, "table_hashes": {"forbidden_phrases": "d"}}) == []
+    assert calls == ["phrases"]
+    assert watcher.version == 2
+
+
+def test_watcher_applies_version_published_after_start():
+    watcher = DatasetVersionWatcher(check_interval=0)
+    calls = []
+    watcher.add_listener("mandatory_fields", lambda: calls.append("fields"))
+    watcher.add_listener("mandatory_fields", MagicMock(side_effect=RuntimeError("boom")))
+    client = MagicMock()
+    client.table.return_value.select.return_value.order.return_value.limit.return_value.execute.return_value = MagicMock(
+        data=[{"version": 7, "table_hashes": {"mandatory_fields": "x"}, "changed_tables": ["mandatory_fields"],
+               "published_at": datetime.now(timezone.utc).isoformat()}]
+    )
+
+    assert watcher.check(client) == ["mandatory_fields"]
+    assert calls == ["fields"]
+
+
+def test_excipient_update_invalidates_ingredient_parses(monkeypatch):
+    """Зміна excipients (форм, рослин) у новій версії скидає кеш розборів"""
+    SubstanceMapperService()
+    monkeypatch.setattr(dataset_version, "version", 1)
+    monkeypatch.setattr(dataset_version, "table_hashes", {"excipients": "a", "mandatory_fields": "b"})
+    generation = SubstanceMapperService._parse_generation
+
+    changed = dataset_version.apply({"version": 2, "table_hashes": {"excipients": "c", "mandatory_fields": "b"}})
+
+    assert changed == ["excipients"]
+    assert SubstanceMapperService._parse_generation == generation + 1
@@ -0,0 +1,142 @@
+"""Tests for async Supabase data-access layer (локальний stub PostgREST)"""
+
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+from app.db.supabase_client import SupabaseClient
+
+
+@pytest.fixture
+def postgrest(monkeypatch):
+    """
+    Stub PostgREST: кожен запит "виконується" delay секунд
+
+    Returns:
+        state: {"requests": [...], "threads": [...], "delay": float, "in_flight": int, "max_in_flight": int}
+    """
+    state = {"requests": [], "threads": [], "delay": 0.0, "in_flight": 0, "max_in_flight": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        state["requests"].append(request)
+        state["threads"].append(threading.get_ident())
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            await asyncio.sleep(state["delay"])
+        finally:
+            state["in_flight"] -= 1
+        if request.method == "GET":
+            return httpx.Response(200, json=[{"id": 1, "check_id": request.url.params.get("check_id")}])
+        if request.method == "DELETE":
+            return httpx.Response(200, json=[])
+        return httpx.Response(201, json=[json.loads(request.content)])
+
+    client = SupabaseClient()
+    monkeypatch.setattr(client, "transport", httpx.MockTransport(handler))
+    monkeypatch.setattr(client, "_async_client", None)
+    monkeypatch.setattr(client, "_loop", None)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_select_and_insert_go_through_async_client(postgrest):
+    client = SupabaseClient()
+
+    rows = await client.select("check_sessions", filters={"check_id": "abc"})
+    inserted = await client.insert("labels", {"product_name": "Цинк"})
+    await client.aclose()
+
+    assert rows == [{"id": 1, "check_id": "eq.abc"}]
+    assert inserted == {"product_name": "Цинк"}
+    select_request = postgrest["requests"][0]
+    assert select_request.url.path == "/rest/v1/check_sessions"
+    assert select_request.headers["apikey"]
+    assert select_request.headers["authorization"].startswith("Bearer ")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_overlap_on_one_pool(postgrest):
+    client = SupabaseClient()
+    await client.start()
+    postgrest["delay"] = 0.1
+
+    results = await asyncio.gather(*(
+        client.select("check_sessions", filters={"check_id": str(i)}) for i in range(5)
+    ))
+    pool = client.async_client()
+    await client.aclose()
+
+    assert len(results) == 5
+    # Запити не серіалізуються: всі п'ять одночасно в польоті
+    assert postgrest["max_in_flight"] == 5
+    assert client._async_client is None
+    assert pool.session.is_closed
+
+
+@pytest.mark.asyncio
+async def test_per_call_timeout(postgrest):
+    client = SupabaseClient()
+    postgrest["delay"] = 1.0
+
+    with pytest.raises(asyncio.TimeoutError):
+        await client.delete("labels", {"id": "1"}, timeout=0.05)
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_validator_loop_queries_run_on_app_pool(postgrest):
+    """Валідатори /full працюють у власних asyncio.run - запити йдуть через пул loop застосунку"""
+    client = SupabaseClient()
+    await client.start()
+    pool = client.async_client()
+
+    async def validator():
+        assert client.async_client() is pool
+        return await client.select("check_sessions", filters={"check_id": "abc"})
+
+    rows = await asyncio.to_thread(asyncio.run, validator())
+    await client.aclose()
+
+    assert rows == [{"id": 1, "check_id": "eq.abc"}]
+    # Запит виконано на loop застосунку (потік тесту), не в потоці валідатора
+    assert postgrest["threads"] == [threading.get_ident()]
+    assert pool.session.is_closed
+
+
+def test_client_without_start_is_closed_after_call(postgrest):
+    """Без startup застосунку (скрипти) - тимчасовий клієнт, з'єднання не лишаються відкритими"""
+    client = SupabaseClient()
+    query = None
+
+    async def call():
+        nonlocal query
+        query = client.table("excipients").select("id")
+        return await client.execute(query)
+
+    assert asyncio.run(call()) == [{"id": 1, "check_id": None}]
+    assert query.session.is_closed
+    assert client._async_client is None
+
+
+@pytest.mark.asyncio
+async def test_table_and_rpc_queries_go_through_async_client(postgrest):
+    """Fallback запити SubstanceMapperService (or_ ILIKE, RPC) - через async пул"""
+    from app.services.substance_mapper_service import SubstanceMapperService
+
+    client = SupabaseClient()
+    mapper = SubstanceMapperService.__new__(SubstanceMapperService)
+    mapper.supabase = client
+
+    assert await mapper._is_excipient("Крохмаль")
+    rows = await client.execute(client.rpc("search_excipient_variations", {"search_term": "мкц"}))
+    await client.aclose()
+
+    excipients_request, rpc_request = postgrest["requests"]
+    assert excipients_request.url.path == "/rest/v1/excipients"
+    assert "ilike" in excipients_request.url.params["or"]
+    assert rpc_request.url.path == "/rest/v1/rpc/search_excipient_variations"
+    assert rows == [{"search_term": "мкц"}]
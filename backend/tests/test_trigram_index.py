@@ -0,0 +1,110 @@
+"""Tests for trigram fuzzy name matching"""
+
+import pytest
+
+from app.db.table_snapshot import TableSnapshot
+from app.services.substance_mapper_service import SubstanceMapperService
+from app.utils.trigram_index import TrigramIndex, trigrams
+
+PLANT_ROWS = [
+    {"common_name_ua": "Півонія лікарська", "botanical_name_lat": "Paeonia officinalis", "botanical_family_ua": None},
+    {"common_name_ua": "Шавлія лікарська", "botanical_name_lat": "Salvia officinalis", "botanical_family_ua": None},
+]
+
+FORM_ROWS = [
+    {"substance_name_ua": "Магній", "substance_name_en": "Magnesium citrate", "form_name_ua": "Цитрат",
+     "name_variations": ["цитрат магнію"], "elemental_coefficient_max": 0.16},
+    {"substance_name_ua": "Цинк", "substance_name_en": "Zinc citrate", "form_name_ua": "Цитрат",
+     "name_variations": ["цитрат цинку"], "elemental_coefficient_max": 0.31},
+    {"substance_name_ua": "Вітамін B12", "substance_name_en": "Cyanocobalamin", "form_name_ua": "Ціанокобаламін",
+     "name_variations": [], "elemental_coefficient_max": 1.0},
+    {"substance_name_ua": "Вітамін D2", "substance_name_en": "Ergocalciferol", "form_name_ua": "Ергокальциферол",
+     "name_variations": [], "elemental_coefficient_max": 1.0},
+]
+
+
+def test_trigrams_like_pg_trgm():
+    assert trigrams("Cat") == {"  c", " ca", "cat", "at "}
+    assert trigrams("a-b") == {"  a", " a ", "  b", " b "}
+    assert trigrams("  ") == set()
+
+
+def test_search_ranks_by_similarity():
+    """Точна назва - 1.0; OCR помилка - вище порогу; стороннє - відсічено"""
+    index = TrigramIndex([("цитрат магнію", 1), ("цитрат цинку", 2), ("оксид магнію", 3), ("Цитрат магнію", 4)])
+
+    assert len(index) == 3  # повтор назви ігнорується
+    exact = index.search("ЦИТРАТ  магнію")
+    assert exact[0].score == 1.0 and exact[0].value == 1
+
+    typo = index.search("цитрат магнiю", limit=2)  # латинська "i" з OCR
+    assert typo[0].value == 1 and 0.5 < typo[0].score < 1.0
+    assert index.best("вітамін д3", threshold=0.3) is None
+
+
+def test_containment_scores_short_query_in_long_name():
+    index = TrigramIndex([("півонія лікарська", "peony"), ("шавлія лікарська", "sage")])
+
+    assert index.best("півонії", threshold=0.65) is None
+    assert index.best("півонії", threshold=0.65, containment=True).value == "peony"
+
+
+@pytest.fixture
+def mapper():
+    """Mapper з локальними снапшотами форм та рослин"""
+    service = SubstanceMapperService()
+
+    async def forms():
+        return FORM_ROWS
+
+    async def plants():
+        return PLANT_ROWS
+
+    service._forms_snapshot = TableSnapshot("substance_form_conversions", loader=forms, builder=service._build_form_index)
+    service._plants_snapshot = TableSnapshot("allowed_plants", loader=plants, builder=service._build_plant_index)
+    service.supabase = None  # будь-який запит до БД - помилка
+    return service
+
+
+@pytest.mark.asyncio
+async def test_form_found_by_inflection_not_by_similarity(mapper):
+    """Відмінки - збіг; триграмна схожість не підставляє чужу речовину"""
+    by_inflection = await mapper._find_form_in_db(mapper._normalize_name("цитрату магнію"))
+
+    assert by_inflection["substance_name_ua"] == "Магній"
+    for name in ("цитрат цинкy", "Вітамін B1", "Вітамін D3", "Vitamin D3", "цитрат"):
+        assert await mapper._find_form_in_db(mapper._normalize_name(name)) is None, name
+
+
+@pytest.mark.asyncio
+async def test_typo_only_suggested(mapper):
+    """OCR помилка - кандидат для перевірки людиною, а не автоматичний збіг"""
+    candidates = await mapper.suggest("цитрат цинкy")
+
+    assert candidates[0]["name"] == "Цинк"
+
+
+@pytest.mark.asyncio
+async def test_plant_found_by_exact_lemma_only(mapper):
+    """Відмінок повної назви - збіг; часткова схожість - лише кандидат"""
+    result = await mapper._find_plant_in_db("екстракт шавлії лікарської (10:1)")
+
+    assert result["base_substance"] == "Шавлія лікарська"
+    assert result["source"] == "allowed_plants"
+    assert await mapper._match_plant("paeonia officinalis") is PLANT_ROWS[0]
+    assert await mapper._match_plant("півонія") is None
+    assert await mapper._match_plant("півонія лікарсь") is None
+    assert (await mapper.suggest("півонії"))[0]["name"] == "Півонія лікарська"
+
+
+@pytest.mark.asyncio
+async def test_unmatched_ingredient_gets_ranked_candidates(mapper):
+    async def not_excipient(name):
+        return False
+
+    mapper._is_excipient = not_excipient
+    parsed = await mapper._parse_ingredient("магнію оксид", 100, "мг")
+
+    assert parsed["matched"] is False
+    assert parsed["candidates"][0]["name"] == "Магній"
+    assert parsed["candidates"] == sorted(parsed["candidates"], key=lambda c: -c["score"])
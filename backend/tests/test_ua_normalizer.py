@@ -0,0 +1,76 @@
+"""Tests for Ukrainian morphological normalization"""
+
+import pytest
+
+from app.db.table_snapshot import TableSnapshot
+from app.services.substance_mapper_service import SubstanceMapperService
+from app.utils.ua_normalizer import lemmatize, normalize_name, normalize_names
+
+
+def test_lemmatize_table_rules_and_passthrough():
+    """Таблиця лем, суфіксні правила, латина та вже нормальні форми без змін"""
+    assert lemmatize("Хвоща") == "хвощ"  # виняток з таблиці
+    assert lemmatize("ехінацеї") == "ехінацея"  # правило -еї
+    assert lemmatize("піридоксину") == "піридоксин"  # правило -у
+    assert lemmatize("календула") == "календула"
+    assert lemmatize("кислота") == "кислота"
+    assert lemmatize("b6") == "b6"
+    assert lemmatize("м’яти") == "м'ята"
+
+
+def test_normalize_name_keeps_punctuation():
+    assert normalize_name("Вітамін B6 (піридоксину  гідрохлорид)") == "вітамін b6 (піридоксин гідрохлорид)"
+    assert normalize_name("кислоти аскорбінової") == "кислота аскорбінова"
+
+
+def test_normalize_names_single_pass_memoized():
+    """Однакові слова різних назв лематизуються один раз"""
+    lemmatize.cache_clear()
+    names = ["цитрат магнію", "оксид магнію", "магнію цитрат"]
+
+    assert normalize_names(names) == ["цитрат магній", "оксид магній", "магній цитрат"]
+    assert lemmatize.cache_info().misses == 3
+
+
+def test_split_composition_nominative_plants():
+    mapper = SubstanceMapperService()
+    parts = mapper.split_composition("композиція екстрактів: кропиви, шавлії, календули, хвоща - 185 мг", 185, "мг")
+
+    assert [part["name"] for part in parts] == ["кропива", "шавлія", "календула", "хвощ"]
+    assert parts[0]["quantity"] == 46.25
+
+
+@pytest.mark.asyncio
+async def test_form_lookup_by_lemmas():
+    """Інша відмінкова форма знаходиться точним збігом лем"""
+    mapper = SubstanceMapperService()
+    rows = [{"substance_name_ua": "Магній", "substance_name_en": "Magnesium citrate",
+             "form_name_ua": "Цитрат", "name_variations": ["цитрат магнію"]}]
+
+    async def loader():
+        return rows
+
+    mapper._forms_snapshot = TableSnapshot("substance_form_conversions", loader=loader, builder=mapper._build_form_index)
+
+    row = await mapper._find_form_in_db(mapper._normalize_name("цитрату магнію"))
+    assert row["substance_name_ua"] == "Магній"
+
+
+@pytest.mark.asyncio
+async def test_form_lookup_lemmatizes_before_b_normalization():
+    """Словоформи з "в" лематизуються до заміни в→b ("звіробою" → "звіробій")"""
+    mapper = SubstanceMapperService()
+    rows = [{"substance_name_ua": "Звіробій", "substance_name_en": "St John's wort",
+             "form_name_ua": "Екстракт", "name_variations": ["екстракт трави звіробою"]}]
+
+    async def loader():
+        return rows
+
+    mapper._forms_snapshot = TableSnapshot("substance_form_conversions", loader=loader, builder=mapper._build_form_index)
+
+    row = await mapper._find_form_in_db(mapper._normalize_name("звіробою"), "звіробою")
+    by_variation = await mapper._find_form_in_db(
+        mapper._normalize_name("екстракту трави звіробою"), "екстракту трави звіробою"
+    )
+    assert row["substance_name_ua"] == "Звіробій"
+    assert by_variation["substance_name_ua"] == "Звіробій"